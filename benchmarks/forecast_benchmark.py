@@ -0,0 +1,85 @@
+# benchmarks/forecast_benchmark.py
+"""
+Compara precisión y latencia de los motores de proyección ('prophet' vs 'fast')
+sobre series sintéticas (tendencia por tramos + estacionalidad + ruido), sin red.
+
+Uso:
+    python benchmarks/forecast_benchmark.py --series 5 --batch 200
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.forecasting import get_backend, fast_forecast_many, ProphetBackend
+from core.model_cache import ModelCache
+
+
+def synthetic_series(n_days=1500, seed=0):
+    """Serie diaria hábil con cambios de tendencia, estacionalidad semanal/anual y ruido."""
+    rng = np.random.default_rng(seed)
+    ds = pd.bdate_range('2018-01-01', periods=n_days)
+    slopes = np.repeat(rng.normal(0.05, 0.08, 6), int(np.ceil(n_days / 6)))[:n_days]
+    trend = 100 + np.cumsum(slopes)
+    days = ds.asi8 / (86400 * 1e9)
+    weekly = 0.5 * np.sin(2 * np.pi * days / 7)
+    yearly = 4 * np.sin(2 * np.pi * days / 365.25) + 2 * np.cos(4 * np.pi * days / 365.25)
+    y = trend + weekly + yearly + rng.normal(0, 1.0, n_days)
+    return pd.DataFrame({'ds': ds, 'y': y})
+
+
+def _errors(actual, forecast):
+    merged = actual.merge(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']], on='ds')
+    err = merged['y'] - merged['yhat']
+    coverage = ((merged['y'] >= merged['yhat_lower']) & (merged['y'] <= merged['yhat_upper'])).mean()
+    return {
+        'mae': np.abs(err).mean(),
+        'mape_%': (np.abs(err) / merged['y'].abs()).mean() * 100,
+        'cobertura_%': coverage * 100,
+    }
+
+
+def run(n_series=5, horizon=30, batch=200, backends=('fast', 'prophet')):
+    rows = []
+    for seed in range(n_series):
+        data = synthetic_series(seed=seed)
+        train, test = data.iloc[:-horizon], data.iloc[-horizon:]
+        for name in backends:
+            # Caché vacía para medir ajustes en frío de Prophet
+            engine = ProphetBackend(ModelCache(tempfile.mkdtemp())) if name == 'prophet' else get_backend(name)
+            start = time.perf_counter()
+            _, forecast = engine.fit_predict(train, periods=int(horizon * 1.5), changepoint_scale=0.05,
+                                             symbol=f"SYN{seed}")
+            elapsed = time.perf_counter() - start
+            rows.append({'motor': name, 'serie': seed, 'latencia_s': elapsed, **_errors(test, forecast)})
+
+    results = pd.DataFrame(rows)
+    print("\n=== Precisión y latencia por motor (promedio) ===")
+    print(results.groupby('motor')[['latencia_s', 'mae', 'mape_%', 'cobertura_%']].mean().to_string())
+
+    if batch:
+        panel = np.column_stack([synthetic_series(seed=1000 + i)['y'].to_numpy() for i in range(batch)])
+        ds = synthetic_series()['ds']
+        start = time.perf_counter()
+        fast_forecast_many(ds, panel, periods=horizon)
+        elapsed = time.perf_counter() - start
+        print(f"\n=== Lote 'fast': {batch} series en {elapsed:.3f} s ({elapsed / batch * 1000:.2f} ms/serie) ===")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de motores de proyección.")
+    parser.add_argument('--series', type=int, default=5)
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--batch', type=int, default=200)
+    parser.add_argument('--backends', nargs='+', default=['fast', 'prophet'])
+    args = parser.parse_args()
+    run(args.series, args.horizon, args.batch, tuple(args.backends))
@@ -0,0 +1,90 @@
+# benchmarks/import_budget.py
+"""
+Control del tiempo de arranque en frío: importa cada punto de entrada en un
+intérprete nuevo, mide el tiempo de importación y verifica que la capa de
+cálculo no cargue los motores pesados (prophet, statsmodels, plotly).
+
+Sale con código distinto de 0 si algún objetivo supera su presupuesto o
+carga un módulo prohibido, para poder usarlo en CI.
+
+Uso:
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --scale 2.0   # máquinas lentas
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+
+HEAVY_MODULES = ('prophet', 'statsmodels', 'plotly', 'cmdstanpy', 'streamlit')
+
+# (nombre, módulos a importar, presupuesto en segundos, módulos pesados permitidos)
+TARGETS = (
+    ('compute', ['core.analysis', 'core.data_processing', 'core.indicators',
+                 'core.forecasting', 'core.api_client', 'core.risk', 'core.backtest',
+                 'core.levels', 'core.downsampling', 'core.stats',
+                 'core.covariance', 'core.history'], 2.0, ()),
+    # Lo que importa el dashboard de core (streamlit aparte)
+    ('dashboard', ['core.api_client', 'core.data_processing', 'core.indicators',
+                   'core.analysis', 'core.forecasting', 'core.downsampling',
+                   'core.levels', 'core.stats', 'core.figures', 'core.jobs',
+                   'core.history'], 2.0, ('plotly',)),
+    # El CLI de reportes y sus procesos worker importan el mismo módulo
+    ('report_cli', ['generate_report'], 3.0, ('plotly',)),
+)
+
+_PROBE = """
+import sys, time, json, importlib
+sys.path[:0] = {paths!r}
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+heavy = sorted({{m.split('.')[0] for m in sys.modules}} & set({heavy!r}))
+print(json.dumps({{'seconds': elapsed, 'heavy': heavy}}))
+"""
+
+
+def measure(modules, repeat=3):
+    """Importa 'modules' en intérpretes nuevos; devuelve (mejor tiempo, módulos pesados cargados)."""
+    paths = [project_root, os.path.join(project_root, 'reports')]
+    code = _PROBE.format(paths=paths, modules=list(modules), heavy=list(HEAVY_MODULES))
+    best, heavy = float('inf'), []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        best = min(best, result['seconds'])
+        heavy = result['heavy']
+    return best, heavy
+
+
+def run(scale=1.0, repeat=3):
+    failures = []
+    print(f"{'objetivo':<12} {'tiempo (s)':>10} {'límite (s)':>10}  pesados")
+    for name, modules, budget, allowed in TARGETS:
+        seconds, heavy = measure(modules, repeat)
+        limit = budget * scale
+        forbidden = [m for m in heavy if m not in allowed]
+        print(f"{name:<12} {seconds:>10.3f} {limit:>10.2f}  {', '.join(heavy) or '-'}")
+        if seconds > limit:
+            failures.append(f"{name}: {seconds:.3f} s > {limit:.2f} s")
+        if forbidden:
+            failures.append(f"{name}: carga {', '.join(forbidden)} al importar")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Presupuesto de tiempo de importación en frío.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplica todos los presupuestos.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por objetivo (se toma la mejor).")
+    args = parser.parse_args()
+
+    failures = run(args.scale, args.repeat)
+    if failures:
+        print("\nFALLÓ:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK")
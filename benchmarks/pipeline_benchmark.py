@@ -0,0 +1,255 @@
+# benchmarks/pipeline_benchmark.py
+"""
+Benchmark del pipeline completo sobre datos sintéticos (sin red).
+
+Para cada escenario (símbolos x barras) mide cada etapa por separado:
+rendimientos, indicadores, estadísticas (e intervalos bootstrap),
+soportes/resistencias, covarianzas del panel, descomposición y proyección.
+Se guarda el mejor tiempo de varias repeticiones y el pico de memoria
+(tracemalloc) de una corrida aparte, después de una corrida de
+calentamiento (imports perezosos, cachés).
+
+Con --baseline compara contra un resultado guardado y sale con código 1 si
+alguna etapa es más lenta o usa más memoria que la tolerancia, o si no
+figura en la línea base. Las líneas base dependen de la máquina:
+regenerarlas con --save-baseline en la máquina de referencia (con --stage
+solo se reemplazan esas etapas). Una etapa nueva o modificada debe
+actualizar la línea base en el mismo cambio.
+
+Uso:
+    python benchmarks/pipeline_benchmark.py --suite quick
+    python benchmarks/pipeline_benchmark.py --suite quick --baseline benchmarks/baselines/quick.json
+    python benchmarks/pipeline_benchmark.py --suite quick --stage ledoit_wolf --save-baseline
+    python benchmarks/pipeline_benchmark.py --suite full --prophet --output resultados.json
+"""
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_ohlcv, synthetic_panel
+from core.data_processing import calculate_returns
+from core.indicators import compute_indicators
+from core.analysis import (
+    add_moving_averages,
+    add_bollinger_bands,
+    get_descriptive_stats,
+    find_support_resistance,
+    get_series_decomposition,
+    forecast_series,
+    run_prophet_forecast,
+)
+from core.levels import find_key_levels
+from core.stats import bootstrap_stats
+from core.covariance import pairwise_covariance, ewma_covariance, ledoit_wolf
+from core.history import SymbolHistory
+from core.forecasting import fast_forecast_frame
+
+# Escenarios (símbolos, barras) de cada suite
+SUITES = {
+    'quick': [(1, 1_000), (1, 10_000), (100, 2_520)],
+    'full': [(1, 1_000), (1, 10_000), (1, 100_000), (1, 1_000_000),
+             (10, 10_000), (100, 5_000), (1000, 2_520)],
+}
+
+# Límites para las etapas caras (en barras por serie / celdas del panel)
+MAX_FORECAST_BARS = 100_000
+MAX_PROPHET_BARS = 10_000
+MAX_BOOTSTRAP_BARS = 100_000
+MAX_PANEL_FORECAST_CELLS = 5_000_000
+
+INDICATORS = dict(sma=(20, 50), ema=(12, 26), bollinger=(20,), atr=(14,), rsi=(14,))
+DEFAULT_BASELINE_DIR = os.path.join(current_dir, 'baselines')
+
+
+def single_stages(n_bars, seed=0, prophet=False):
+    """Etapas de un símbolo: lista de (nombre, función sin argumentos)."""
+    df = synthetic_ohlcv(n_bars, seed=seed)
+    returns = calculate_returns(df)
+    history = SymbolHistory.build(df)
+    # Un año a mitad del historial: el corte no debe depender del largo total
+    middle = df.index[n_bars // 2]
+    stages = [
+        ('calculate_returns', lambda: calculate_returns(df)),
+        ('compute_indicators', lambda: compute_indicators(df['adjusted close'], df['high'], df['low'], **INDICATORS)),
+        ('add_moving_averages', lambda: add_moving_averages(df)),
+        ('add_bollinger_bands', lambda: add_bollinger_bands(df)),
+        ('get_descriptive_stats', lambda: get_descriptive_stats(returns['log_return'])),
+        ('find_support_resistance', lambda: find_support_resistance(df, prominence=5)),
+        ('find_key_levels', lambda: find_key_levels(df, prominence=(1, 5))),
+        ('get_series_decomposition', lambda: get_series_decomposition(df)),
+        ('history_build', lambda: SymbolHistory.build(df)),
+        ('history_window', lambda: history.window(middle, middle + pd.Timedelta(days=365))),
+    ]
+    if n_bars <= MAX_BOOTSTRAP_BARS:
+        stages.append(('bootstrap_stats', lambda: bootstrap_stats(returns['log_return'], n_resamples=1000, seed=0)))
+    if n_bars <= MAX_FORECAST_BARS:
+        stages.append(('forecast_fast', lambda: forecast_series(df, periods=30, backend='fast')))
+    if prophet and n_bars <= MAX_PROPHET_BARS:
+        from core.model_cache import ModelCache
+
+        # Caché vacía en cada corrida: se mide el ajuste en frío
+        stages.append(('run_prophet_forecast',
+                       lambda: run_prophet_forecast(df, periods=30, symbol='SYN',
+                                                    cache=ModelCache(tempfile.mkdtemp()))))
+    return stages
+
+
+def panel_stages(n_symbols, n_bars, seed=0):
+    """Etapas de un panel de muchos símbolos."""
+    panel = synthetic_panel(n_symbols, n_bars, seed=seed)
+    returns = calculate_returns(panel)
+    stages = [
+        ('calculate_returns', lambda: calculate_returns(panel)),
+        ('compute_indicators', lambda: compute_indicators(panel['adjusted close'], panel['high'], panel['low'],
+                                                          **INDICATORS)),
+        ('get_descriptive_stats', lambda: get_descriptive_stats(returns)),
+        ('find_support_resistance', lambda: find_support_resistance(panel, prominence=5)),
+        ('find_key_levels', lambda: find_key_levels(panel, prominence=(1, 5))),
+        ('pairwise_covariance', lambda: pairwise_covariance(returns)),
+        ('ewma_covariance', lambda: ewma_covariance(returns)),
+        ('ledoit_wolf', lambda: ledoit_wolf(returns)),
+    ]
+    if n_symbols * n_bars <= MAX_PANEL_FORECAST_CELLS:
+        prices = panel.frame('adjusted close')
+        stages.append(('forecast_fast', lambda: fast_forecast_frame(prices, periods=30)))
+    return stages
+
+
+def measure(fn, repeat=3):
+    """(mejor tiempo en s, pico de memoria en MB) de 'fn'."""
+    fn()  # calentamiento
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best, peak / 2 ** 20
+
+
+def run(suite='quick', repeat=3, prophet=False, only=None):
+    results = {}
+    for n_symbols, n_bars in SUITES[suite]:
+        scenario = f"{n_symbols}x{n_bars}"
+        stages = single_stages(n_bars, prophet=prophet) if n_symbols == 1 else panel_stages(n_symbols, n_bars)
+        results[scenario] = {}
+        for name, fn in stages:
+            if only and name not in only:
+                continue
+            seconds, peak_mb = measure(fn, repeat)
+            results[scenario][name] = {'time_s': round(seconds, 6), 'peak_mb': round(peak_mb, 3)}
+            print(f"{scenario:<12} {name:<26} {seconds * 1000:>10.2f} ms {peak_mb:>10.2f} MB", flush=True)
+    return {
+        'meta': {
+            'suite': suite,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, time_tolerance=0.25, memory_tolerance=0.25, min_time=0.005):
+    """
+    Lista de regresiones: etapas más lentas que baseline * (1 + time_tolerance)
+    (ignorando diferencias menores a 'min_time' s) o con más pico de memoria
+    que baseline * (1 + memory_tolerance).
+    """
+    regressions = []
+    for scenario, stages in current['results'].items():
+        for name, now in stages.items():
+            before = baseline['results'].get(scenario, {}).get(name)
+            if before is None:
+                continue
+            slower = now['time_s'] - before['time_s']
+            if now['time_s'] > before['time_s'] * (1 + time_tolerance) and slower > min_time:
+                regressions.append(f"{scenario} {name}: {before['time_s'] * 1000:.2f} ms -> "
+                                   f"{now['time_s'] * 1000:.2f} ms")
+            if now['peak_mb'] > before['peak_mb'] * (1 + memory_tolerance) and now['peak_mb'] - before['peak_mb'] > 1:
+                regressions.append(f"{scenario} {name}: {before['peak_mb']:.2f} MB -> {now['peak_mb']:.2f} MB")
+    return regressions
+
+
+def missing_stages(current, baseline):
+    """Etapas medidas que no figuran en la línea base (no se pueden comparar)."""
+    return [f"{scenario} {name}" for scenario, stages in current['results'].items()
+            for name in stages if name not in baseline['results'].get(scenario, {})]
+
+
+def merge_results(previous, current):
+    """'previous' con las etapas de 'current' reemplazadas (para guardar una corrida con --stage)."""
+    results = {scenario: dict(stages) for scenario, stages in previous['results'].items()}
+    for scenario, stages in current['results'].items():
+        results.setdefault(scenario, {}).update(stages)
+    return {'meta': current['meta'], 'results': results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline sobre datos sintéticos.")
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick')
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones por etapa (se toma la mejor).")
+    parser.add_argument('--prophet', action='store_true', help="Incluye run_prophet_forecast (lento).")
+    parser.add_argument('--stage', action='append', help="Solo estas etapas (se puede repetir).")
+    parser.add_argument('--output', help="Guarda los resultados en este JSON.")
+    parser.add_argument('--baseline', help="JSON de referencia para detectar regresiones.")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Guarda el resultado como línea base de la suite (benchmarks/baselines/).")
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    parser.add_argument('--min-time', type=float, default=0.005,
+                        help="Diferencias menores (en s) no cuentan como regresión.")
+    args = parser.parse_args()
+
+    current = run(args.suite, args.repeat, args.prophet, args.stage)
+
+    saves = [(args.output, current)] if args.output else []
+    if args.save_baseline:
+        path = os.path.join(DEFAULT_BASELINE_DIR, f"{args.suite}.json")
+        if args.stage and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                saves.append((path, merge_results(json.load(f), current)))
+        else:
+            saves.append((path, current))
+    for path, results in saves:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados guardados en {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.time_tolerance, args.memory_tolerance, args.min_time)
+        missing = missing_stages(current, baseline)
+        if regressions:
+            print("\nREGRESIONES:\n  " + "\n  ".join(regressions))
+        if missing:
+            print("\nSIN LÍNEA BASE (regenerarla con --save-baseline):\n  " + "\n  ".join(missing))
+        if regressions or missing:
+            sys.exit(1)
+        print("\nSin regresiones respecto de la línea base.")
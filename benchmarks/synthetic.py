@@ -0,0 +1,91 @@
+# benchmarks/synthetic.py
+"""
+Generador sintético y reproducible de datos OHLCV (sin red).
+
+Los precios siguen un movimiento browniano geométrico con saltos de Poisson
+(Merton). Sobre el cierre se arman apertura, máximo y mínimo coherentes
+(low <= open, close <= high), un volumen log-normal que crece con el tamaño
+del movimiento y un 'adjusted close' con dividendos trimestrales.
+"""
+import numpy as np
+import pandas as pd
+
+from core.panel import PricePanel
+
+# Última barra diaria hábil que cabe en un DatetimeIndex (ns) desde 1980
+_MAX_DAILY_BARS = 70_000
+# Barras por año según la frecuencia (minutos de una sesión de 6.5 h)
+_BARS_PER_YEAR = {'B': 252, 'min': 252 * 390}
+
+
+def _resolve_freq(n_bars, freq):
+    # Más barras de las que caben en días hábiles: se pasa a barras de 1 minuto
+    return freq or ('B' if n_bars <= _MAX_DAILY_BARS else 'min')
+
+
+def _index(n_bars, start, freq):
+    if freq == 'B':
+        return pd.bdate_range(start, periods=n_bars, name='Date')
+    return pd.date_range(start, periods=n_bars, freq=freq, name='Date')
+
+
+def synthetic_ohlcv_arrays(n_bars, n_symbols=1, seed=0, mu=0.07, sigma=0.25, jump_intensity=2.0,
+                           jump_mean=-0.02, jump_std=0.06, dividend_yield=0.015, bars_per_year=252):
+    """
+    Genera los campos OHLCV como arreglos (n_bars, n_symbols) de float64.
+    mu, sigma y dividend_yield son anuales; jump_intensity es saltos por año.
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / bars_per_year
+    shape = (n_bars, n_symbols)
+
+    # Cada símbolo con su propia volatilidad alrededor de 'sigma'
+    vol = sigma * rng.uniform(0.6, 1.6, n_symbols)
+    drift = (mu - 0.5 * vol ** 2) * dt
+    log_ret = drift + vol * np.sqrt(dt) * rng.standard_normal(shape)
+    jumps = rng.poisson(jump_intensity * dt, shape)
+    log_ret += jumps * jump_mean + np.sqrt(jumps) * jump_std * rng.standard_normal(shape)
+    log_ret[0] = 0.0
+
+    start_price = rng.uniform(10, 500, n_symbols)
+    close = start_price * np.exp(np.cumsum(log_ret, axis=0))
+
+    # Apertura: el cierre anterior con un pequeño gap; máximos y mínimos envuelven ambos
+    gap = rng.normal(0, 0.1 * vol * np.sqrt(dt), shape)
+    open_ = np.vstack([close[:1], close[:-1]]) * np.exp(gap)
+    spread = np.abs(rng.normal(0, 0.5 * vol * np.sqrt(dt), (2,) + shape))
+    high = np.maximum(open_, close) * np.exp(spread[0])
+    low = np.minimum(open_, close) * np.exp(-spread[1])
+
+    volume = np.round(rng.lognormal(13, 0.4, shape) * (1 + 20 * np.abs(log_ret)))
+
+    # Dividendos trimestrales: el 'adjusted close' descuenta los pagos posteriores
+    quarter = max(bars_per_year // 4, 1)
+    paid = (np.arange(n_bars) % quarter == quarter - 1)[:, None] * (dividend_yield / 4)
+    factor = np.exp(-np.cumsum(paid[::-1], axis=0)[::-1] + paid)
+    adjusted = close * factor
+
+    return {'open': open_, 'high': high, 'low': low, 'close': close,
+            'adjusted close': adjusted, 'volume': volume}
+
+
+def synthetic_ohlcv(n_bars=2520, seed=0, start='1980-01-01', freq=None, **kwargs):
+    """
+    DataFrame OHLCV de un símbolo con DatetimeIndex (columnas como
+    get_daily_data). Hasta 70k barras son días hábiles; más allá, minutos
+    (con la volatilidad escalada a barras de un minuto).
+    """
+    freq = _resolve_freq(n_bars, freq)
+    kwargs.setdefault('bars_per_year', _BARS_PER_YEAR.get(freq, 252))
+    fields = synthetic_ohlcv_arrays(n_bars, 1, seed, **kwargs)
+    return pd.DataFrame({name: values[:, 0] for name, values in fields.items()},
+                        index=_index(n_bars, start, freq))
+
+
+def synthetic_panel(n_symbols=10, n_bars=2520, seed=0, start='1980-01-01', freq=None, **kwargs):
+    """PricePanel de 'n_symbols' símbolos sintéticos (SYN0000, SYN0001, ...)."""
+    freq = _resolve_freq(n_bars, freq)
+    kwargs.setdefault('bars_per_year', _BARS_PER_YEAR.get(freq, 252))
+    fields = synthetic_ohlcv_arrays(n_bars, n_symbols, seed, **kwargs)
+    symbols = [f"SYN{i:04d}" for i in range(n_symbols)]
+    return PricePanel(_index(n_bars, start, freq), symbols, fields)
@@ -1,51 +1,105 @@
 # core/analysis.py
+"""
+Capa de cálculo (sin gráficos): todas las funciones devuelven arreglos o
+DataFrames. Los motores pesados (statsmodels, Prophet, scipy.signal) se
+importan en el primer uso, para que un proceso batch que solo necesita
+get_descriptive_stats no pague su tiempo de importación ni su memoria.
+Los gráficos de Plotly se construyen en core/figures.py.
+"""
 import pandas as pd
 import numpy as np
-from scipy.signal import find_peaks
 
-# --- IMPORTACIONES ---
-from statsmodels.tsa.seasonal import seasonal_decompose
-from prophet import Prophet
-from prophet.plot import plot_plotly, plot_components_plotly # <--- MODIFICADO
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
-# --- FIN IMPORTACIONES ---
-
-# ... (El resto de tus funciones: add_moving_averages, get_descriptive_stats, etc. quedan igual) ...
-# ... (Asegúrate de copiar también las funciones add_bollinger_bands y find_support_resistance) ...
+from core.panel import PricePanel
+from core.indicators import compute_indicators
+from core.instrumentation import instrument
+from core.stats import ANNUAL_FACTOR, descriptive_stats, skew_kurtosis
 
 def add_moving_averages(df, short_window=20, long_window=50):
-    """Añade medias móviles simples (SMA)."""
-    df['SMA_short'] = df['adjusted close'].rolling(window=short_window).mean()
-    df['SMA_long'] = df['adjusted close'].rolling(window=long_window).mean()
+    """
+    Añade medias móviles simples (SMA). Con un PricePanel devuelve un panel nuevo.
+    Para varios indicadores a la vez, preferir compute_indicators (no modifica el DataFrame).
+    """
+    indicators = compute_indicators(df['adjusted close'], sma=(short_window, long_window), bollinger=())
+    if isinstance(df, PricePanel):
+        return df.with_fields({
+            'SMA_short': indicators[f'SMA_{short_window}'],
+            'SMA_long': indicators[f'SMA_{long_window}'],
+        })
+    df['SMA_short'] = indicators[f'SMA_{short_window}'][:, 0]
+    df['SMA_long'] = indicators[f'SMA_{long_window}'][:, 0]
     return df
 
 def add_bollinger_bands(df, window=20):
-    """Añade Bandas de Bollinger."""
-    df['BB_middle'] = df['adjusted close'].rolling(window=window).mean()
-    std_dev = df['adjusted close'].rolling(window=window).std()
-    df['BB_upper'] = df['BB_middle'] + (std_dev * 2)
-    df['BB_lower'] = df['BB_middle'] - (std_dev * 2)
+    """Añade Bandas de Bollinger. Con un PricePanel devuelve un panel nuevo."""
+    indicators = compute_indicators(df['adjusted close'], sma=(), bollinger=(window,))
+    bands = {
+        'BB_middle': indicators[f'BB_middle_{window}'],
+        'BB_upper': indicators[f'BB_upper_{window}'],
+        'BB_lower': indicators[f'BB_lower_{window}'],
+    }
+    if isinstance(df, PricePanel):
+        return df.with_fields(bands)
+    for name, values in bands.items():
+        df[name] = values[:, 0]
     return df
 
-def get_descriptive_stats(returns_series):
-    """Genera un reporte estadístico avanzado."""
-    anual_factor = np.sqrt(252)
-    
+def _panel_descriptive_stats(panel):
+    """
+    Estadísticas de 'log_return' para todos los símbolos del panel (ignorando NaN).
+    Devuelve un DataFrame numérico (estadística x símbolo) con las mismas
+    definiciones que pandas (skew y kurtosis con corrección de sesgo).
+    """
+    x = np.asarray(panel['log_return'], dtype=np.float64)
+    n = np.sum(~np.isnan(x), axis=0).astype(np.float64)
+    mean = np.nanmean(x, axis=0)
+    dev = x - mean
+    m2 = np.nanmean(dev ** 2, axis=0)
+    m3 = np.nanmean(dev ** 3, axis=0)
+    m4 = np.nanmean(dev ** 4, axis=0)
+    skew, kurt = skew_kurtosis(n, m2, m3, m4)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(m2 * n / (n - 1))
+        sharpe = mean / std * ANNUAL_FACTOR
+
     stats = {
-        "Media (Diaria)": returns_series.mean(),
-        "Mediana": returns_series.median(),
-        "Desv. Estándar (Volatilidad Diaria)": returns_series.std(),
-        "Volatilidad Anualizada": returns_series.std() * anual_factor,
-        "Skewness (Asimetría)": returns_series.skew(),
-        "Kurtosis (Curtosis)": returns_series.kurtosis(),
-        "Sharpe Ratio (Anualizado)": (returns_series.mean() / returns_series.std()) * anual_factor
+        "Media (Diaria)": mean,
+        "Mediana": np.nanmedian(x, axis=0),
+        "Desv. Estándar (Volatilidad Diaria)": std,
+        "Volatilidad Anualizada": std * ANNUAL_FACTOR,
+        "Skewness (Asimetría)": skew,
+        "Kurtosis (Curtosis)": kurt,
+        "Sharpe Ratio (Anualizado)": sharpe
     }
+    return pd.DataFrame(stats, index=panel.symbols).T
+
+@instrument()
+def get_descriptive_stats(returns_series):
+    """
+    Genera un reporte estadístico avanzado (valores formateados como texto).
+    Con un PricePanel devuelve un DataFrame numérico (estadística x símbolo).
+    Para valores numéricos e intervalos de confianza ver core.stats
+    (descriptive_stats y bootstrap_stats).
+    """
+    if isinstance(returns_series, PricePanel):
+        return _panel_descriptive_stats(returns_series)
+
+    stats = descriptive_stats(returns_series)
     stats_formatted = {key: f"{value:.6f}" for key, value in stats.items()}
     return stats_formatted
 
+@instrument()
 def find_support_resistance(df, prominence=1):
-    """Encuentra niveles de soporte y resistencia usando picos y valles."""
+    """
+    Encuentra niveles de soporte y resistencia usando picos y valles.
+    Con un PricePanel devuelve un dict {símbolo: (soportes, resistencias)}.
+    Devuelve todos los picos; para zonas agrupadas y puntuadas, ver
+    core.levels.find_key_levels.
+    """
+    if isinstance(df, PricePanel):
+        return {s: find_support_resistance(df.to_frame(s), prominence) for s in df.symbols}
+
+    from scipy.signal import find_peaks
+
     lows = df['low']
     highs = df['high']
     
@@ -58,60 +112,74 @@ def find_support_resistance(df, prominence=1):
     return support_levels, resistance_levels
 
 
-# --- FUNCIONES DE ANÁLISIS DE SERIES Y PROYECCIÓN (ACTUALIZADAS) ---
+# --- FUNCIONES DE ANÁLISIS DE SERIES Y PROYECCIÓN ---
 
-def get_series_decomposition(df_series):
+@instrument()
+def decompose_series(df_series):
     """
-    Analiza y grafica la descomposición de la serie de tiempo (Tendencia, Estacionalidad, Residual).
+    Descomposición aditiva de la serie de tiempo (Tendencia, Estacionalidad, Residual).
+    Devuelve un DataFrame con las columnas observed, trend, seasonal y resid.
     """
-    series = df_series['adjusted close'].resample('D').median().fillna(method='ffill')
+    from statsmodels.tsa.seasonal import seasonal_decompose
+
+    series = df_series['adjusted close'].resample('D').median().ffill()
     periodo = 365 if len(series) > 730 else 30
     
     decomposition = seasonal_decompose(series, model='additive', period=periodo)
+    return pd.DataFrame({
+        'observed': decomposition.observed,
+        'trend': decomposition.trend,
+        'seasonal': decomposition.seasonal,
+        'resid': decomposition.resid,
+    })
+
+
+@instrument()
+def forecast_series(df, periods=30, changepoint_scale=0.05, symbol=None, backend='prophet'):
+    """
+    Proyecta 'adjusted close' con el motor elegido ('prophet' o 'fast').
+    Devuelve (df_prophet, forecast, model): los datos de entrenamiento (ds, y),
+    el DataFrame de proyección (ds, yhat, yhat_lower, yhat_upper, ...) y el
+    modelo ajustado (None si el motor no expone uno).
+    """
+    from core.forecasting import get_backend
+
+    # El índice de fechas pasa a 'ds' y el precio ajustado a 'y'
+    df_prophet = pd.DataFrame({'ds': df.index, 'y': df['adjusted close'].to_numpy()})
+    engine = get_backend(backend)
+    model, forecast = engine.fit_predict(df_prophet, periods, changepoint_scale, symbol=symbol)
+    return df_prophet, forecast, model
 
-    fig = make_subplots(rows=4, cols=1,
-                        subplot_titles=('Observado', 'Tendencia', 'Estacionalidad', 'Residual'))
-    
-    fig.add_trace(go.Scatter(x=decomposition.observed.index, y=decomposition.observed, mode='lines', name='Observado'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=decomposition.trend.index, y=decomposition.trend, mode='lines', name='Tendencia'), row=2, col=1)
-    fig.add_trace(go.Scatter(x=decomposition.seasonal.index, y=decomposition.seasonal, mode='lines', name='Estacionalidad'), row=3, col=1)
-    fig.add_trace(go.Scatter(x=decomposition.resid.index, y=decomposition.resid, mode='markers', name='Residual'), row=4, col=1)
-    
-    fig.update_layout(height=700, title_text="Descomposición de la Serie de Tiempo", showlegend=False)
-    return fig
 
+# --- Compatibilidad: versiones que devuelven gráficos (ver core/figures.py) ---
+
+def get_series_decomposition(df_series):
+    """Analiza y grafica la descomposición de la serie de tiempo."""
+    from core.figures import decomposition_figure
 
-def run_prophet_forecast(df, periods=30, changepoint_scale=0.05): # <--- NUEVO ARGUMENTO
+    return decomposition_figure(decompose_series(df_series))
+
+
+def run_forecast(df, periods=30, changepoint_scale=0.05, symbol=None, backend='prophet'):
     """
-    Entrena un modelo Prophet y devuelve dos gráficos de Plotly:
+    Entrena el motor de proyección elegido ('prophet' o 'fast') y devuelve dos gráficos de Plotly:
     1. La proyección.
     2. Los componentes del modelo.
     """
-    # El índice de yfinance se llama 'Date'. Lo convertimos a 'ds'.
-    df_prophet = df.reset_index().rename(columns={'Date': 'ds', 'adjusted close': 'y'})
-    
-    # Instanciar y entrenar el modelo
-    model = Prophet(daily_seasonality=False, 
-                    weekly_seasonality=True, 
-                    yearly_seasonality=True,
-                    changepoint_prior_scale=changepoint_scale) # <--- APLICAMOS EL ARGUMENTO
-    
-    # --- MEJORA: AÑADIR FERIADOS ---
-    model.add_country_holidays(country_name='US')
-    
-    model.fit(df_prophet)
+    from core.forecasting import get_backend
+    from core.figures import forecast_figures
 
-    # Crear dataframe futuro y predecir
-    future = model.make_future_dataframe(periods=periods)
-    forecast = model.predict(future)
+    engine = get_backend(backend)
+    df_prophet, forecast, model = forecast_series(df, periods, changepoint_scale, symbol, engine)
+    return forecast_figures(df_prophet, forecast, periods, engine.label, model)
 
-    # Generar el gráfico de Proyección
-    fig_forecast = plot_plotly(model, forecast)
-    fig_forecast.update_layout(title=f'Proyección a {periods} días con Prophet',
-                               xaxis_title='Fecha', yaxis_title='Precio (Proyectado)')
-    
-    # --- MEJORA: GENERAR GRÁFICO DE COMPONENTES ---
-    fig_components = plot_components_plotly(model, forecast)
-    fig_components.update_layout(title='Componentes del Modelo Prophet')
 
-    return fig_forecast, fig_components
+def run_prophet_forecast(df, periods=30, changepoint_scale=0.05, symbol=None, cache=None):
+    """
+    Proyección con Prophet (ver run_forecast). El modelo ajustado se reutiliza
+    desde la caché (memoria/disco) si el símbolo, el tramo de datos y los
+    hiperparámetros no cambiaron.
+    """
+    from core.forecasting import ProphetBackend
+
+    return run_forecast(df, periods, changepoint_scale, symbol=symbol, backend=ProphetBackend(cache))
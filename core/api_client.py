@@ -1,54 +1,95 @@
 # core/api_client.py
-import yfinance as yf
+import time
+import random
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
-def get_daily_data(symbol):
+from core.data_store import OHLCVStore, get_default_store
+from core.instrumentation import instrument
+
+def _resolve_store(store, provider):
+    """Devuelve el almacén a usar (el compartido si no se especifica otro)."""
+    if store is not None:
+        return store
+    return OHLCVStore(provider=provider) if provider is not None else get_default_store()
+
+@instrument()
+def get_daily_data(symbol, store=None, provider=None):
     """
-    Obtiene los datos diarios (ajustados) para un símbolo de acción usando yfinance.
-    Esta versión es robusta y maneja el caso de que 'Adj Close' no esté presente.
+    Obtiene los datos diarios (ajustados) para un símbolo de acción.
+    Los datos se sirven desde el almacén local (Parquet) y solo se descargan
+    las barras nuevas desde el proveedor (yfinance por defecto).
+    Se puede pasar otro 'store' o un 'provider' (por ejemplo, uno local sin red).
     """
     try:
-        ticker = yf.Ticker(symbol)
-        
-        # period="max" obtiene todo el historial
-        # auto_adjust=False para que nos dé 'Adj Close' por separado
-        data = ticker.history(period="max", auto_adjust=False)
-        
+        data = _resolve_store(store, provider).get(symbol)
+
         if data.empty:
-            print(f"No se encontraron datos para {symbol} usando yfinance.")
+            print(f"No se encontraron datos para {symbol}.")
             return pd.DataFrame()
 
-        # Renombramos las columnas estándar
-        data.rename(columns={
-            'Open': 'open',
-            'High': 'high',
-            'Low': 'low',
-            'Close': 'close',
-            'Adj Close': 'adjusted close', # Intentamos renombrar 'Adj Close'
-            'Volume': 'volume'
-        }, inplace=True)
-        
-        
-        # --- INICIO DE LA CORRECCIÓN ---
-        # Verificamos si 'adjusted close' existe después del renombramiento.
-        # Si no existe (porque yfinance no envió 'Adj Close'), la creamos
-        # usando la columna 'close' como fallback.
-        if 'adjusted close' not in data.columns and 'close' in data.columns:
-            print(f"Advertencia: 'Adj Close' no encontrado para {symbol}. Usando 'close' como 'adjusted close'.")
-            data['adjusted close'] = data['close']
-        # --- FIN DE LA CORRECCIÓN ---
-            
-
-        # El índice (Date) ya es un datetime, así que no hay que convertirlo
-        
-        # Filtramos para devolver solo las columnas que usamos
-        cols_necesarias = ['open', 'high', 'low', 'close', 'adjusted close', 'volume']
-        
-        # Devolvemos solo las columnas que existen en el dataframe
-        cols_a_devolver = [col for col in cols_necesarias if col in data.columns]
-        
-        return data[cols_a_devolver]
+        return data
 
     except Exception as e:
-        print(f"Error al obtener datos para {symbol} con yfinance: {e}")
+        print(f"Error al obtener datos para {symbol}: {e}")
+        return pd.DataFrame()
+
+def _fetch_with_retry(store, symbol, retries, backoff):
+    """
+    Descarga un símbolo reintentando con backoff exponencial (con jitter).
+    Un resultado vacío también se reintenta: es la falla típica de yfinance
+    cuando limita las peticiones. Si sigue vacío al agotar los intentos, se devuelve vacío.
+    """
+    for attempt in range(retries + 1):
+        try:
+            data = store.get(symbol)
+        except Exception:
+            if attempt == retries:
+                raise
+        else:
+            if not data.empty or attempt == retries:
+                return data
+        time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+def to_panel(frames):
+    """
+    Une un dict {símbolo: DataFrame} en un único panel alineado por fecha,
+    con columnas MultiIndex (campo, símbolo). Ej.: panel['adjusted close'].
+    """
+    if not frames:
         return pd.DataFrame()
+    panel = pd.concat(frames, axis=1, names=['symbol', 'field'])
+    return panel.swaplevel(axis=1).sort_index(axis=1)
+
+@instrument()
+def get_daily_data_many(symbols, store=None, provider=None, max_workers=8,
+                        retries=2, backoff=0.5, as_panel=False):
+    """
+    Obtiene los datos diarios de muchos símbolos en paralelo (pool de hilos).
+    El número de descargas simultáneas contra el proveedor está limitado por
+    su 'max_concurrency'; cada símbolo se reintenta con backoff exponencial.
+
+    Devuelve (datos, errores):
+      - datos: dict {símbolo: DataFrame}, o un panel MultiIndex si as_panel=True.
+      - errores: dict {símbolo: mensaje} con los símbolos que fallaron o vinieron vacíos.
+    """
+    store = _resolve_store(store, provider)
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {s: executor.submit(_fetch_with_retry, store, s, retries, backoff) for s in symbols}
+        for symbol, future in futures.items():
+            try:
+                data = future.result()
+            except Exception as e:
+                errors[symbol] = f"{type(e).__name__}: {e}"
+                continue
+            if data.empty:
+                errors[symbol] = "No se encontraron datos."
+            else:
+                results[symbol] = data
+
+    if as_panel:
+        return to_panel(results), errors
+    return results, errors
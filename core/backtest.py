@@ -0,0 +1,186 @@
+# core/backtest.py
+"""
+Backtesting del VaR histórico móvil a un día.
+
+El cuantil y el ES de cada ventana se obtienen de una ventana ordenada que se
+actualiza de forma incremental (búsqueda binaria para insertar y quitar), en
+lugar de re-ordenar la ventana completa en cada fecha como rolling().quantile().
+Cada actualización desplaza la lista (O(w), un memmove en C), lo que para
+ventanas del orden de 250 barras cuesta mucho menos que un ordenamiento.
+Sobre las excepciones resultantes se calculan los tests de Kupiec (POF) y
+Christoffersen (independencia y cobertura condicional).
+"""
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.special import xlogy, chdtrc
+
+from core.panel import PricePanel
+from core.instrumentation import instrument
+
+
+class SortedWindow:
+    """
+    Ventana deslizante mantenida ordenada en una lista. Las búsquedas son
+    O(log w); insertar y quitar desplazan la lista (O(w)) y tail_mean suma
+    la cola (O(k)).
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.sorted = []
+
+    def replace(self, old, new):
+        """Quita 'old' (si no es None) e inserta 'new'."""
+        if old is not None:
+            del self.sorted[bisect_left(self.sorted, old)]
+        insort(self.sorted, new)
+
+    def quantile(self, q):
+        """Cuantil con interpolación lineal (igual que np.quantile)."""
+        pos = q * (len(self.sorted) - 1)
+        lo = int(pos)
+        frac = pos - lo
+        if frac == 0:
+            return self.sorted[lo]
+        return self.sorted[lo] + frac * (self.sorted[lo + 1] - self.sorted[lo])
+
+    def tail_mean(self, threshold):
+        """Media de los valores <= threshold (la cola izquierda)."""
+        k = bisect_left(self.sorted, threshold)
+        if k < len(self.sorted) and self.sorted[k] == threshold:
+            k += 1
+        k = max(k, 1)
+        return sum(self.sorted[:k]) / k
+
+
+def rolling_var(log_returns, window=250, confidence_levels=(0.95, 0.99)):
+    """
+    VaR y ES históricos a un día para cada fecha, usando solo los 'window'
+    rendimientos anteriores (sin mirar el rendimiento del propio día).
+
+    Devuelve dos arreglos (n, n_niveles) con pérdidas positivas en log-rendimiento;
+    las primeras 'window' fechas quedan en NaN.
+    """
+    values = np.asarray(log_returns, dtype=np.float64)
+    alphas = [1 - c for c in confidence_levels]
+    var = np.full((len(values), len(alphas)), np.nan)
+    es = np.full((len(values), len(alphas)), np.nan)
+
+    sw = SortedWindow(window)
+    for t in range(len(values)):
+        if t >= window:
+            for j, alpha in enumerate(alphas):
+                q = sw.quantile(alpha)
+                var[t, j] = -q
+                es[t, j] = -sw.tail_mean(q)
+        old = values[t - window] if t >= window else None
+        sw.replace(old, values[t])
+    return var, es
+
+
+def kupiec_pof(exceptions, alpha):
+    """Test de proporción de fallas de Kupiec. Devuelve (LR, p-valor)."""
+    exceptions = np.asarray(exceptions, dtype=bool)
+    n, x = len(exceptions), int(exceptions.sum())
+    if n == 0:
+        return np.nan, np.nan
+    rate = x / n
+    log_null = xlogy(n - x, 1 - alpha) + xlogy(x, alpha)
+    log_alt = xlogy(n - x, 1 - rate) + xlogy(x, rate)
+    lr = -2 * (log_null - log_alt)
+    return lr, chdtrc(1, lr)
+
+
+def christoffersen_independence(exceptions):
+    """Test de independencia de Christoffersen (Markov de primer orden). Devuelve (LR, p-valor)."""
+    exceptions = np.asarray(exceptions, dtype=bool)
+    if len(exceptions) < 2:
+        return np.nan, np.nan
+    prev, curr = exceptions[:-1], exceptions[1:]
+    n00 = np.sum(~prev & ~curr)
+    n01 = np.sum(~prev & curr)
+    n10 = np.sum(prev & ~curr)
+    n11 = np.sum(prev & curr)
+    pi0 = n01 / (n00 + n01) if (n00 + n01) else 0.0
+    pi1 = n11 / (n10 + n11) if (n10 + n11) else 0.0
+    pi = (n01 + n11) / (n00 + n01 + n10 + n11)
+    log_null = xlogy(n00 + n10, 1 - pi) + xlogy(n01 + n11, pi)
+    log_alt = xlogy(n00, 1 - pi0) + xlogy(n01, pi0) + xlogy(n10, 1 - pi1) + xlogy(n11, pi1)
+    lr = -2 * (log_null - log_alt)
+    return lr, chdtrc(1, lr)
+
+
+def _backtest_series(args):
+    """Backtest de una serie (función de módulo para poder usarla en procesos)."""
+    symbol, log_returns, window, confidence_levels = args
+    var, es = rolling_var(log_returns, window, confidence_levels)
+    exceptions = log_returns[:, None] < -var
+
+    rows = []
+    for j, conf in enumerate(confidence_levels):
+        alpha = 1 - conf
+        tested = exceptions[window:, j]
+        pof_lr, pof_p = kupiec_pof(tested, alpha)
+        ind_lr, ind_p = christoffersen_independence(tested)
+        cc_lr = pof_lr + ind_lr
+        rows.append({
+            'symbol': symbol, 'confidence': conf,
+            'observaciones': len(tested), 'excepciones': int(tested.sum()),
+            'esperadas': alpha * len(tested),
+            'tasa': tested.mean() if len(tested) else np.nan,
+            'kupiec_lr': pof_lr, 'kupiec_p': pof_p,
+            'christoffersen_lr': ind_lr, 'christoffersen_p': ind_p,
+            'cc_lr': cc_lr, 'cc_p': chdtrc(2, cc_lr),
+        })
+    return symbol, var, es, exceptions, rows
+
+
+def _as_series_dict(returns):
+    """Normaliza la entrada a {símbolo: Series de log-rendimientos sin NaN}."""
+    if isinstance(returns, PricePanel):
+        returns = returns.frame('log_return')
+    if isinstance(returns, pd.Series):
+        returns = returns.to_frame(returns.name or 'serie')
+    return {col: returns[col].dropna() for col in returns.columns}
+
+
+@instrument()
+def backtest_var(returns, window=250, confidence_levels=(0.95, 0.99), max_workers=None):
+    """
+    Backtest del VaR histórico móvil a un día para uno o muchos símbolos.
+
+    'returns' puede ser la serie 'log_return' de calculate_returns, un
+    DataFrame fecha x símbolo o un PricePanel. Con max_workers > 1 los
+    símbolos se reparten en un pool de procesos.
+
+    Devuelve (rolling, summary):
+      - rolling: DataFrame con columnas (símbolo, confianza, 'VaR'/'ES'/'excepcion').
+      - summary: DataFrame con excepciones y los tests de Kupiec y Christoffersen.
+    """
+    series = _as_series_dict(returns)
+    confidence_levels = tuple(confidence_levels)
+    tasks = [(s, values.to_numpy(dtype=np.float64), window, confidence_levels)
+             for s, values in series.items() if len(values) > window]
+
+    if max_workers and max_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            outputs = list(executor.map(_backtest_series, tasks))
+    else:
+        outputs = [_backtest_series(task) for task in tasks]
+
+    frames, rows = {}, []
+    for symbol, var, es, exceptions, symbol_rows in outputs:
+        index = series[symbol].index
+        for j, conf in enumerate(confidence_levels):
+            frames[(symbol, conf, 'VaR')] = pd.Series(var[:, j], index=index)
+            frames[(symbol, conf, 'ES')] = pd.Series(es[:, j], index=index)
+            frames[(symbol, conf, 'excepcion')] = pd.Series(exceptions[:, j], index=index)
+        rows.extend(symbol_rows)
+
+    rolling = pd.DataFrame(frames)
+    summary = pd.DataFrame(rows)
+    if not summary.empty:
+        summary = summary.set_index(['symbol', 'confidence'])
+    return rolling, summary
@@ -0,0 +1,277 @@
+# core/covariance.py
+"""
+Covarianzas y correlaciones de muchos activos sobre los 'log_return' de
+calculate_returns (PricePanel, DataFrame fecha x símbolo o arreglo).
+
+Todo se resuelve con productos de matrices (BLAS), sin bucles por fecha:
+  - Muestral con datos pareados ("pairwise-complete", como DataFrame.cov):
+    cada par usa solo las fechas en que ambos cotizan. Con la máscara M de
+    datos válidos y X0 (NaN -> 0), los conteos, sumas y productos cruzados
+    de todos los pares son M'M, X0'M y X0'X0.
+  - Móvil: los mismos productos cruzados acumulados en el tiempo; cada
+    ventana es la diferencia de dos acumulados (en lotes con matmul).
+  - EWMA estilo RiskMetrics (media cero, lambda = 0.94): en lote con pesos
+    exponenciales, o incremental con EWMACovariance (una actualización de
+    rango 1, O(n²), por barra).
+  - Ledoit-Wolf: contracción hacia la identidad escalada, para universos
+    grandes (muchos activos frente a pocas fechas).
+"""
+import numpy as np
+import pandas as pd
+
+from core.panel import PricePanel
+from core.instrumentation import instrument
+
+RISKMETRICS_LAMBDA = 0.94
+
+
+def _as_returns(returns):
+    """(valores fecha x activo con NaN, fechas, símbolos) de la entrada."""
+    if isinstance(returns, PricePanel):
+        return np.asarray(returns['log_return'], dtype=np.float64), returns.dates, list(returns.symbols)
+    if isinstance(returns, pd.Series):
+        returns = returns.to_frame(returns.name or 'serie')
+    if isinstance(returns, pd.DataFrame):
+        return returns.to_numpy(dtype=np.float64, na_value=np.nan), returns.index, list(returns.columns)
+    values = np.asarray(returns, dtype=np.float64)
+    values = values[:, None] if values.ndim == 1 else values
+    return values, pd.RangeIndex(len(values)), list(range(values.shape[1]))
+
+
+def _masked(values):
+    """(X0, M): valores con NaN -> 0 y máscara de válidos como float (para BLAS)."""
+    valid = ~np.isnan(values)
+    return np.where(valid, values, 0.0), valid.astype(np.float64)
+
+
+def _pairwise_from_products(counts, sums, cross, min_periods):
+    """Covarianza muestral por pares a partir de conteos, sumas pareadas y productos cruzados."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (cross - sums * np.swapaxes(sums, -1, -2) / counts) / (counts - 1)
+    cov[counts < max(min_periods, 2)] = np.nan
+    return cov
+
+
+def covariance_to_correlation(cov):
+    """Correlación a partir de una matriz de covarianza (o DataFrame)."""
+    values = np.asarray(cov, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(np.diagonal(values, axis1=-2, axis2=-1))
+        corr = values / (std[..., :, None] * std[..., None, :])
+    if isinstance(cov, pd.DataFrame):
+        return pd.DataFrame(corr, index=cov.index, columns=cov.columns)
+    return corr
+
+
+@instrument()
+def pairwise_covariance(returns, min_periods=2):
+    """
+    Covarianza muestral (ddof=1) con datos pareados, igual que
+    DataFrame.cov(min_periods): los pares con menos de 'min_periods' fechas
+    en común quedan en NaN. Devuelve un DataFrame símbolo x símbolo.
+    """
+    values, _, symbols = _as_returns(returns)
+    if not np.isnan(values).any():
+        cov = np.atleast_2d(np.cov(values, rowvar=False))
+        if len(values) < max(min_periods, 2):
+            cov[:] = np.nan
+    else:
+        x0, mask = _masked(values)
+        cov = _pairwise_from_products(mask.T @ mask, x0.T @ mask, x0.T @ x0, min_periods)
+    return pd.DataFrame(cov, index=symbols, columns=symbols)
+
+
+@instrument()
+def pairwise_correlation(returns, min_periods=2):
+    """
+    Correlación con datos pareados, igual que DataFrame.corr(min_periods):
+    cada par usa las desviaciones de sus fechas en común.
+    """
+    values, _, symbols = _as_returns(returns)
+    x0, mask = _masked(values)
+    counts, sums = mask.T @ mask, x0.T @ mask
+    squares = (x0 * x0).T @ mask
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cross = x0.T @ x0 - sums * sums.T / counts
+        # Varianza de i en las fechas en que j también cotiza (y viceversa)
+        var_i = squares - sums ** 2 / counts
+        corr = cross / np.sqrt(var_i * var_i.T)
+    corr[counts < max(min_periods, 2)] = np.nan
+    return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=symbols, columns=symbols)
+
+
+def _window_products(x0, mask, bounds):
+    """
+    Conteos, sumas y productos cruzados acumulados desde bounds[0] hasta cada
+    bounds[k] (k >= 1), de forma (len(bounds), n, n). Los tramos entre
+    límites consecutivos se rellenan con ceros al largo máximo y se
+    multiplican en un solo matmul por lotes.
+    """
+    n_assets = x0.shape[1]
+    lengths = np.diff(bounds)
+    width = int(lengths.max()) if len(lengths) else 0
+    # Fila extra de ceros para el relleno
+    x0 = np.vstack([x0, np.zeros((1, n_assets))])
+    mask = np.vstack([mask, np.zeros((1, n_assets))])
+    offsets = np.arange(width)
+    rows = bounds[:-1, None] + offsets
+    rows = np.where(offsets < lengths[:, None], rows, len(x0) - 1)
+
+    xs, ms = x0[rows], mask[rows]
+    xt, mt = np.swapaxes(xs, 1, 2), np.swapaxes(ms, 1, 2)
+    products = []
+    for left, right in ((mt, ms), (xt, ms), (xt, xs)):
+        segment = np.matmul(left, right)
+        cumulative = np.zeros((len(bounds),) + segment.shape[1:])
+        np.cumsum(segment, axis=0, out=cumulative[1:])
+        products.append(cumulative)
+    return products
+
+
+@instrument()
+def rolling_covariance(returns, window, min_periods=None, step=1, memory_budget_mb=256):
+    """
+    Covarianza móvil con datos pareados (como DataFrame.rolling(window,
+    min_periods).cov(); 'min_periods' por defecto es 'window').
+
+    Se evalúa cada 'step' fechas contando hacia atrás desde la última (con
+    miles de activos, usar un 'step' grande: cada fecha evaluada ocupa
+    8 * n² bytes). Las ventanas salen de productos cruzados acumulados,
+    calculados por lotes de fechas que no superan 'memory_budget_mb'.
+
+    Devuelve un DataFrame con índice (fecha, símbolo) y columnas símbolo
+    (el formato de pandas).
+    """
+    values, dates, symbols = _as_returns(returns)
+    n_dates, n_assets = values.shape
+    min_periods = window if min_periods is None else min_periods
+    x0, mask = _masked(values)
+
+    ends = np.arange(n_dates, 0, -step)[::-1]
+    starts = np.maximum(ends - window, 0)
+    cov = np.empty((len(ends), n_assets, n_assets))
+
+    # Cada fecha evaluada usa hasta 2 límites, 3 acumulados y la salida
+    per_date = 8 * n_assets * n_assets * 7 + 16 * n_assets * max(window, step)
+    batch = max(1, int(memory_budget_mb * 2 ** 20 // per_date))
+    for first in range(0, len(ends), batch):
+        e, s = ends[first:first + batch], starts[first:first + batch]
+        bounds = np.unique(np.concatenate([s, e]))
+        counts, sums, cross = _window_products(x0, mask, bounds)
+        i_end, i_start = np.searchsorted(bounds, e), np.searchsorted(bounds, s)
+        cov[first:first + batch] = _pairwise_from_products(
+            counts[i_end] - counts[i_start], sums[i_end] - sums[i_start],
+            cross[i_end] - cross[i_start], min_periods)
+
+    index = pd.MultiIndex.from_product([dates[ends - 1], symbols], names=[dates.name, None])
+    return pd.DataFrame(cov.reshape(-1, n_assets), index=index, columns=symbols)
+
+
+def _ewma_weights(n_dates, lam):
+    """Pesos RiskMetrics (1 - lam) * lam^(antigüedad), el más reciente al final."""
+    return (1 - lam) * lam ** np.arange(n_dates - 1, -1, -1, dtype=np.float64)
+
+
+@instrument()
+def ewma_covariance(returns, lam=RISKMETRICS_LAMBDA):
+    """
+    Covarianza EWMA (RiskMetrics, media cero) a la última fecha, en un solo
+    producto de matrices. Con huecos, cada par se normaliza por la suma de
+    los pesos de sus fechas en común.
+    """
+    values, _, symbols = _as_returns(returns)
+    state = EWMACovariance.from_history(values, lam)
+    return pd.DataFrame(state.covariance(), index=symbols, columns=symbols)
+
+
+class EWMACovariance:
+    """
+    Covarianza EWMA incremental: update() absorbe un vector de rendimientos
+    (con NaN para los activos sin cotización) con dos actualizaciones de
+    rango 1, O(n²). Guarda sumas ponderadas de productos (S) y de pesos
+    comunes (W) por par; la covarianza es S / W.
+
+    El decaimiento se acumula en un factor de escala (sin recorrer las
+    matrices en cada barra) y se renormaliza antes de perder precisión.
+    """
+
+    def __init__(self, n_assets, lam=RISKMETRICS_LAMBDA):
+        self.lam = lam
+        self.n_assets = n_assets
+        self.sums = np.zeros((n_assets, n_assets))
+        self.weights = np.zeros((n_assets, n_assets))
+        # Valor real = almacenado * scale
+        self.scale = 1.0
+
+    @classmethod
+    def from_history(cls, returns, lam=RISKMETRICS_LAMBDA):
+        """Estado tras absorber el historial 'returns' (fecha x activo), calculado en lote."""
+        values = np.asarray(returns, dtype=np.float64)
+        values = values[:, None] if values.ndim == 1 else values
+        state = cls(values.shape[1], lam)
+        x0, mask = _masked(values)
+        w = _ewma_weights(len(values), lam)[:, None]
+        state.sums = (x0 * w).T @ x0
+        state.weights = (mask * w).T @ mask
+        return state
+
+    def update(self, returns):
+        r = np.asarray(returns, dtype=np.float64)
+        valid = ~np.isnan(r)
+        r0 = np.where(valid, r, 0.0)
+        self.scale *= self.lam
+        if self.scale < 1e-150:
+            self.sums *= self.scale
+            self.weights *= self.scale
+            self.scale = 1.0
+        alpha = (1 - self.lam) / self.scale
+        self.sums += np.outer(alpha * r0, r0)
+        self.weights += np.outer(alpha * valid, valid)
+
+    def covariance(self):
+        """Matriz de covarianza actual (NaN para pares nunca observados juntos)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.weights > 0, self.sums / self.weights, np.nan)
+
+    def correlation(self):
+        return covariance_to_correlation(self.covariance())
+
+    def to_dict(self):
+        return {'lam': self.lam, 'n_assets': self.n_assets, 'scale': self.scale,
+                'sums': self.sums.tolist(), 'weights': self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['n_assets'], state['lam'])
+        obj.scale = state['scale']
+        obj.sums = np.asarray(state['sums'], dtype=np.float64)
+        obj.weights = np.asarray(state['weights'], dtype=np.float64)
+        return obj
+
+
+@instrument()
+def ledoit_wolf(returns, min_periods=2):
+    """
+    Covarianza con contracción de Ledoit-Wolf hacia mu * I (mu = varianza
+    media). La intensidad óptima se estima con los rendimientos centrados
+    (los huecos cuentan como la media) y se aplica a la covarianza por pares
+    (los pares sin fechas en común cuentan como covarianza cero).
+
+    Devuelve (DataFrame de covarianza, intensidad en [0, 1]).
+    """
+    values, _, symbols = _as_returns(returns)
+    n_dates, n_assets = values.shape
+    sample = pairwise_covariance(returns, min_periods).to_numpy()
+
+    x = values - np.nanmean(values, axis=0)
+    x[np.isnan(x)] = 0.0
+    biased = x.T @ x / n_dates
+    mu = np.trace(biased) / n_assets
+    # Distancia de la muestra al objetivo y varianza de la muestra (ambas / n_assets)
+    delta = ((biased - mu * np.eye(n_assets)) ** 2).sum() / n_assets
+    beta = (((x * x).sum(axis=1) ** 2).sum() / n_dates - (biased ** 2).sum()) / (n_dates * n_assets)
+    shrinkage = float(np.clip(beta / delta, 0.0, 1.0)) if delta > 0 else 1.0
+
+    target = np.nanmean(np.diagonal(sample)) * np.eye(n_assets)
+    shrunk = shrinkage * target + (1 - shrinkage) * np.nan_to_num(sample)
+    return pd.DataFrame(shrunk, index=symbols, columns=symbols), shrinkage
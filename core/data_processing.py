@@ -2,15 +2,103 @@
 import pandas as pd
 import numpy as np  # Importamos numpy
 
-def calculate_returns(df):
-    """Calcula los rendimientos diarios y logarítmicos."""
-    df_processed = df.copy()
-    
-    # Usamos 'adjusted close' para el análisis
-    df_processed['simple_return'] = df_processed['adjusted close'].pct_change()
-    
-    # Usamos np.log() para el rendimiento logarítmico
-    df_processed['log_return'] = np.log(df_processed['adjusted close'] / df_processed['adjusted close'].shift(1))
-    
-    # Eliminamos el primer NaN generado por .pct_change() y .shift()
-    return df_processed.dropna() 
+from core.panel import PricePanel
+from core.instrumentation import instrument
+
+# Horizontes habituales (en barras): diario, semanal y mensual
+RETURN_HORIZONS = (1, 5, 21)
+
+
+def return_columns(horizon):
+    """Nombres (simple, log) de las columnas de un horizonte ('simple_return_5d', 'log_return_5d')."""
+    suffix = '' if horizon == 1 else f"_{horizon}d"
+    return f"simple_return{suffix}", f"log_return{suffix}"
+
+
+def _return_block(prices, horizons, dtype):
+    """
+    Rendimientos simples y logarítmicos de 'prices' (n,) o (n, k) para cada
+    horizonte, en un solo bloque (2 * len(horizons), n[, k]) de 'dtype' cuyas
+    filas [2i] y [2i + 1] son el simple y el log del horizonte i (contiguas).
+    El log del precio se calcula una vez; cada horizonte h es
+    log_p[t] - log_p[t-h] (NaN en las primeras h filas) y el simple sale del
+    log con expm1.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_price = np.log(prices)
+    block = np.empty((2 * len(horizons),) + prices.shape, dtype=dtype)
+    for i, h in enumerate(horizons):
+        simple, log = block[2 * i], block[2 * i + 1]
+        log[:h] = np.nan
+        np.subtract(log_price[h:], log_price[:-h], out=log[h:], casting='same_kind')
+        np.expm1(log, out=simple)
+    return block
+
+
+def _horizons(horizons):
+    horizons = sorted({int(h) for h in horizons} | {1})
+    if horizons[0] < 1:
+        raise ValueError(f"Los horizontes deben ser >= 1: {horizons}")
+    return horizons
+
+
+@instrument()
+def calculate_returns(df, horizons=(1,), dtype=np.float64):
+    """
+    Calcula los rendimientos diarios y logarítmicos.
+    Acepta un DataFrame de un símbolo (o directamente la serie de
+    'adjusted close') o un PricePanel (ver _panel_returns).
+
+    Solo se lee 'adjusted close': el resultado tiene únicamente las columnas
+    de rendimientos ('simple_return', 'log_return' y, por cada horizonte
+    h > 1 de 'horizons', 'simple_return_{h}d' y 'log_return_{h}d',
+    solapados), sin copiar OHLC. Se quita la primera fecha (sin rendimiento)
+    y las fechas sin precio. Con dtype=np.float32 el resultado ocupa la mitad.
+    Para los rendimientos no solapados ver non_overlapping_returns.
+    """
+    horizons = _horizons(horizons)
+    if isinstance(df, PricePanel):
+        return _panel_returns(df, horizons, dtype)
+
+    prices = df['adjusted close'] if isinstance(df, pd.DataFrame) else df
+    # (n - 1, columnas) en orden Fortran: pandas lo guarda como un único bloque sin copiarlo
+    block = _return_block(prices.to_numpy(dtype=np.float64), horizons, dtype)[:, 1:].T
+    index = prices.index[1:]
+
+    # Huecos de precio: se descartan sus filas (única copia, solo si hay huecos)
+    valid = ~np.isnan(block[:, 1])
+    if not valid.all():
+        block, index = block[valid], index[valid]
+
+    columns = [name for h in horizons for name in return_columns(h)]
+    return pd.DataFrame(block, index=index, columns=columns, copy=False)
+
+
+def non_overlapping_returns(returns, horizon, kind='log'):
+    """
+    Rendimientos no solapados a 'horizon' barras: una de cada 'horizon' filas
+    de la columna solapada de calculate_returns (vista sin copia), anclada en
+    la última fecha. 'kind' es 'log' o 'simple'.
+    """
+    column = return_columns(horizon)[kind == 'log']
+    values = returns[column]
+    # Primera fila con el horizonte completo que cae en la misma fase que la última
+    first = horizon - 1 + (len(values) - horizon) % horizon
+    return values.iloc[first::horizon]
+
+
+def _panel_returns(panel, horizons=(1,), dtype=np.float64):
+    """
+    Rendimientos de todos los símbolos del panel en una sola pasada vectorizada.
+    Se conserva el índice de fechas compartido (sin dropna): la primera fila y
+    las fechas adyacentes a huecos quedan en NaN. Los campos de precios se
+    comparten con el panel original, sin copiarlos; cada campo nuevo es una
+    vista de un único bloque.
+    """
+    block = _return_block(panel['adjusted close'], horizons, dtype)
+    fields = {}
+    for i, h in enumerate(horizons):
+        simple_name, log_name = return_columns(h)
+        fields[simple_name] = block[2 * i]
+        fields[log_name] = block[2 * i + 1]
+    return panel.with_fields(fields)
@@ -0,0 +1,146 @@
+# core/data_store.py
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from core.providers import YFinanceProvider
+from core.instrumentation import instrument, record_cache
+
+# Carpeta por defecto del almacén local (una partición Parquet por símbolo)
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'ohlcv')
+
+# Tolerancia relativa para decidir si el proveedor "re-escribió" el historial
+RESTATEMENT_TOLERANCE = 1e-6
+
+
+class OHLCVStore:
+    """
+    Almacén local columnar (Parquet) de barras diarias.
+
+    Solo se descargan las barras desde la penúltima fecha guardada y se
+    añaden a la partición del símbolo; si no hay nada nuevo no se reescribe.
+    La última barra guardada puede ser parcial (mercado abierto), así que se
+    sobrescribe sin más. La penúltima, ya cerrada, es la referencia para
+    detectar si el proveedor re-expresó el historial (dividendos o splits):
+      - Solo cambió 'adjusted close' (dividendo): se reescala el historial guardado.
+      - Cambió 'close' (split): se vuelve a descargar el historial completo.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, provider=None):
+        self.root = root
+        self.provider = provider if provider is not None else YFinanceProvider()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path_for(self, symbol):
+        """Ruta de la partición de un símbolo."""
+        return os.path.join(self.root, f"symbol={symbol.upper()}", "data.parquet")
+
+    def _lock_for(self, symbol):
+        with self._locks_guard:
+            return self._locks.setdefault(symbol.upper(), threading.Lock())
+
+    def load(self, symbol):
+        """Lee la partición local (sin red). Devuelve un DataFrame vacío si no existe."""
+        path = self.path_for(symbol)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        return pd.read_parquet(path)
+
+    def save(self, symbol, data):
+        """Escribe la partición de forma atómica (archivo temporal + os.replace)."""
+        path = self.path_for(symbol)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        data.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    @instrument('core.data_store.OHLCVStore.get')
+    def get(self, symbol):
+        """Devuelve el historial completo del símbolo, actualizándolo de forma incremental."""
+        with self._lock_for(symbol):
+            stored = self.load(symbol)
+            if stored.empty:
+                record_cache('ohlcv_store', False)
+                data = self._fetch(symbol)
+                if not data.empty:
+                    self.save(symbol, data)
+                return data
+
+            new_bars = self._fetch(symbol, start=_reference_date(stored))
+            merged = self._merge(stored, new_bars) if not new_bars.empty else stored
+            # Acierto: el historial local ya estaba al día (sin barras nuevas ni cambios)
+            record_cache('ohlcv_store', merged is stored)
+            if merged is stored:
+                return stored
+            if merged is None:
+                # Historial re-expresado (split) o sin solape verificable: descarga completa
+                print(f"Historial re-expresado para {symbol}. Descargando de nuevo.")
+                merged = self._fetch(symbol)
+                if merged.empty:
+                    return stored
+
+            self.save(symbol, merged)
+            return merged
+
+    def _fetch(self, symbol, start=None):
+        """Descarga respetando el límite de concurrencia del proveedor."""
+        with self.provider.slot():
+            return self.provider.fetch_daily(symbol, start=start)
+
+    def _merge(self, stored, new_bars):
+        """
+        Une las barras nuevas con las guardadas. Devuelve None si hay que
+        re-descargar y el mismo 'stored' si no cambió nada.
+        """
+        if stored.index.tz is not None and new_bars.index.tz is not None:
+            new_bars.index = new_bars.index.tz_convert(stored.index.tz)
+        ref_date = _reference_date(stored)
+        if ref_date not in new_bars.index:
+            # Sin la barra de referencia no podemos verificar restatements
+            return None
+
+        old_bar = stored.loc[ref_date]
+        new_bar = new_bars.loc[ref_date]
+
+        if not np.isclose(old_bar['close'], new_bar['close'], rtol=RESTATEMENT_TOLERANCE):
+            return None
+
+        old_adj = old_bar['adjusted close']
+        new_adj = new_bar['adjusted close']
+        restated = not np.isclose(old_adj, new_adj, rtol=RESTATEMENT_TOLERANCE) and old_adj != 0
+        if not restated and _same_bars(stored.loc[stored.index > ref_date], new_bars.loc[new_bars.index > ref_date]):
+            return stored
+        if restated:
+            # Dividendo: el factor de ajuste se aplica por igual a todo el historial previo
+            stored = stored.copy()
+            stored['adjusted close'] = stored['adjusted close'] * (new_adj / old_adj)
+
+        merged = pd.concat([stored, new_bars])
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        return merged
+
+
+def _reference_date(stored):
+    """Última barra guardada ya cerrada: la penúltima (la última puede ser parcial)."""
+    return stored.index[-2] if len(stored) > 1 else stored.index[-1]
+
+
+def _same_bars(old, new):
+    """True si las barras nuevas son las mismas que las guardadas (mismas fechas y valores)."""
+    if not old.index.equals(new.index) or not set(old.columns) <= set(new.columns):
+        return False
+    return np.allclose(new[old.columns].to_numpy(dtype=np.float64), old.to_numpy(dtype=np.float64),
+                       rtol=RESTATEMENT_TOLERANCE, equal_nan=True)
+
+
+_default_store = None
+
+
+def get_default_store():
+    """Almacén compartido por el dashboard y los reportes."""
+    global _default_store
+    if _default_store is None:
+        _default_store = OHLCVStore()
+    return _default_store
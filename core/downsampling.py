@@ -0,0 +1,167 @@
+# core/downsampling.py
+"""
+Reducción de puntos antes de construir las figuras.
+
+  - Velas: agregación OHLC por períodos de calendario (semana, mes, trimestre,
+    año) eligiendo el período más fino que respeta el presupuesto de puntos
+    para el rango de fechas visible. Se conserva el primer 'open', el máximo
+    'high', el mínimo 'low' y el último cierre de cada período.
+  - Líneas (SMA, Bollinger, rendimientos): decimación min/max por bloques
+    (conserva picos y valles) o LTTB (Largest-Triangle-Three-Buckets).
+
+Todo trabaja sobre arreglos de NumPy; los índices se asumen ordenados.
+"""
+import numpy as np
+import pandas as pd
+
+from core.instrumentation import instrument
+
+DEFAULT_MAX_POINTS = 2000
+
+# Períodos de agregación (alias de pandas.Period) y su duración media en días
+OHLC_PERIODS = (('W', 7.0), ('M', 30.44), ('Q', 91.31), ('Y', 365.25))
+PERIOD_LABELS = {'W': 'semanal', 'M': 'mensual', 'Q': 'trimestral', 'Y': 'anual'}
+
+# Cómo se agrega cada columna de un DataFrame OHLCV
+_OHLC_AGG = {
+    'open': 'first', 'high': 'max', 'low': 'min',
+    'close': 'last', 'adjusted close': 'last', 'volume': 'sum',
+}
+
+
+def ohlc_period(index, max_points=DEFAULT_MAX_POINTS):
+    """
+    Período de agregación para 'index' (None si ya entra en el presupuesto).
+    Se elige según la cantidad de barras y el rango de fechas que cubren.
+    """
+    if len(index) <= max_points:
+        return None
+    span_days = (index[-1] - index[0]) / pd.Timedelta(days=1)
+    for period, days in OHLC_PERIODS:
+        if span_days / days <= max_points:
+            return period
+    return OHLC_PERIODS[-1][0]
+
+
+def _bucket_starts(index, period):
+    """Posición donde empieza cada período (el índice debe estar ordenado)."""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    codes = index.to_period(period).asi8
+    return np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+
+
+def aggregate_ohlc(data, period):
+    """
+    Agrega un DataFrame OHLCV en velas por 'period' ('W', 'M', 'Q', 'Y').
+    Cada vela queda fechada en la primera barra del período.
+    """
+    starts = _bucket_starts(data.index, period)
+    ends = np.r_[starts[1:], len(data)] - 1
+    columns = {}
+    for col in data.columns:
+        how = _OHLC_AGG.get(col)
+        if how is None:
+            continue
+        values = data[col].to_numpy(dtype=np.float64)
+        if how == 'first':
+            columns[col] = values[starts]
+        elif how == 'last':
+            columns[col] = values[ends]
+        elif how == 'max':
+            columns[col] = np.fmax.reduceat(values, starts)
+        elif how == 'min':
+            columns[col] = np.fmin.reduceat(values, starts)
+        else:
+            columns[col] = np.add.reduceat(np.nan_to_num(values), starts)
+    return pd.DataFrame(columns, index=data.index[starts])
+
+
+@instrument()
+def downsample_ohlc(data, max_points=DEFAULT_MAX_POINTS):
+    """Devuelve (velas, período); período es None si no hizo falta agregar."""
+    period = ohlc_period(data.index, max_points)
+    if period is None:
+        return data, None
+    return aggregate_ohlc(data, period), period
+
+
+def minmax_indices(y, max_points):
+    """
+    Posiciones a conservar con decimación min/max: la serie se divide en
+    max_points // 2 bloques y de cada uno se toman el mínimo y el máximo.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    n_buckets = max(max_points // 2, 1)
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    # Los NaN (p. ej. el arranque de una SMA) no cuentan como extremos
+    lo = np.where(np.isnan(blocks), np.inf, blocks).argmin(axis=1) + offsets
+    hi = np.where(np.isnan(blocks), -np.inf, blocks).argmax(axis=1) + offsets
+    keep = np.unique(np.concatenate([lo, hi, [0, n - 1]]))
+    return keep[keep < n]
+
+
+def lttb_indices(y, max_points):
+    """
+    Posiciones a conservar con LTTB (eje x uniforme). El recorrido entre
+    bloques es secuencial por definición; dentro de cada bloque es vectorizado.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if max_points < 3:
+        return np.array([0, n - 1])
+    y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(y).any() else 0.0, y)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        nxt_hi = max(nxt_hi, nxt_lo + 1)
+        cx, cy = (nxt_lo + nxt_hi - 1) / 2.0, y[nxt_lo:nxt_hi].mean()
+        xs = np.arange(lo, hi)
+        area = np.abs((a - cx) * (y[lo:hi] - y[a]) - (a - xs) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def decimate(x, y, max_points=DEFAULT_MAX_POINTS, method='minmax'):
+    """
+    Reduce una línea a lo sumo a ~max_points puntos. 'method' es 'minmax'
+    (conserva extremos) o 'lttb'. Devuelve (x, y) sin copiar si ya entra.
+    """
+    y = np.asarray(y)
+    if len(y) <= max_points:
+        return x, y
+    if method == 'minmax':
+        keep = minmax_indices(y, max_points)
+    elif method == 'lttb':
+        keep = lttb_indices(y, max_points)
+    else:
+        raise ValueError(f"Método de decimación desconocido: {method}")
+    return x[keep], y[keep]
+
+
+@instrument()
+def decimate_many(x, ys, max_points=DEFAULT_MAX_POINTS, method='minmax'):
+    """
+    Decima varias líneas con un eje x común (unión de los puntos elegidos en
+    cada una), para que rellenos como el de Bollinger sigan alineados.
+    'ys' es un dict {nombre: arreglo}; devuelve (x, {nombre: arreglo}).
+    """
+    ys = {name: np.asarray(y) for name, y in ys.items()}
+    if not ys or len(x) <= max_points:
+        return x, ys
+    share = max(max_points // len(ys), 3)
+    pick = minmax_indices if method == 'minmax' else lttb_indices
+    keep = np.unique(np.concatenate([pick(y, share) for y in ys.values()]))
+    return x[keep], {name: y[keep] for name, y in ys.items()}
@@ -0,0 +1,73 @@
+# core/figures.py
+"""
+Capa de gráficos: construye las figuras de Plotly a partir de los resultados
+numéricos de core/analysis.py. Solo la importan el dashboard y los reportes.
+"""
+from plotly.subplots import make_subplots
+import plotly.graph_objects as go
+
+
+def decomposition_figure(decomposition):
+    """Gráfico de 4 paneles desde el DataFrame de decompose_series."""
+    fig = make_subplots(rows=4, cols=1,
+                        subplot_titles=('Observado', 'Tendencia', 'Estacionalidad', 'Residual'))
+    
+    fig.add_trace(go.Scatter(x=decomposition.index, y=decomposition['observed'], mode='lines', name='Observado'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=decomposition.index, y=decomposition['trend'], mode='lines', name='Tendencia'), row=2, col=1)
+    fig.add_trace(go.Scatter(x=decomposition.index, y=decomposition['seasonal'], mode='lines', name='Estacionalidad'), row=3, col=1)
+    fig.add_trace(go.Scatter(x=decomposition.index, y=decomposition['resid'], mode='markers', name='Residual'), row=4, col=1)
+    
+    fig.update_layout(height=700, title_text="Descomposición de la Serie de Tiempo", showlegend=False)
+    return fig
+
+
+def forecast_figures(df_prophet, forecast, periods, label, model=None):
+    """
+    Gráficos de proyección y de componentes. Con un modelo Prophet se usan sus
+    propios gráficos; en otro caso se construyen desde el DataFrame de proyección.
+    """
+    if model is not None:
+        from prophet.plot import plot_plotly, plot_components_plotly
+
+        # Generar el gráfico de Proyección
+        fig_forecast = plot_plotly(model, forecast)
+        fig_forecast.update_layout(title=f'Proyección a {periods} días con {label}',
+                                   xaxis_title='Fecha', yaxis_title='Precio (Proyectado)')
+
+        # --- MEJORA: GENERAR GRÁFICO DE COMPONENTES ---
+        fig_components = plot_components_plotly(model, forecast)
+        fig_components.update_layout(title=f'Componentes del Modelo {label}')
+        return fig_forecast, fig_components
+
+    fig_forecast = go.Figure()
+    fig_forecast.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_upper'], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+    fig_forecast.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_lower'], mode='lines', line=dict(width=0), fill='tonexty',
+                                      fillcolor='rgba(0, 114, 178, 0.2)', name='Intervalo'))
+    fig_forecast.add_trace(go.Scatter(x=df_prophet['ds'], y=df_prophet['y'], mode='markers', marker=dict(color='black', size=3), name='Actual'))
+    fig_forecast.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat'], mode='lines', line=dict(color='#0072B2', width=2), name='Predicted'))
+    fig_forecast.update_layout(title=f'Proyección a {periods} días con {label}',
+                               xaxis_title='Fecha', yaxis_title='Precio (Proyectado)')
+
+    fig_components = make_subplots(rows=3, cols=1, subplot_titles=('Tendencia', 'Semanal', 'Anual'))
+    fig_components.add_trace(go.Scatter(x=forecast['ds'], y=forecast['trend'], mode='lines', name='Tendencia'), row=1, col=1)
+    # Un ciclo de cada estacionalidad alcanza para leerla
+    week = forecast.tail(7)
+    fig_components.add_trace(go.Scatter(x=week['ds'].dt.day_name(), y=week['weekly'], mode='lines', name='Semanal'), row=2, col=1)
+    year = forecast.tail(365)
+    fig_components.add_trace(go.Scatter(x=year['ds'], y=year['yearly'], mode='lines', name='Anual'), row=3, col=1)
+    fig_components.update_layout(height=700, title='Componentes del Modelo', showlegend=False)
+    return fig_forecast, fig_components
+
+
+def add_level_lines(fig, levels):
+    """
+    Dibuja las zonas de find_key_levels como líneas horizontales (una por
+    zona, más gruesa cuanto más fuerte).
+    """
+    for row in levels.itertuples(index=False):
+        is_support = row.kind == 'soporte'
+        fig.add_hline(y=row.level, line_dash="dot", line_width=1 + 2 * row.strength,
+                      line_color="green" if is_support else "red",
+                      annotation_text=f"{'Soporte' if is_support else 'Resistencia'} {row.level:.2f} ({row.touches} toques)",
+                      annotation_position="bottom right" if is_support else "top right")
+    return fig
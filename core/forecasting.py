@@ -0,0 +1,226 @@
+# core/forecasting.py
+"""
+Interfaz de proyección con motores intercambiables.
+
+  - 'prophet': Prophet (Meta) con feriados de EE.UU. y caché de modelos.
+  - 'fast': modelo NumPy vectorizado con la misma estructura aditiva que
+    Prophet (tendencia lineal por tramos con changepoints + estacionalidad
+    de Fourier semanal y anual), ajustado por mínimos cuadrados regularizados.
+    Tarda milisegundos y admite muchos símbolos en una sola resolución.
+
+Todos los motores devuelven un DataFrame con las columnas de Prophet:
+ds, trend, weekly, yearly, yhat, yhat_lower, yhat_upper (historial + futuro).
+"""
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+# Parámetros por defecto equivalentes a los de Prophet
+N_CHANGEPOINTS = 25
+CHANGEPOINT_RANGE = 0.8
+WEEKLY_ORDER = 3
+YEARLY_ORDER = 10
+SEASONALITY_PRIOR_SCALE = 10.0
+INTERVAL_WIDTH = 0.8
+
+
+def _days(ds):
+    """Días (float) desde la época Unix, como usa Prophet para la estacionalidad."""
+    return pd.DatetimeIndex(ds).asi8 / (86400 * 1e9)
+
+
+def _fourier(days, period, order):
+    angles = 2 * np.pi * np.outer(days, np.arange(1, order + 1)) / period
+    return np.hstack([np.sin(angles), np.cos(angles)])
+
+
+class _Design:
+    """Matriz de diseño compartida (tendencia por tramos + Fourier) para unas fechas de entrenamiento."""
+
+    def __init__(self, ds, n_changepoints=N_CHANGEPOINTS):
+        days = _days(ds)
+        self.start, self.span = days[0], max(days[-1] - days[0], 1.0)
+        t = self._t(days)
+        n_changepoints = min(n_changepoints, max(len(t) - 2, 0))
+        # Changepoints en cuantiles del primer 80% del historial (como Prophet)
+        hist = t[:max(int(np.floor(len(t) * CHANGEPOINT_RANGE)), 1)]
+        self.changepoints = np.quantile(hist, np.linspace(0, 1, n_changepoints + 1)[1:]) if n_changepoints else np.array([])
+        self.n_cp = len(self.changepoints)
+        self.n_seasonal = 2 * (WEEKLY_ORDER + YEARLY_ORDER)
+
+    def _t(self, days):
+        return (days - self.start) / self.span
+
+    def matrix(self, ds):
+        days = _days(ds)
+        t = self._t(days)
+        hinge = np.maximum(t[:, None] - self.changepoints[None, :], 0.0)
+        return np.hstack([np.ones((len(t), 1)), t[:, None], hinge,
+                          _fourier(days, 7.0, WEEKLY_ORDER), _fourier(days, 365.25, YEARLY_ORDER)])
+
+    def penalty(self, sigma, changepoint_scale):
+        """Diagonal del término ridge: equivale a priors normales con las escalas de Prophet."""
+        sigma2 = np.atleast_1d(sigma)[:, None] ** 2
+        diag = np.concatenate([
+            [0.0, 0.0],
+            np.full(self.n_cp, 1.0 / changepoint_scale ** 2),
+            np.full(self.n_seasonal, 1.0 / SEASONALITY_PRIOR_SCALE ** 2),
+        ])
+        return sigma2 * diag[None, :]
+
+
+def _components(design, X, beta):
+    """Separa la predicción en tendencia, estacionalidad semanal y anual."""
+    k = 2 + design.n_cp
+    w = k + 2 * WEEKLY_ORDER
+    return X[:, :k] @ beta[:k], X[:, k:w] @ beta[k:w], X[:, w:] @ beta[w:]
+
+
+def fast_forecast_many(ds, values, periods=30, changepoint_scale=0.05, interval_width=INTERVAL_WIDTH):
+    """
+    Ajusta el modelo rápido para varias series con las mismas fechas en una
+    sola resolución por lotes. 'values' es (n_fechas, n_series) sin NaN.
+    Devuelve una lista de DataFrames (uno por serie) con el formato de Prophet.
+    """
+    ds = pd.DatetimeIndex(ds)
+    Y = np.asarray(values, dtype=np.float64)
+    Y = Y[:, None] if Y.ndim == 1 else Y
+    design = _Design(ds)
+    X = design.matrix(ds)
+
+    # Escalado por el máximo absoluto, como Prophet
+    scale = np.abs(Y).max(axis=0)
+    scale[scale == 0] = 1.0
+    Ys = Y / scale
+    # Primera estimación del ruido: desvío de las diferencias diarias
+    sigma0 = np.maximum(np.std(np.diff(Ys, axis=0), axis=0), 1e-8)
+
+    XtX = X.T @ X
+    XtY = X.T @ Ys
+    A = XtX[None, :, :] + np.einsum('ni,ij->nij', design.penalty(sigma0, changepoint_scale), np.eye(X.shape[1]))
+    beta = np.linalg.solve(A, XtY.T[:, :, None])[:, :, 0].T  # (p, n_series)
+
+    fitted = X @ beta
+    sigma = np.std(Ys - fitted, axis=0, ddof=min(X.shape[1], len(ds) - 1))
+
+    last = ds[-1]
+    future = pd.date_range(last + pd.Timedelta(days=1), periods=periods, freq='D')
+    all_ds = ds.append(future)
+    X_all = design.matrix(all_ds)
+    z = NormalDist().inv_cdf(0.5 + interval_width / 2)
+
+    # Incertidumbre de tendencia: changepoints futuros con la tasa y magnitud históricas
+    h = np.maximum(design._t(_days(all_ds)) - 1.0, 0.0)
+    deltas = beta[2:2 + design.n_cp]
+    mean_abs_delta = np.abs(deltas).mean(axis=0) if design.n_cp else np.zeros(Y.shape[1])
+    rate = design.n_cp
+
+    forecasts = []
+    for j in range(Y.shape[1]):
+        trend, weekly, yearly = _components(design, X_all, beta[:, j])
+        yhat = trend + weekly + yearly
+        trend_var = rate * 2 * mean_abs_delta[j] ** 2 * h ** 3 / 3
+        band = z * np.sqrt(sigma[j] ** 2 + trend_var)
+        forecasts.append(pd.DataFrame({
+            'ds': all_ds,
+            'trend': trend * scale[j],
+            'weekly': weekly * scale[j],
+            'yearly': yearly * scale[j],
+            'yhat': yhat * scale[j],
+            'yhat_lower': (yhat - band) * scale[j],
+            'yhat_upper': (yhat + band) * scale[j],
+        }))
+    return forecasts
+
+
+def fast_forecast(df_prophet, periods=30, changepoint_scale=0.05):
+    """Modelo rápido para una serie (DataFrame con columnas 'ds' e 'y')."""
+    data = df_prophet.dropna(subset=['y'])
+    return fast_forecast_many(data['ds'], data['y'].to_numpy(), periods, changepoint_scale)[0]
+
+
+def fast_forecast_frame(prices, periods=30, changepoint_scale=0.05):
+    """
+    Proyecta muchos símbolos a la vez desde un DataFrame fecha x símbolo
+    (por ejemplo, panel.frame('adjusted close')). Las columnas completas se
+    resuelven juntas; las que tienen huecos, cada una en su propio tramo.
+    Devuelve un dict {símbolo: DataFrame de proyección}.
+    """
+    complete = prices.columns[prices.notna().all().to_numpy()]
+    result = {}
+    if len(complete):
+        batch = fast_forecast_many(prices.index, prices[complete].to_numpy(), periods, changepoint_scale)
+        result.update(zip(complete, batch))
+    for symbol in prices.columns.difference(complete):
+        series = prices[symbol].dropna()
+        if len(series) > 2:
+            result[symbol] = fast_forecast_many(series.index, series.to_numpy(), periods, changepoint_scale)[0]
+    return result
+
+
+class ForecastBackend:
+    """Interfaz de un motor de proyección."""
+    name = "base"
+    label = "Base"
+
+    def fit_predict(self, df_prophet, periods, changepoint_scale, symbol=None):
+        """Devuelve (modelo, proyección). 'modelo' puede ser None si el motor no expone uno."""
+        raise NotImplementedError
+
+
+class ProphetBackend(ForecastBackend):
+    name = "prophet"
+    label = "Prophet"
+
+    def __init__(self, cache=None):
+        self.cache = cache
+
+    def fit_predict(self, df_prophet, periods, changepoint_scale, symbol=None):
+        from prophet import Prophet
+        from core.model_cache import get_default_model_cache
+
+        params = {
+            'changepoint_prior_scale': changepoint_scale,
+            'daily_seasonality': False,
+            'weekly_seasonality': True,
+            'yearly_seasonality': True,
+            'holidays': 'US',
+        }
+
+        def build_model():
+            # Instanciar el modelo
+            model = Prophet(daily_seasonality=params['daily_seasonality'],
+                            weekly_seasonality=params['weekly_seasonality'],
+                            yearly_seasonality=params['yearly_seasonality'],
+                            changepoint_prior_scale=params['changepoint_prior_scale'])
+            # --- MEJORA: AÑADIR FERIADOS ---
+            model.add_country_holidays(country_name=params['holidays'])
+            return model
+
+        cache = self.cache if self.cache is not None else get_default_model_cache()
+        # Modelo ajustado y proyección (desde la caché si ya existen)
+        return cache.forecast(symbol or '', df_prophet, params, build_model, periods)
+
+
+class FastBackend(ForecastBackend):
+    name = "fast"
+    label = "Rápido (NumPy)"
+
+    def fit_predict(self, df_prophet, periods, changepoint_scale, symbol=None):
+        return None, fast_forecast(df_prophet, periods, changepoint_scale)
+
+
+FORECAST_BACKENDS = {
+    ProphetBackend.name: ProphetBackend,
+    FastBackend.name: FastBackend,
+}
+
+
+def get_backend(backend):
+    """Acepta un nombre registrado o una instancia de ForecastBackend."""
+    if isinstance(backend, ForecastBackend):
+        return backend
+    try:
+        return FORECAST_BACKENDS[backend]()
+    except KeyError:
+        raise ValueError(f"Motor de proyección desconocido: {backend}. Opciones: {list(FORECAST_BACKENDS)}")
@@ -0,0 +1,78 @@
+# core/history.py
+"""
+Historial completo de un símbolo con sus series derivadas ya calculadas.
+
+Rendimientos e indicadores se calculan una sola vez sobre todo el
+historial. Un rango de fechas (window) es entonces un corte por posiciones
+(searchsorted + slice): vistas sin copia, con costo constante sin importar
+el largo del historial. Además, los indicadores del rango no tienen huecos
+de arranque (las ventanas usan las barras anteriores al rango).
+
+Pensado para compartirse entre sesiones (p. ej. st.cache_resource): los
+arreglos de indicadores son de solo lectura y los DataFrames no deben
+modificarse en el lugar.
+"""
+import pandas as pd
+
+from core.data_processing import calculate_returns
+from core.indicators import compute_indicators
+
+# Indicadores que precalcula el dashboard (argumentos de compute_indicators)
+DEFAULT_INDICATORS = {'sma': (20, 50), 'bollinger': (20,)}
+
+
+def _positions(index, start, end):
+    """Posiciones [i0, i1) de las fechas entre start y end (inclusive) de un índice ordenado."""
+    i0 = index.searchsorted(pd.Timestamp(start), side='left') if start is not None else 0
+    i1 = index.searchsorted(pd.Timestamp(end), side='right') if end is not None else len(index)
+    return i0, i1
+
+
+class SymbolHistory:
+    """
+    Precios (formato de get_daily_data, índice sin zona horaria), rendimientos
+    (calculate_returns) e indicadores ({nombre: arreglo 1-D} alineado con los
+    precios) de un símbolo.
+    """
+
+    def __init__(self, prices, returns, indicators):
+        self.prices = prices
+        self.returns = returns
+        self.indicators = indicators
+
+    @classmethod
+    def build(cls, data, horizons=(1,), **indicators):
+        """
+        Calcula rendimientos e indicadores (por defecto DEFAULT_INDICATORS)
+        sobre todo 'data'. No modifica 'data': si el índice tiene zona horaria
+        se quita sobre una copia superficial.
+        """
+        if getattr(data.index, 'tz', None) is not None:
+            data = data.copy(deep=False)
+            data.index = data.index.tz_localize(None)
+        returns = calculate_returns(data, horizons)
+        values = compute_indicators(data['adjusted close'], **(indicators or DEFAULT_INDICATORS))
+        series = {}
+        for name, column in values.items():
+            column = column[:, 0]
+            column.flags.writeable = False
+            series[name] = column
+        return cls(data, returns, series)
+
+    @property
+    def start(self):
+        return self.prices.index[0]
+
+    @property
+    def end(self):
+        return self.prices.index[-1]
+
+    def window(self, start=None, end=None):
+        """Historial entre start y end (inclusive), como vistas sin copia."""
+        i0, i1 = _positions(self.prices.index, start, end)
+        r0, r1 = _positions(self.returns.index, start, end)
+        return SymbolHistory(self.prices.iloc[i0:i1], self.returns.iloc[r0:r1],
+                             {name: values[i0:i1] for name, values in self.indicators.items()})
+
+    def __len__(self):
+        return len(self.prices)
@@ -0,0 +1,156 @@
+# core/indicators.py
+"""
+Motor vectorizado de indicadores técnicos sobre arreglos 2-D (fecha x símbolo).
+
+Todas las medias móviles se obtienen de sumas acumuladas compartidas: la
+suma acumulada de precios (y de sus cuadrados) se calcula una sola vez y
+cada ventana se resuelve con una resta. SMA y la banda media de Bollinger
+con la misma ventana son el mismo arreglo. EMA, ATR y RSI usan un filtro
+recursivo (scipy.signal.lfilter) aplicado a todas las columnas a la vez.
+
+Convenciones (iguales a pandas):
+  - SMA/Bollinger: NaN hasta tener 'window' valores válidos en la ventana;
+    la desviación estándar es muestral (ddof=1).
+  - EMA: ewm(span=window, adjust=False). ATR y RSI: suavizado de Wilder
+    (alpha=1/window), NaN durante las primeras 'window' barras.
+  - Los huecos internos (NaN) se rellenan con el último valor válido para
+    los filtros recursivos y vuelven a NaN en la salida.
+"""
+import numpy as np
+
+from core.instrumentation import instrument
+
+
+def _as_2d(values):
+    """Convierte una serie 1-D en una columna 2-D (sin copia)."""
+    values = np.asarray(values, dtype=np.float64)
+    return values[:, None] if values.ndim == 1 else values
+
+
+def _ffill(values):
+    """Rellena hacia adelante los NaN por columna (vectorizado)."""
+    valid = ~np.isnan(values)
+    idx = np.where(valid, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return values[idx, np.arange(values.shape[1])]
+
+
+def _recursive_smooth(values, alpha):
+    """
+    y[t] = alpha * x[t] + (1 - alpha) * y[t-1], arrancando en el primer valor
+    válido de cada columna. Devuelve NaN antes del primer valor válido.
+    """
+    from scipy.signal import lfilter
+
+    missing = np.isnan(values)
+    cols = np.arange(values.shape[1])
+    first_valid = np.argmax(~missing, axis=0)
+    before_start = np.arange(values.shape[0])[:, None] < first_valid
+    filled = values
+    if (missing & ~before_start).any():
+        filled = _ffill(values)
+    if missing.any():
+        # Antes del inicio de cada columna repetimos x0: el filtro se queda en x0
+        filled = np.where(before_start, filled[first_valid, cols], filled)
+    x0 = filled[first_valid, cols]
+    zi = ((1 - alpha) * x0)[None, :]
+    smoothed, _ = lfilter([alpha], [1.0, alpha - 1.0], filled, axis=0, zi=zi)
+    smoothed[before_start] = np.nan
+    return smoothed
+
+
+class _WindowSums:
+    """Sumas acumuladas compartidas entre indicadores de ventana fija."""
+
+    def __init__(self, values):
+        valid = ~np.isnan(values)
+        # Restamos una referencia por columna para reducir la cancelación numérica
+        self.offset = np.nanmean(values, axis=0)
+        centered = np.where(valid, values - self.offset, 0.0)
+        pad = np.zeros((1, values.shape[1]))
+        self.cs = np.concatenate([pad, np.cumsum(centered, axis=0)])
+        self.cs2 = np.concatenate([pad, np.cumsum(centered ** 2, axis=0)])
+        self.count = np.concatenate([pad, np.cumsum(valid, axis=0, dtype=np.float64)])
+        self._cache = {}
+
+    def _diff(self, cumulative, window):
+        out = np.full((cumulative.shape[0] - 1, cumulative.shape[1]), np.nan)
+        out[window - 1:] = cumulative[window:] - cumulative[:-window]
+        return out
+
+    def mean(self, window):
+        key = ('mean', window)
+        if key not in self._cache:
+            full = self._diff(self.count, window) == window
+            centered_mean = self._diff(self.cs, window) / window
+            self._cache[key] = np.where(full, centered_mean + self.offset, np.nan)
+        return self._cache[key]
+
+    def std(self, window):
+        key = ('std', window)
+        if key not in self._cache:
+            full = self._diff(self.count, window) == window
+            s = self._diff(self.cs, window)
+            s2 = self._diff(self.cs2, window)
+            var = (s2 - s * s / window) / (window - 1)
+            self._cache[key] = np.where(full, np.sqrt(np.maximum(var, 0.0)), np.nan)
+        return self._cache[key]
+
+
+@instrument()
+def compute_indicators(close, high=None, low=None, sma=(20, 50), ema=(),
+                       bollinger=(20,), bb_std=2.0, atr=(), rsi=()):
+    """
+    Calcula en una pasada el conjunto de indicadores pedido sobre 'close'
+    (arreglo fecha x símbolo, o una serie 1-D). ATR necesita 'high' y 'low'.
+
+    Devuelve un dict compacto {nombre: arreglo 2-D}, sin modificar la entrada:
+      SMA_<n>, EMA_<n>, BB_middle_<n>, BB_upper_<n>, BB_lower_<n>, ATR_<n>, RSI_<n>
+    """
+    close = _as_2d(close)
+    sums = _WindowSums(close)
+    result = {}
+
+    for window in sma:
+        result[f'SMA_{window}'] = sums.mean(window)
+
+    for window in bollinger:
+        middle = sums.mean(window)
+        band = sums.std(window) * bb_std
+        result[f'BB_middle_{window}'] = middle
+        result[f'BB_upper_{window}'] = middle + band
+        result[f'BB_lower_{window}'] = middle - band
+
+    for window in ema:
+        result[f'EMA_{window}'] = _recursive_smooth(close, 2.0 / (window + 1))
+        result[f'EMA_{window}'][np.isnan(close)] = np.nan
+
+    if rsi or atr:
+        prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+        bars = np.cumsum(~np.isnan(close), axis=0)
+
+    if rsi:
+        change = close - prev_close
+        # np.maximum propaga los NaN de 'change'
+        gain = np.maximum(change, 0.0)
+        loss = np.maximum(-change, 0.0)
+        for window in rsi:
+            avg_gain = _recursive_smooth(gain, 1.0 / window)
+            avg_loss = _recursive_smooth(loss, 1.0 / window)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+            values = np.where(avg_loss == 0, 100.0, values)
+            values[(bars <= window) | np.isnan(close)] = np.nan
+            result[f'RSI_{window}'] = values
+
+    if atr:
+        if high is None or low is None:
+            raise ValueError("ATR necesita las series 'high' y 'low'.")
+        high, low = _as_2d(high), _as_2d(low)
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        for window in atr:
+            values = _recursive_smooth(true_range, 1.0 / window)
+            values[(bars < window) | np.isnan(close)] = np.nan
+            result[f'ATR_{window}'] = values
+
+    return result
@@ -0,0 +1,340 @@
+# core/instrumentation.py
+"""
+Instrumentación liviana por etapas (spans).
+
+Cada span registra tiempo de pared, tiempo de CPU del proceso, filas
+procesadas, pico de memoria asignada (solo con tracemalloc activo, p. ej.
+con trace_memory=True) y el resultado de caché (hit/miss) si la etapa lo
+informa. Los spans se anidan por hilo (cada uno conoce a su padre).
+
+Desactivada por defecto: @instrument y span() comprueban un indicador y
+llaman a la función directamente, sin crear objetos (del orden de 0.3 µs
+por llamada). Se activa con
+enable(), con la variable de entorno FINANCE_METRICS=1 o, solo para el
+hilo actual, dentro de collect().
+
+Exportación: export_jsonl() (una línea JSON por span) y prometheus_text()
+(formato de texto de Prometheus, agregado por nombre de etapa).
+"""
+import os
+import json
+import time
+import threading
+import functools
+import tracemalloc
+from collections import deque
+
+MAX_SPANS = 10_000
+METRIC_PREFIX = 'finance'
+
+
+class _State:
+    enabled = os.environ.get('FINANCE_METRICS', '') not in ('', '0')
+    # Bloques collect() abiertos en cualquier hilo
+    collecting = 0
+    # enabled o collecting: la única comprobación del camino rápido
+    active = enabled
+    # tracemalloc lo inició este módulo (y debe detenerlo)
+    owns_tracemalloc = False
+
+
+class _Local(threading.local):
+    # Se ejecuta una vez por hilo
+    def __init__(self):
+        self.stack = []
+        self.collectors = []
+
+
+_state = _State()
+_local = _Local()
+_lock = threading.Lock()
+_spans = deque(maxlen=MAX_SPANS)
+_counters = {}
+
+
+def _start_tracemalloc():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _state.owns_tracemalloc = True
+
+
+def _stop_tracemalloc():
+    if _state.owns_tracemalloc:
+        tracemalloc.stop()
+        _state.owns_tracemalloc = False
+
+
+def enable(trace_memory=False):
+    """Activa la instrumentación en todo el proceso (trace_memory mide picos de memoria, con más costo)."""
+    _state.enabled = _state.active = True
+    if trace_memory:
+        _start_tracemalloc()
+
+
+def disable():
+    _state.enabled = False
+    _state.active = _state.collecting > 0
+    _stop_tracemalloc()
+
+
+def is_enabled():
+    """True si hay que registrar en este hilo (global o dentro de collect())."""
+    return _state.active and (_state.enabled or bool(_local.collectors))
+
+
+def reset():
+    """Borra los spans y contadores acumulados."""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def _rows(obj):
+    """Filas de un DataFrame/Series/arreglo/PricePanel (None si no aplica)."""
+    shape = getattr(obj, 'shape', None)
+    if shape:
+        return int(shape[0])
+    return None
+
+
+class Span:
+    """Etapa en curso. 'rows' y 'cache' se pueden fijar desde dentro del bloque."""
+
+    __slots__ = ('name', 'labels', 'rows', 'cache', 'parent', 'depth', '_wall', '_cpu',
+                 '_start', '_mem_start', '_peak')
+
+    def __init__(self, name, rows=None, **labels):
+        self.name = name
+        self.labels = labels
+        self.rows = rows
+        self.cache = None
+
+    def __enter__(self):
+        stack = _local.stack
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, peak)
+            tracemalloc.reset_peak()
+            self._mem_start = self._peak = current
+        else:
+            self._mem_start = None
+        stack.append(self)
+        self._start = time.time()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        stack = _local.stack
+        stack.pop()
+        peak_bytes = None
+        if self._mem_start is not None and tracemalloc.is_tracing():
+            peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            peak_bytes = max(peak - self._mem_start, 0)
+            if stack and stack[-1]._mem_start is not None:
+                stack[-1]._peak = max(stack[-1]._peak, peak)
+            tracemalloc.reset_peak()
+        record({
+            'name': self.name, 'start': self._start, 'wall_s': wall, 'cpu_s': cpu,
+            'rows': self.rows, 'peak_bytes': peak_bytes, 'cache': self.cache,
+            'parent': self.parent, 'depth': self.depth, 'thread': threading.get_ident(),
+            'error': exc_type.__name__ if exc_type else None, **self.labels,
+        })
+        return False
+
+
+class _NoopSpan:
+    """Span vacío para cuando la instrumentación está desactivada."""
+    __slots__ = ()
+    rows = cache = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name, rows=None, **labels):
+    """Context manager que mide un bloque (no hace nada si está desactivada)."""
+    if not is_enabled():
+        return _NOOP
+    return Span(name, rows, **labels)
+
+
+def current_span():
+    """Span abierto más interno del hilo (o un span vacío)."""
+    stack = _local.stack
+    return stack[-1] if stack else _NOOP
+
+
+def instrument(name=None):
+    """
+    Decorador: mide cada llamada como un span con las filas del primer
+    argumento (o del resultado, si el argumento no tiene filas, como un
+    símbolo). Desactivada, solo agrega una comprobación por llamada.
+    """
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _state.active or not is_enabled():
+                return fn(*args, **kwargs)
+            with Span(span_name, _rows(args[0]) if args else None) as current:
+                result = fn(*args, **kwargs)
+                if current.rows is None:
+                    current.rows = _rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def record_cache(cache, hit):
+    """Cuenta un acierto/fallo de la caché 'cache' y lo anota en el span actual."""
+    if not is_enabled():
+        return
+    result = 'hit' if hit else 'miss'
+    current_span().cache = result
+    with _lock:
+        key = (cache, result)
+        _counters[key] = _counters.get(key, 0) + 1
+
+
+def record(entry):
+    """Guarda un span terminado."""
+    with _lock:
+        _spans.append(entry)
+    for collector in _local.collectors:
+        collector.append(entry)
+
+
+def merge(spans, counters):
+    """Incorpora spans y contadores de caché medidos en otro proceso (p. ej. un worker)."""
+    with _lock:
+        _spans.extend(spans)
+        for key, value in counters.items():
+            _counters[key] = _counters.get(key, 0) + value
+
+
+class collect:
+    """
+    Junta los spans de este hilo mientras dura el bloque, aunque la
+    instrumentación global esté desactivada:
+
+        with collect() as spans:
+            ...
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+
+    def __enter__(self):
+        self.spans = []
+        _local.collectors.append(self.spans)
+        with _lock:
+            _state.collecting += 1
+            _state.active = True
+        if self.trace_memory:
+            _start_tracemalloc()
+        return self.spans
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.collectors.remove(self.spans)
+        with _lock:
+            _state.collecting -= 1
+            _state.active = _state.enabled or _state.collecting > 0
+        if self.trace_memory and not _state.enabled:
+            _stop_tracemalloc()
+        return False
+
+
+def get_spans():
+    with _lock:
+        return list(_spans)
+
+
+def get_cache_counters():
+    """{(caché, 'hit'/'miss'): cantidad}."""
+    with _lock:
+        return dict(_counters)
+
+
+def to_jsonl(spans=None):
+    """Spans (por defecto, todos los registrados) como texto JSON lines."""
+    spans = get_spans() if spans is None else spans
+    return ''.join(json.dumps(s, default=str) + '\n' for s in spans)
+
+
+def export_jsonl(path, spans=None):
+    """Agrega los spans a un archivo JSON lines."""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(to_jsonl(spans))
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(spans=None, counters=None):
+    """Métricas agregadas por etapa en el formato de texto de Prometheus."""
+    spans = get_spans() if spans is None else spans
+    counters = get_cache_counters() if counters is None else counters
+
+    totals = {}
+    for s in spans:
+        t = totals.setdefault(s['name'], {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'rows': 0, 'peak': 0, 'errors': 0})
+        t['count'] += 1
+        t['wall'] += s['wall_s']
+        t['cpu'] += s['cpu_s']
+        t['rows'] += s.get('rows') or 0
+        t['peak'] = max(t['peak'], s.get('peak_bytes') or 0)
+        t['errors'] += bool(s.get('error'))
+
+    p = METRIC_PREFIX
+    series = [
+        ('stage_calls_total', 'counter', "Llamadas por etapa.", 'count'),
+        ('stage_wall_seconds_total', 'counter', "Tiempo de pared acumulado por etapa.", 'wall'),
+        ('stage_cpu_seconds_total', 'counter', "Tiempo de CPU acumulado por etapa.", 'cpu'),
+        ('stage_rows_total', 'counter', "Filas procesadas por etapa.", 'rows'),
+        ('stage_errors_total', 'counter', "Llamadas con excepción por etapa.", 'errors'),
+        ('stage_peak_bytes', 'gauge', "Pico de memoria asignada (máximo observado) por etapa.", 'peak'),
+    ]
+    lines = []
+    for metric, kind, help_text, key in series:
+        lines.append(f"# HELP {p}_{metric} {help_text}")
+        lines.append(f"# TYPE {p}_{metric} {kind}")
+        for stage, t in sorted(totals.items()):
+            lines.append(f'{p}_{metric}{{stage="{_label(stage)}"}} {t[key]}')
+    lines.append(f"# HELP {p}_cache_requests_total Consultas a caché por resultado.")
+    lines.append(f"# TYPE {p}_cache_requests_total counter")
+    for (cache, result), value in sorted(counters.items()):
+        lines.append(f'{p}_cache_requests_total{{cache="{_label(cache)}",result="{result}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def summary_frame(spans):
+    """DataFrame de spans para mostrar (tiempos en ms, memoria en MB)."""
+    import pandas as pd
+
+    frame = pd.DataFrame(spans)
+    if frame.empty:
+        return frame
+    frame['etapa'] = ['  ' * int(d) + n for d, n in zip(frame['depth'], frame['name'])]
+    frame['pared_ms'] = frame['wall_s'] * 1000
+    frame['cpu_ms'] = frame['cpu_s'] * 1000
+    frame['pico_mb'] = frame['peak_bytes'].astype(float) / 2 ** 20
+    # Los spans se registran al terminar: se ordenan por inicio para ver el árbol
+    frame = frame.sort_values('start')
+    return frame[['etapa', 'pared_ms', 'cpu_ms', 'rows', 'pico_mb', 'cache', 'error']].reset_index(drop=True)
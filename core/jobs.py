@@ -0,0 +1,274 @@
+# core/jobs.py
+"""
+Ejecutor de trabajos en segundo plano (pool de procesos) para las tareas
+lentas del dashboard: descomposición y proyección.
+
+  - Deduplicación: la clave de un trabajo es la función más sus argumentos
+    (los DataFrames, por contenido). Pedir una clave en curso o ya
+    terminada devuelve el mismo trabajo, aunque lo pida otra sesión.
+  - Reemplazo: cada 'owner' (p. ej. sesión + sección) tiene a lo sumo un
+    trabajo vigente. Al pedir otro, el anterior se cancela si nadie más lo
+    espera y todavía no empezó; un proceso no se interrumpe a mitad, así
+    que si ya empezó termina y su resultado queda en la caché.
+  - Caché acotada de resultados terminados (LRU por cantidad).
+  - Progreso estimado: tiempo transcurrido frente a la duración reciente de
+    los trabajos del mismo tipo (los procesos no informan avance parcial).
+
+Los workers nacen de un forkserver que precarga PRELOAD_MODULES ('spawn'
+donde no existe): un fork directo del servidor de Streamlit, que tiene
+hilos, podría copiar locks tomados. Streamlit reemplaza '__main__' por el
+script del dashboard y multiprocessing lo volvería a ejecutar en cada
+worker; por eso todos los workers se crean juntos al armar el pool, con un
+'__main__' vacío, y el pool no vuelve a crear procesos. Si un worker muere
+(p. ej. por falta de memoria) el pool queda roto y se arma uno nuevo.
+"""
+import os
+import sys
+import time
+import types
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from core.instrumentation import record_cache
+
+# Peso de la última duración en la media móvil por tipo de trabajo
+DURATION_SMOOTHING = 0.3
+# Módulos que el forkserver importa una vez: los workers arrancan con ellos cargados
+PRELOAD_MODULES = ('core.analysis', 'core.forecasting', 'core.figures')
+# Cuánto ocupa a su worker cada tarea de arranque (ver JobExecutor._pool)
+WARM_UP_SECONDS = 0.2
+
+
+def _mp_context(preload):
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(list(preload))
+    return context
+
+
+@contextmanager
+def _blank_main():
+    """
+    '__main__' vacío mientras se crean procesos: los workers no reejecutan el
+    script principal. Es global al proceso: solo se usa al armar el pool.
+    """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+def _digest_value(digest, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        names = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        digest.update(repr(names).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode('utf-8'))
+        digest.update(np.ascontiguousarray(value).tobytes())
+    else:
+        digest.update(repr(value).encode('utf-8'))
+
+
+def job_key(fn, args=(), kwargs=None):
+    """Clave estable de una llamada: módulo y nombre de la función + hash de los argumentos."""
+    digest = hashlib.sha1(f"{fn.__module__}.{fn.__qualname__}".encode('utf-8'))
+    for value in args:
+        _digest_value(digest, value)
+    for name, value in sorted((kwargs or {}).items()):
+        digest.update(name.encode('utf-8'))
+        _digest_value(digest, value)
+    return digest.hexdigest()
+
+
+def _warm_up(seconds):
+    """Tarea de arranque: mantiene ocupado a su worker para que el siguiente submit cree otro."""
+    time.sleep(seconds)
+
+
+def _run(fn, args, kwargs):
+    """Ejecuta el trabajo en el proceso del pool y mide su duración."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+class Job:
+    """Un trabajo enviado al pool (compartido entre quienes pidieron la misma clave)."""
+
+    def __init__(self, key, kind, future):
+        self.key = key
+        self.kind = kind
+        self.future = future
+        self.submitted = time.time()
+        self.duration = None
+        self.owners = set()
+
+    def done(self):
+        return self.future.done()
+
+    def status(self):
+        """'pendiente', 'en curso', 'listo', 'error' o 'cancelado'."""
+        if self.future.cancelled():
+            return 'cancelado'
+        if self.future.done():
+            return 'error' if self.future.exception() is not None else 'listo'
+        return 'en curso' if self.future.running() else 'pendiente'
+
+    def elapsed(self):
+        return self.duration if self.duration is not None else time.time() - self.submitted
+
+    def progress(self, expected=None):
+        """Fracción estimada (0..1); sin duración de referencia, None."""
+        if self.done():
+            return 1.0
+        if not expected:
+            return None
+        # No se llega a 1 hasta que termina de verdad
+        return min(self.elapsed() / expected, 0.95)
+
+    def result(self, timeout=None):
+        """Resultado del trabajo (relanza la excepción si falló)."""
+        return self.future.result(timeout)[0]
+
+
+class JobExecutor:
+    """
+    Pool de procesos con deduplicación por clave, reemplazo por 'owner' y
+    caché LRU de resultados ('max_results' trabajos terminados, incluidos
+    los que fallaron, para no reintentarlos en cada ejecución del script).
+    """
+
+    def __init__(self, max_workers=None, max_results=32, preload=PRELOAD_MODULES):
+        self.max_workers = max_workers or max(1, min(4, os.cpu_count() or 1))
+        self.max_results = max_results
+        self.preload = preload
+        self._executor = None
+        self._running = {}
+        self._results = OrderedDict()
+        self._owners = {}
+        self._durations = {}
+        # Reentrante: cancel() ejecuta el callback de _finish en el mismo hilo
+        self._lock = threading.RLock()
+
+    def _pool(self):
+        if self._executor is None:
+            executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_mp_context(self.preload))
+            # El pool crea procesos dentro de submit() mientras no tenga uno libre: una
+            # tarea de arranque por worker los crea todos ahora, y ya no se crean más
+            with _blank_main():
+                for _ in range(self.max_workers):
+                    executor.submit(_warm_up, WARM_UP_SECONDS)
+            self._executor = executor
+        return self._executor
+
+    def _discard_pool(self):
+        """Descarta un pool roto (un worker murió): el próximo submit arma uno nuevo."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn, *args, owner=None, kind=None, **kwargs):
+        """
+        Envía fn(*args, **kwargs) al pool, o devuelve el trabajo existente con
+        la misma clave (en curso o en la caché). 'fn' debe poder importarse
+        desde un proceso nuevo (función de módulo). Con 'owner', el trabajo
+        pasa a ser el vigente de ese owner (ver release).
+        """
+        key = job_key(fn, args, kwargs)
+        created = False
+        with self._lock:
+            job = self._results.get(key)
+            if job is not None:
+                self._results.move_to_end(key)
+            else:
+                job = self._running.get(key)
+                if job is None or job.future.cancelled():
+                    try:
+                        future = self._pool().submit(_run, fn, args, kwargs)
+                    except BrokenProcessPool:
+                        self._discard_pool()
+                        future = self._pool().submit(_run, fn, args, kwargs)
+                    job = self._running[key] = Job(key, kind or fn.__name__, future)
+                    created = True
+            if owner is not None:
+                self._assign(owner, job)
+        # Si el futuro ya terminó, el callback corre aquí mismo
+        if created:
+            job.future.add_done_callback(lambda _, job=job: self._finish(job))
+        record_cache('jobs', not created)
+        return job
+
+    def _assign(self, owner, job):
+        previous = self._owners.get(owner)
+        job.owners.add(owner)
+        self._owners[owner] = job.key
+        if previous is not None and previous != job.key:
+            self._drop_owner(owner, previous)
+
+    def _drop_owner(self, owner, key):
+        job = self._running.get(key)
+        if job is None:
+            return
+        job.owners.discard(owner)
+        # Solo se cancela si todavía no llegó a un proceso (y nadie más lo espera)
+        if not job.owners and job.future.cancel():
+            self._running.pop(key, None)
+
+    def release(self, owner):
+        """El owner ya no espera su trabajo vigente (p. ej. se ocultó la sección)."""
+        with self._lock:
+            key = self._owners.pop(owner, None)
+            if key is not None:
+                self._drop_owner(owner, key)
+
+    def _finish(self, job):
+        with self._lock:
+            if self._running.get(job.key) is job:
+                del self._running[job.key]
+            # Terminado ya no hay nada que cancelar: se olvidan sus owners
+            for owner in job.owners:
+                if self._owners.get(owner) == job.key:
+                    del self._owners[owner]
+            if job.future.cancelled():
+                return
+            error = job.future.exception()
+            if isinstance(error, BrokenProcessPool):
+                # Falla del pool, no del trabajo: no se guarda, se reintenta en el próximo pedido
+                return
+            if error is None:
+                job.duration = job.future.result()[1]
+                last = self._durations.get(job.kind)
+                self._durations[job.kind] = (job.duration if last is None else
+                                             last + DURATION_SMOOTHING * (job.duration - last))
+            self._results[job.key] = job
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def expected_duration(self, kind):
+        """Duración media reciente (s) de los trabajos de un tipo (None si no hay)."""
+        with self._lock:
+            return self._durations.get(kind)
+
+    def stats(self):
+        with self._lock:
+            return {'en_curso': len(self._running), 'resultados': len(self._results),
+                    'owners': len(self._owners)}
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._running.clear()
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
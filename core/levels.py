@@ -0,0 +1,145 @@
+# core/levels.py
+"""
+Motor de niveles de soporte y resistencia por zonas.
+
+Los picos y valles de find_peaks se agrupan en zonas de precio con un
+clustering por huecos sobre los precios ordenados (en escala logarítmica:
+un hueco mayor que 'tolerance' abre una zona nueva, y ninguna zona supera
+un ancho de 'max_width' para que los toques encadenados en rangos laterales
+no terminen en una sola zona enorme). Cada zona se puntúa por
+la cantidad de toques, ponderados por su antigüedad (vida media en barras),
+y se devuelven solo las 'top_n' más fuertes.
+
+Varios símbolos y varias prominencias se resuelven juntos: find_peaks corre
+una sola vez por serie (con la prominencia mínima) y el clustering y la
+puntuación de todos los grupos se hacen en una única pasada vectorizada.
+"""
+import numpy as np
+import pandas as pd
+
+from core.panel import PricePanel
+from core.instrumentation import instrument
+
+LEVEL_COLUMNS = ['prominence', 'kind', 'level', 'lower', 'upper', 'touches', 'last_touch', 'strength']
+
+
+def _extrema(lows, highs, prominences):
+    """
+    Picos y valles de una serie para todas las prominencias pedidas.
+    Devuelve arreglos (posición, precio, id de prominencia, es_resistencia).
+    """
+    from scipy.signal import find_peaks
+
+    parts = []
+    for values, is_resistance, sign in ((lows, False, -1.0), (highs, True, 1.0)):
+        valid = ~np.isnan(values)
+        positions = np.flatnonzero(valid)
+        peaks, props = find_peaks(sign * values[valid], prominence=min(prominences))
+        for p_id, prominence in enumerate(prominences):
+            selected = peaks[props['prominences'] >= prominence]
+            pos = positions[selected]
+            parts.append((pos, values[pos], np.full(len(pos), p_id), np.full(len(pos), is_resistance)))
+    return [np.concatenate(column) for column in zip(*parts)]
+
+
+def cluster_levels(groups, prices, positions, tolerance=0.01, half_life=250, max_width=None):
+    """
+    Agrupa precios en zonas dentro de cada grupo (clustering por huecos con
+    ancho máximo 'max_width' en log-precio; por defecto 2 * tolerance).
+
+    'groups' es un id entero por toque (p. ej. símbolo x prominencia x tipo).
+    Devuelve un dict de arreglos por zona: group, level (media ponderada),
+    lower, upper, touches, last (última posición) y score (toques ponderados
+    por recencia, con peso 0.5 cada 'half_life' barras antes del toque más
+    reciente del grupo).
+    """
+    order = np.lexsort((prices, groups))
+    g, p, pos = groups[order], prices[order], positions[order]
+
+    log_p = np.log(p)
+    breaks = np.r_[True, (g[1:] != g[:-1]) | (np.diff(log_p) > tolerance)]
+    # Los tramos más anchos que max_width se parten en bloques desde su precio mínimo
+    max_width = 2 * tolerance if max_width is None else max_width
+    first = np.flatnonzero(breaks)[np.cumsum(breaks) - 1]
+    block = np.floor((log_p - log_p[first]) / max_width)
+    breaks[1:] |= block[1:] != block[:-1]
+    starts = np.flatnonzero(breaks)
+    zone = np.cumsum(breaks) - 1
+
+    # Pesos relativos al toque más reciente (peso 1): el del grupo para el
+    # puntaje y el de la zona para el nivel, que así nunca queda en 0/0
+    last = np.maximum.reduceat(pos, starts)
+    new_group = np.r_[True, g[1:] != g[:-1]]
+    group_last = np.maximum.reduceat(pos, np.flatnonzero(new_group))[np.cumsum(new_group) - 1]
+    zone_weights = 0.5 ** ((last[zone] - pos) / half_life)
+    return {
+        'group': g[starts],
+        'level': np.bincount(zone, weights=zone_weights * p) / np.bincount(zone, weights=zone_weights),
+        'lower': p[starts],
+        'upper': np.maximum.reduceat(p, starts),
+        'touches': np.bincount(zone),
+        'last': last,
+        'score': np.bincount(zone, weights=0.5 ** ((group_last - pos) / half_life)),
+    }
+
+
+def _top_zones(zones, top_n):
+    """Las 'top_n' zonas de mayor puntaje por grupo, con la fuerza normalizada a [0, 1]."""
+    order = np.lexsort((-zones['score'], zones['group']))
+    group = zones['group'][order]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    counts = np.diff(np.r_[starts, len(group)])
+    rank = np.arange(len(group)) - np.repeat(starts, counts)
+    best = np.repeat(zones['score'][order][starts], counts)
+    keep = order[rank < top_n]
+    result = {name: values[keep] for name, values in zones.items()}
+    result['strength'] = zones['score'][keep] / best[rank < top_n]
+    return result
+
+
+@instrument()
+def find_key_levels(df, prominence=5, top_n=5, tolerance=0.01, half_life=250, max_width=None):
+    """
+    Zonas de soporte y resistencia más relevantes.
+
+    'df' es un DataFrame con 'low' y 'high' o un PricePanel; 'prominence'
+    puede ser un número o una lista (se resuelven todas juntas).
+    Devuelve un DataFrame con una fila por zona: prominence, kind
+    ('soporte'/'resistencia'), level, lower, upper, touches, last_touch y
+    strength (1 = la zona más fuerte de su grupo). Con un PricePanel se añade
+    la columna 'symbol'. Las filas vienen ordenadas por fuerza dentro de cada grupo.
+    """
+    prominences = sorted(set(np.atleast_1d(prominence).tolist()))
+    if isinstance(df, PricePanel):
+        symbols, dates = df.symbols, df.dates
+        lows, highs = df['low'], df['high']
+    else:
+        symbols, dates = [None], df.index
+        lows = df['low'].to_numpy(dtype=np.float64)[:, None]
+        highs = df['high'].to_numpy(dtype=np.float64)[:, None]
+
+    parts = []
+    for s_id in range(len(symbols)):
+        pos, price, p_id, is_res = _extrema(np.asarray(lows[:, s_id], dtype=np.float64),
+                                            np.asarray(highs[:, s_id], dtype=np.float64), prominences)
+        parts.append((pos, price, (s_id * len(prominences) + p_id) * 2 + is_res))
+    positions, prices, groups = [np.concatenate(column) for column in zip(*parts)]
+
+    columns = (['symbol'] if symbols[0] is not None else []) + LEVEL_COLUMNS
+    if len(prices) == 0:
+        return pd.DataFrame(columns=columns)
+
+    zones = _top_zones(cluster_levels(groups, prices, positions, tolerance, half_life, max_width), top_n)
+    group = zones['group']
+    result = pd.DataFrame({
+        'symbol': np.asarray(symbols, dtype=object)[group // 2 // len(prominences)],
+        'prominence': np.asarray(prominences)[group // 2 % len(prominences)],
+        'kind': np.where(group % 2 == 1, 'resistencia', 'soporte'),
+        'level': zones['level'],
+        'lower': zones['lower'],
+        'upper': zones['upper'],
+        'touches': zones['touches'],
+        'last_touch': dates[zones['last']],
+        'strength': zones['strength'],
+    })
+    return result[columns].reset_index(drop=True)
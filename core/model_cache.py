@@ -0,0 +1,212 @@
+# core/model_cache.py
+"""
+Caché de modelos Prophet ya entrenados.
+
+La clave combina el símbolo, un hash del contenido del tramo de entrenamiento
+(fechas y precios) y los hiperparámetros del modelo. Hay dos niveles:
+  - Memoria: LRU con un número máximo de modelos (y de proyecciones por horizonte).
+  - Disco: modelos serializados en JSON (prophet.serialize), con desalojo
+    por tamaño total (los menos usados recientemente primero).
+Si solo se añadieron barras nuevas al final de un tramo ya entrenado, el
+modelo nuevo arranca desde los parámetros del anterior (warm start).
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from core.instrumentation import instrument, record_cache
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'models')
+
+
+def training_hash(df_prophet):
+    """Hash del contenido del tramo de entrenamiento (columnas 'ds' e 'y')."""
+    digest = hashlib.sha1()
+    digest.update(df_prophet['ds'].to_numpy(dtype='datetime64[ns]').view(np.int64).tobytes())
+    digest.update(df_prophet['y'].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def params_key(params):
+    """Representación estable de los hiperparámetros."""
+    return json.dumps(params, sort_keys=True)
+
+
+def stan_init(model):
+    """Parámetros de un modelo ajustado, en el formato que acepta Prophet.fit(init=...)."""
+    res = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        res[pname] = model.params[pname][0][0]
+    for pname in ['delta', 'beta']:
+        res[pname] = model.params[pname][0]
+    return res
+
+
+class ModelCache:
+    """Caché en dos niveles (memoria LRU + disco) de modelos Prophet ajustados."""
+
+    def __init__(self, directory=DEFAULT_MODEL_DIR, max_memory_items=16, max_disk_bytes=512 * 2 ** 20):
+        self.directory = directory
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._forecasts = OrderedDict()
+        # Último tramo entrenado por (símbolo, hiperparámetros): base para el warm start
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def _key(self, symbol, data_hash, params):
+        raw = f"{symbol}|{data_hash}|{params_key(params)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    # --- Nivel en memoria ---
+
+    def _memory_get(self, key, store=None):
+        store = self._memory if store is None else store
+        with self._lock:
+            model = store.get(key)
+            if model is not None:
+                store.move_to_end(key)
+            return model
+
+    def _memory_put(self, key, model, store=None):
+        store = self._memory if store is None else store
+        with self._lock:
+            store[key] = model
+            store.move_to_end(key)
+            while len(store) > self.max_memory_items:
+                store.popitem(last=False)
+
+    # --- Nivel en disco ---
+
+    def _disk_get(self, key):
+        from prophet.serialize import model_from_json
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            model = model_from_json(f.read())
+        os.utime(path)  # marca de uso reciente para el desalojo
+        return model
+
+    def _disk_put(self, key, model):
+        from prophet.serialize import model_to_json
+
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(model_to_json(model))
+        os.replace(tmp_path, self._path(key))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Borra los modelos usados hace más tiempo hasta respetar max_disk_bytes."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    # --- API ---
+
+    @instrument('core.model_cache.ModelCache.get_or_fit')
+    def get_or_fit(self, symbol, df_prophet, params, build_model):
+        """
+        Devuelve un modelo ajustado para (símbolo, tramo, hiperparámetros).
+        'build_model' crea un Prophet sin ajustar con esos hiperparámetros.
+        Devuelve (modelo, origen) con origen en 'memoria', 'disco', 'warm' o 'nuevo'.
+        """
+        data_hash = training_hash(df_prophet)
+        key = self._key(symbol, data_hash, params)
+
+        latest = (df_prophet['ds'].max(), len(df_prophet), data_hash, key)
+
+        model = self._memory_get(key)
+        if model is not None:
+            record_cache('prophet_model', True)
+            self._set_latest(symbol, params, latest)
+            return model, 'memoria'
+
+        model = self._disk_get(key)
+        record_cache('prophet_model', model is not None)
+        if model is not None:
+            self._memory_put(key, model)
+            self._set_latest(symbol, params, latest)
+            return model, 'disco'
+
+        model = build_model()
+        source = 'nuevo'
+        init = self._warm_start_params(symbol, df_prophet, params)
+        if init is not None:
+            try:
+                model.fit(df_prophet, init=init)
+                source = 'warm'
+            except Exception:
+                # Dimensiones incompatibles (p. ej. nuevos feriados): ajuste en frío
+                model = build_model()
+                init = None
+        if init is None:
+            model.fit(df_prophet)
+
+        self._memory_put(key, model)
+        self._disk_put(key, model)
+        self._set_latest(symbol, params, latest)
+        return model, source
+
+    def forecast(self, symbol, df_prophet, params, build_model, periods):
+        """
+        Devuelve (modelo, proyección) a 'periods' días. La proyección también
+        se guarda en memoria, con el horizonte como parte de la clave.
+        """
+        model, _ = self.get_or_fit(symbol, df_prophet, params, build_model)
+        key = (self._key(symbol, training_hash(df_prophet), params), periods)
+        forecast = self._memory_get(key, self._forecasts)
+        record_cache('prophet_forecast', forecast is not None)
+        if forecast is None:
+            future = model.make_future_dataframe(periods=periods)
+            forecast = model.predict(future)
+            self._memory_put(key, forecast, self._forecasts)
+        return model, forecast
+
+    def _set_latest(self, symbol, params, latest):
+        with self._lock:
+            self._latest[(symbol, params_key(params))] = latest
+
+    def _warm_start_params(self, symbol, df_prophet, params):
+        """Parámetros del último modelo si el tramo nuevo solo añade barras al final."""
+        with self._lock:
+            latest = self._latest.get((symbol, params_key(params)))
+        if latest is None:
+            return None
+        last_ds, n_rows, old_hash, old_key = latest
+        if len(df_prophet) <= n_rows or df_prophet['ds'].iloc[n_rows - 1] != last_ds:
+            return None
+        if training_hash(df_prophet.iloc[:n_rows]) != old_hash:
+            return None
+        old_model = self._memory_get(old_key) or self._disk_get(old_key)
+        return stan_init(old_model) if old_model is not None else None
+
+
+_default_cache = None
+
+
+def get_default_model_cache():
+    """Caché compartida por el dashboard y los reportes."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ModelCache()
+    return _default_cache
@@ -0,0 +1,133 @@
+# core/panel.py
+import os
+import json
+import numpy as np
+import pandas as pd
+
+
+def _field_filename(field):
+    """Nombre de archivo .npy para un campo ('adjusted close' -> 'adjusted_close.npy')."""
+    return field.replace(' ', '_') + '.npy'
+
+
+class PricePanel:
+    """
+    Panel ancho fecha x símbolo para análisis transversal.
+
+    Cada campo (precios, rendimientos, volumen...) es un arreglo float contiguo
+    de forma (n_fechas, n_símbolos) que comparte un único índice de fechas.
+    Los huecos (símbolos sin cotización en una fecha) son NaN.
+    Guardado con save() y abierto con PricePanel.open(), los arreglos son
+    memory-mapped en solo lectura: varios procesos comparten una sola copia.
+    """
+
+    def __init__(self, dates, symbols, fields):
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = list(symbols)
+        self.fields = dict(fields)
+        self._positions = {s: i for i, s in enumerate(self.symbols)}
+
+    # --- Construcción ---
+
+    @classmethod
+    def from_frame(cls, panel_df, dtype=np.float64):
+        """Crea el panel a partir de un DataFrame con columnas MultiIndex (campo, símbolo)."""
+        index = panel_df.index
+        if getattr(index, 'tz', None) is not None:
+            index = index.tz_localize(None)
+        fields_in_df = panel_df.columns.get_level_values(0).unique()
+        symbols = sorted(panel_df.columns.get_level_values(1).unique())
+        fields = {}
+        for field in fields_in_df:
+            block = panel_df[field].reindex(columns=symbols)
+            fields[field] = np.ascontiguousarray(block.to_numpy(dtype=dtype, na_value=np.nan))
+        return cls(index, symbols, fields)
+
+    @classmethod
+    def from_frames(cls, frames, dtype=np.float64):
+        """Crea el panel a partir de un dict {símbolo: DataFrame OHLCV} (ej. get_daily_data_many)."""
+        frames = {s: df for s, df in frames.items() if not df.empty}
+        if not frames:
+            return cls(pd.DatetimeIndex([]), [], {})
+        panel_df = pd.concat(frames, axis=1, names=['symbol', 'field']).swaplevel(axis=1)
+        return cls.from_frame(panel_df.sort_index(), dtype=dtype)
+
+    def with_fields(self, new_fields):
+        """Devuelve un panel nuevo que comparte los arreglos existentes y añade 'new_fields'."""
+        fields = dict(self.fields)
+        fields.update(new_fields)
+        return PricePanel(self.dates, self.symbols, fields)
+
+    # --- Persistencia (memory-mapped) ---
+
+    def save(self, directory):
+        """Guarda cada campo como .npy y los metadatos (fechas, símbolos) en la carpeta."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'dates.npy'), self.dates.values.astype('datetime64[ns]'))
+        meta = {'symbols': self.symbols, 'fields': {f: _field_filename(f) for f in self.fields}}
+        for field, values in self.fields.items():
+            np.save(os.path.join(directory, _field_filename(field)), np.ascontiguousarray(values))
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def open(cls, directory, mmap_mode='r'):
+        """Abre un panel guardado. Con mmap_mode='r' no se copia nada a memoria."""
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        dates = np.load(os.path.join(directory, 'dates.npy'))
+        fields = {
+            field: np.load(os.path.join(directory, filename), mmap_mode=mmap_mode)
+            for field, filename in meta['fields'].items()
+        }
+        return cls(dates, meta['symbols'], fields)
+
+    # --- Acceso y cortes ---
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.symbols)
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    def __getitem__(self, field):
+        """Arreglo (n_fechas, n_símbolos) de un campo, sin copia."""
+        return self.fields[field]
+
+    def frame(self, field):
+        """DataFrame fecha x símbolo de un campo (vista sobre el arreglo)."""
+        return pd.DataFrame(self.fields[field], index=self.dates, columns=self.symbols, copy=False)
+
+    def _symbol_indexer(self, symbols):
+        """Indexador de columnas: un slice (vista) si las posiciones son equiespaciadas."""
+        if symbols is None:
+            return slice(None), self.symbols
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        positions = [self._positions[s] for s in symbols]
+        if len(positions) == 1:
+            return slice(positions[0], positions[0] + 1), list(symbols)
+        steps = np.diff(positions)
+        if steps[0] > 0 and np.all(steps == steps[0]):
+            return slice(positions[0], positions[-1] + 1, int(steps[0])), list(symbols)
+        # Subconjunto arbitrario: NumPy necesita indexado avanzado (copia)
+        return np.asarray(positions), list(symbols)
+
+    def sel(self, start=None, end=None, symbols=None):
+        """
+        Corta el panel por rango de fechas (inclusive) y subconjunto de símbolos.
+        El corte por fechas siempre es una vista; el de símbolos también si
+        son contiguos o equiespaciados en el panel.
+        """
+        i0 = self.dates.searchsorted(pd.Timestamp(start), side='left') if start is not None else 0
+        i1 = self.dates.searchsorted(pd.Timestamp(end), side='right') if end is not None else len(self.dates)
+        cols, selected = self._symbol_indexer(symbols)
+        fields = {f: values[i0:i1, cols] for f, values in self.fields.items()}
+        return PricePanel(self.dates[i0:i1], selected, fields)
+
+    def to_frame(self, symbol):
+        """DataFrame de un símbolo con los campos como columnas (formato de get_daily_data)."""
+        j = self._positions[symbol]
+        data = pd.DataFrame({f: values[:, j] for f, values in self.fields.items()}, index=self.dates)
+        return data.dropna(how='all')
@@ -0,0 +1,100 @@
+# core/providers.py
+import threading
+import pandas as pd
+
+# Columnas normalizadas que devuelve cualquier proveedor
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'adjusted close', 'volume']
+
+
+class DataProvider:
+    """
+    Interfaz base para los proveedores de barras diarias.
+    Cada proveedor devuelve un DataFrame con el índice de fechas y las
+    columnas de OHLCV_COLUMNS (las que existan).
+    """
+    name = "base"
+    # Máximo de descargas simultáneas permitidas contra este proveedor
+    max_concurrency = 4
+
+    def __init__(self, max_concurrency=None):
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+
+    def slot(self):
+        """Semáforo que limita las descargas concurrentes (usar con 'with')."""
+        return self._semaphore
+
+    def fetch_daily(self, symbol, start=None):
+        """Devuelve las barras de 'symbol' desde 'start' (inclusive). None = todo el historial."""
+        raise NotImplementedError
+
+
+def normalize_ohlcv(data, symbol=""):
+    """Renombra las columnas al formato del proyecto y filtra las que usamos."""
+    data = data.rename(columns={
+        'Open': 'open',
+        'High': 'high',
+        'Low': 'low',
+        'Close': 'close',
+        'Adj Close': 'adjusted close',
+        'Volume': 'volume'
+    })
+
+    # Si no llega 'Adj Close', usamos 'close' como fallback
+    if 'adjusted close' not in data.columns and 'close' in data.columns:
+        print(f"Advertencia: 'Adj Close' no encontrado para {symbol}. Usando 'close' como 'adjusted close'.")
+        data['adjusted close'] = data['close']
+
+    cols_a_devolver = [col for col in OHLCV_COLUMNS if col in data.columns]
+    return data[cols_a_devolver]
+
+
+class YFinanceProvider(DataProvider):
+    """Proveedor basado en yfinance (requiere red)."""
+    name = "yfinance"
+
+    def fetch_daily(self, symbol, start=None):
+        import yfinance as yf
+
+        ticker = yf.Ticker(symbol)
+        # auto_adjust=False para que nos dé 'Adj Close' por separado
+        if start is None:
+            data = ticker.history(period="max", auto_adjust=False)
+        else:
+            data = ticker.history(start=pd.Timestamp(start).strftime('%Y-%m-%d'), auto_adjust=False)
+
+        if data.empty:
+            return pd.DataFrame()
+        return normalize_ohlcv(data, symbol)
+
+
+class InMemoryProvider(DataProvider):
+    """
+    Proveedor local sin red: sirve DataFrames ya cargados (por ejemplo,
+    datos sintéticos o CSV). Útil para pruebas y trabajos offline.
+    """
+    name = "memory"
+    max_concurrency = 64
+
+    def __init__(self, frames, max_concurrency=None):
+        super().__init__(max_concurrency)
+        self.frames = {sym.upper(): df for sym, df in frames.items()}
+
+    def fetch_daily(self, symbol, start=None):
+        data = self.frames.get(symbol.upper())
+        if data is None or data.empty:
+            return pd.DataFrame()
+        if start is not None:
+            data = data.loc[data.index >= _align_tz(pd.Timestamp(start), data.index)]
+        return normalize_ohlcv(data.copy(), symbol)
+
+
+def _align_tz(ts, index):
+    """Ajusta la zona horaria de 'ts' a la del índice para poder comparar."""
+    tz = getattr(index, 'tz', None)
+    if tz is not None and ts.tzinfo is None:
+        return ts.tz_localize(tz)
+    if tz is None and ts.tzinfo is not None:
+        return ts.tz_localize(None)
+    return ts
@@ -0,0 +1,244 @@
+# core/report_html.py
+"""
+Escritura compacta y sin red de los reportes HTML.
+
+  - plotly.js se incrusta una vez en el reporte ('embed'), se referencia una
+    copia local compartida por todo un lote ('shared') o se toma del CDN con
+    la versión exacta del paquete instalado ('cdn').
+  - Los datos numéricos de las trazas se codifican como arreglos tipados en
+    base64 ({'dtype', 'bdata'}, soportado desde plotly.js 2.28) y las fechas
+    diarias se escriben sin la parte horaria. Las líneas con fechas
+    equiespaciadas (p. ej. la descomposición) se escriben como x0 + dx.
+  - El tema de Plotly (layout.template, varios KB por figura) se escribe una
+    sola vez por página y las figuras lo referencian.
+  - La página se arma con plantillas y se escribe de una sola vez, con gzip
+    opcional. write_report mide tamaño y tiempo y puede exigir un presupuesto.
+"""
+import os
+import gzip
+import json
+import time
+import base64
+from html import escape
+from string import Template
+
+import numpy as np
+
+PLOTLYJS_MODES = ('embed', 'shared', 'cdn')
+SHARED_PLOTLYJS_NAME = 'plotly.min.js'
+
+# Tipos que plotly.js acepta en arreglos tipados
+_TYPED_DTYPES = {'f4', 'f8', 'i1', 'u1', 'i2', 'u2', 'i4', 'u4'}
+# Por debajo de este tamaño el JSON plano es igual o más corto
+_MIN_TYPED_LENGTH = 8
+# Primera versión de plotly.js que entiende {'dtype', 'bdata'}
+_TYPED_ARRAYS_SINCE = (2, 28)
+
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>$title</title>
+<style>$css</style>
+$plotlyjs
+<script>var REPORT_TEMPLATES = [$templates];</script>
+</head><body><div class='container'>
+$body
+</div></body></html>
+""")
+
+FIGURE_TEMPLATE = Template("""<div id="$div_id" class="plotly-graph-div"></div>
+<script>(function () { var layout = $layout; layout.template = REPORT_TEMPLATES[$template];
+Plotly.newPlot("$div_id", $data, layout, {"responsive": true}); })();</script>
+""")
+
+
+class ReportBudgetExceeded(Exception):
+    """El reporte escrito supera el tamaño máximo permitido ('stats' como en write_report)."""
+
+    def __init__(self, message, stats):
+        super().__init__(message)
+        self.stats = stats
+
+
+def _typed(values, float_dtype):
+    """Codifica un arreglo numérico como {'dtype', 'bdata'} (None si no corresponde)."""
+    kind = values.dtype.kind
+    if kind == 'f':
+        values = values.astype(float_dtype)
+    elif kind == 'b':
+        values = values.astype('u1')
+    elif kind in 'iu':
+        if values.size and (values.min() < np.iinfo(np.int32).min or values.max() > np.iinfo(np.int32).max):
+            values = values.astype('f8')
+        else:
+            values = values.astype('i4')
+    else:
+        return None
+    dtype = values.dtype.str.lstrip('<|=')
+    if dtype not in _TYPED_DTYPES:
+        return None
+    return {'dtype': dtype, 'bdata': base64.b64encode(np.ascontiguousarray(values).tobytes()).decode('ascii')}
+
+
+def _dates(values):
+    """Fechas como texto ISO; sin hora si todas son a medianoche."""
+    values = values.astype('datetime64[ns]')
+    valid = values[~np.isnat(values)]
+    daily = (valid.astype('datetime64[D]') == valid).all()
+    return np.datetime_as_string(values, unit='D' if daily else 's').tolist()
+
+
+def typed_arrays_supported():
+    """True si el plotly.js del paquete instalado acepta arreglos tipados en base64."""
+    from plotly.offline import get_plotlyjs_version
+
+    version = tuple(int(part) for part in get_plotlyjs_version().split('.')[:2])
+    return version >= _TYPED_ARRAYS_SINCE
+
+
+def compact_value(value, float_dtype='f4'):
+    """
+    Reemplaza recursivamente los arreglos numéricos por arreglos tipados en
+    base64. Con float_dtype=None se dejan como listas JSON (plotly.js antiguo).
+    """
+    if isinstance(value, dict):
+        if float_dtype is None:
+            return {k: compact_value(v, float_dtype) for k, v in value.items()}
+        if 'bdata' in value and 'dtype' in value:
+            # Ya codificado por plotly: se re-codifica con 'float_dtype'
+            if value['dtype'].startswith('f') and 'shape' not in value:
+                raw = np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype'])
+                return _typed(raw, float_dtype)
+            return value
+        return {k: compact_value(v, float_dtype) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if float_dtype is not None and len(value) >= _MIN_TYPED_LENGTH and all(isinstance(v, (int, float)) and not isinstance(v, bool)
+                                                   for v in value):
+            return _typed(np.asarray(value), float_dtype)
+        return [compact_value(v, float_dtype) for v in value]
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'M':
+            return _dates(value)
+        if float_dtype is not None and value.ndim == 1 and len(value) >= _MIN_TYPED_LENGTH:
+            encoded = _typed(value, float_dtype)
+            if encoded is not None:
+                return encoded
+        return compact_value(value.tolist(), float_dtype)
+    return value
+
+
+def _dumps(obj, float_dtype='f4'):
+    from plotly.utils import PlotlyJSONEncoder
+
+    text = json.dumps(compact_value(obj, float_dtype), cls=PlotlyJSONEncoder, separators=(',', ':'))
+    # Un '</script>' dentro de un texto cerraría el bloque <script> de la figura
+    return text.replace('</', '<\\/')
+
+
+def _regular_dates(data, layout):
+    """
+    Reemplaza el eje x de las trazas 'scatter' con fechas equiespaciadas por
+    x0 (fecha inicial) y dx (paso en ms), fijando el eje como 'date'.
+    """
+    for trace in data:
+        x = trace.get('x')
+        if trace.get('type', 'scatter') != 'scatter' or not isinstance(x, np.ndarray) \
+                or x.dtype.kind != 'M' or len(x) < _MIN_TYPED_LENGTH:
+            continue
+        steps = np.diff(x.astype('datetime64[ms]').astype(np.int64))
+        if steps[0] <= 0 or (steps != steps[0]).any():
+            continue
+        axis = 'xaxis' + trace.get('xaxis', 'x')[1:]
+        layout[axis] = dict(layout.get(axis, {}))
+        layout[axis].setdefault('type', 'date')
+        del trace['x']
+        trace['x0'] = _dates(x[:1])[0]
+        trace['dx'] = int(steps[0])
+
+
+def figure_json(fig, float_dtype='f4'):
+    """(data, layout, template) de una figura como JSON compacto; el layout va sin el tema."""
+    spec = fig.to_plotly_json()
+    layout = dict(spec['layout'])
+    template = layout.pop('template', {})
+    _regular_dates(spec['data'], layout)
+    return _dumps(spec['data'], float_dtype), _dumps(layout, float_dtype), _dumps(template)
+
+
+def _plotlyjs_source():
+    from plotly.offline import get_plotlyjs
+
+    return get_plotlyjs()
+
+
+def ensure_shared_plotlyjs(directory):
+    """Copia plotly.min.js a 'directory' si todavía no está (escritura atómica). Devuelve la ruta."""
+    path = os.path.join(directory, SHARED_PLOTLYJS_NAME)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(_plotlyjs_source())
+        os.replace(tmp_path, path)
+    return path
+
+
+def plotlyjs_tag(mode='embed', directory=None):
+    """Etiqueta <script> para cargar plotly.js según 'mode' ('embed', 'shared' o 'cdn')."""
+    if mode == 'embed':
+        return f"<script>{_plotlyjs_source()}</script>"
+    if mode == 'shared':
+        ensure_shared_plotlyjs(directory)
+        return f"<script src='{SHARED_PLOTLYJS_NAME}'></script>"
+    if mode == 'cdn':
+        from plotly.offline import get_plotlyjs_version
+
+        return f"<script src='https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js'></script>"
+    raise ValueError(f"Modo de plotly.js desconocido: {mode}. Opciones: {list(PLOTLYJS_MODES)}")
+
+
+class HtmlReport:
+    """Acumula las secciones de un reporte y lo arma con las plantillas."""
+
+    def __init__(self, title, css='', float_dtype='f4'):
+        self.title = title
+        self.css = css
+        self.float_dtype = float_dtype if typed_arrays_supported() else None
+        self.parts = []
+        self._templates = {}
+
+    def add(self, html):
+        """Añade HTML ya armado (tablas, párrafos)."""
+        self.parts.append(html)
+
+    def heading(self, text, level=2):
+        self.parts.append(f"<h{level}>{escape(str(text))}</h{level}>")
+
+    def figure(self, fig, div_id):
+        """Añade una figura; los temas repetidos se comparten entre figuras."""
+        data, layout, template = figure_json(fig, self.float_dtype)
+        index = self._templates.setdefault(template, len(self._templates))
+        self.parts.append(FIGURE_TEMPLATE.substitute(div_id=div_id, data=data, layout=layout, template=index))
+
+    def render(self, plotlyjs=''):
+        """Página completa como texto."""
+        return PAGE_TEMPLATE.substitute(title=escape(self.title), css=self.css, plotlyjs=plotlyjs,
+                                        templates=','.join(self._templates), body='\n'.join(self.parts))
+
+
+def write_report(path, html, compress=False, max_bytes=None):
+    """
+    Escribe el reporte en una sola operación (con gzip si 'compress', añadiendo
+    '.gz' a la ruta). Devuelve {'path', 'bytes', 'write_s'}; si 'max_bytes' se
+    supera, el archivo queda escrito y se lanza ReportBudgetExceeded.
+    """
+    start = time.perf_counter()
+    payload = html.encode('utf-8')
+    if compress:
+        path = path + '.gz'
+        payload = gzip.compress(payload, compresslevel=6, mtime=0)
+    with open(path, 'wb') as f:
+        f.write(payload)
+    stats = {'path': path, 'bytes': len(payload), 'write_s': round(time.perf_counter() - start, 4)}
+    if max_bytes is not None and len(payload) > max_bytes:
+        raise ReportBudgetExceeded(f"{os.path.basename(path)}: {len(payload) / 1024:.0f} KB supera el "
+                                   f"presupuesto de {max_bytes / 1024:.0f} KB", stats)
+    return stats
@@ -0,0 +1,201 @@
+# core/risk.py
+"""
+Motor vectorizado de Value-at-Risk (VaR) y Expected Shortfall (ES / CVaR).
+
+Métodos: histórico, paramétrico normal, Cornish-Fisher (con la asimetría y
+curtosis de los rendimientos; si el cuantil ajustado deja de ser creciente
+en la cola se usa el histórico) y Monte Carlo. Todos trabajan sobre los
+'log_return' de calculate_returns y devuelven pérdidas como fracción positiva
+del valor (ej. 0.03 = pérdida del 3%), para varios niveles de confianza y
+horizontes (en días) en una sola llamada.
+"""
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from core.panel import PricePanel
+from core.instrumentation import instrument
+from core.stats import skew_kurtosis
+
+VAR_METHODS = ('historical', 'parametric', 'cornish_fisher', 'monte_carlo')
+
+
+def _as_return_matrix(returns):
+    """Convierte la entrada (Series, DataFrame, arreglo o PricePanel) en una matriz fecha x activo."""
+    if isinstance(returns, PricePanel):
+        returns = returns['log_return']
+    if isinstance(returns, (pd.Series, pd.DataFrame)):
+        returns = returns.to_numpy(dtype=np.float64)
+    values = np.asarray(returns, dtype=np.float64)
+    values = values[:, None] if values.ndim == 1 else values
+    # Solo fechas con todos los activos cotizando
+    return values[~np.isnan(values).any(axis=1)]
+
+
+def portfolio_log_returns(returns, weights=None):
+    """Rendimiento logarítmico diario de la cartera (pesos sobre rendimientos simples)."""
+    values = _as_return_matrix(returns)
+    weights = _normalize_weights(weights, values.shape[1])
+    return np.log1p(np.expm1(values) @ weights)
+
+
+def _normalize_weights(weights, n_assets):
+    if weights is None:
+        return np.full(n_assets, 1.0 / n_assets)
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.shape != (n_assets,):
+        raise ValueError(f"Se esperaban {n_assets} pesos, se recibieron {weights.shape}.")
+    return weights
+
+
+def _sample_skew_kurt(x):
+    """
+    Asimetría y curtosis en exceso (las de pandas, ver core.stats.skew_kurtosis).
+    Con menos de 4 datos, 0 y 0: Cornish-Fisher queda en la aproximación normal.
+    """
+    n = len(x)
+    if n < 4:
+        return 0.0, 0.0
+    dev = x - x.mean()
+    m2, m3, m4 = (dev ** 2).mean(), (dev ** 3).mean(), (dev ** 4).mean()
+    skew, kurt = skew_kurtosis(n, m2, m3, m4)
+    return float(skew), float(kurt)
+
+
+def _horizon_sums(log_returns, horizon):
+    """Rendimientos logarítmicos acumulados a 'horizon' días (ventanas solapadas)."""
+    if horizon == 1:
+        return log_returns
+    cs = np.concatenate([[0.0], np.cumsum(log_returns)])
+    return cs[horizon:] - cs[:-horizon]
+
+
+def _historical(log_returns, alphas, horizon):
+    losses = -np.expm1(_horizon_sums(log_returns, horizon))
+    var = np.quantile(losses, 1 - alphas)
+    es = np.array([losses[losses >= v].mean() for v in var])
+    return var, es
+
+
+def _lognormal_tail(mu, sigma, z):
+    """VaR y ES exactos de exp(X)-1 con X ~ N(mu, sigma) en el cuantil normal z."""
+    var = -np.expm1(mu + z * sigma)
+    es = 1 - np.exp(mu + sigma ** 2 / 2) * ndtr(z - sigma) / ndtr(z)
+    return var, es
+
+
+def _cornish_fisher_z(z, skew, excess_kurt):
+    return (z + (z ** 2 - 1) * skew / 6 + (z ** 3 - 3 * z) * excess_kurt / 24
+            - (2 * z ** 3 - 5 * z) * skew ** 2 / 36)
+
+
+def _cornish_fisher(mu, sigma, skew, excess_kurt, alphas, tail_points=1000):
+    """
+    VaR con el cuantil ajustado; ES como promedio de los VaR en la cola.
+    Devuelve None si el cuantil ajustado no es creciente en la cola (la
+    asimetría y curtosis están fuera del dominio de validez de la expansión).
+    """
+    z = _cornish_fisher_z(ndtri(alphas), skew, excess_kurt)
+    # Grilla de niveles dentro de la cola (punto medio) para integrar el ES
+    u = (np.arange(tail_points) + 0.5) / tail_points
+    tail_z = _cornish_fisher_z(ndtri(np.outer(alphas, u)), skew, excess_kurt)
+    if not (np.all(np.diff(tail_z, axis=1) > 0) and np.all(tail_z[:, -1] < z)):
+        return None
+    var = -np.expm1(mu + z * sigma)
+    tail_losses = -np.expm1(mu + tail_z * sigma)
+    return var, tail_losses.mean(axis=1)
+
+
+def _monte_carlo(values, weights, alphas, horizons, n_scenarios, memory_budget_mb, seed):
+    """
+    Escenarios normales multivariados de los log-rendimientos de los activos,
+    generados por bloques para no superar 'memory_budget_mb'. Solo se guarda
+    la pérdida de la cartera de cada escenario (un float por escenario y horizonte).
+    """
+    rng = np.random.default_rng(seed)
+    n_assets = values.shape[1]
+    mu = values.mean(axis=0)
+    cov = np.atleast_2d(np.cov(values, rowvar=False))
+    chol = np.linalg.cholesky(cov + np.eye(n_assets) * 1e-18)
+
+    # Por escenario: normales estándar + log-rendimientos + rendimientos simples
+    bytes_per_scenario = 8 * n_assets * 3
+    chunk = max(1, min(n_scenarios, int(memory_budget_mb * 2 ** 20 // bytes_per_scenario)))
+
+    losses = np.empty((len(horizons), n_scenarios))
+    for start in range(0, n_scenarios, chunk):
+        stop = min(start + chunk, n_scenarios)
+        z = rng.standard_normal((stop - start, n_assets)) @ chol.T
+        for i, h in enumerate(horizons):
+            # Bajo normalidad i.i.d. el log-rendimiento a h días es N(h*mu, h*cov)
+            scenario = np.expm1(h * mu + np.sqrt(h) * z)
+            losses[i, start:stop] = -(scenario @ weights)
+
+    results = []
+    for i in range(len(horizons)):
+        var = np.quantile(losses[i], 1 - alphas)
+        es = np.array([losses[i][losses[i] >= v].mean() for v in var])
+        results.append((var, es))
+    return results
+
+
+@instrument()
+def value_at_risk(returns, confidence_levels=(0.95, 0.99), horizons=(1, 10), methods=VAR_METHODS,
+                  weights=None, n_scenarios=100_000, memory_budget_mb=64, seed=None):
+    """
+    Calcula VaR y Expected Shortfall para todos los métodos, niveles de
+    confianza y horizontes pedidos.
+
+    'returns' son log-rendimientos diarios: una serie ('log_return' de
+    calculate_returns), un DataFrame/arreglo fecha x activo o un PricePanel.
+    Con varios activos se evalúa la cartera con 'weights' (iguales por defecto).
+
+    Devuelve un DataFrame con índice (método, confianza, horizonte) y
+    columnas 'VaR' y 'ES' (pérdidas positivas, en fracción del valor) y
+    'fallback': el método usado en su lugar ('historical' cuando el cuantil
+    de Cornish-Fisher no es creciente en la cola) o '' si ninguno.
+    """
+    values = _as_return_matrix(returns)
+    if len(values) < 2:
+        raise ValueError("Se necesitan al menos 2 rendimientos para calcular el VaR.")
+    weights = _normalize_weights(weights, values.shape[1])
+    port = np.log1p(np.expm1(values) @ weights)
+    alphas = 1 - np.asarray(confidence_levels, dtype=np.float64)
+    horizons = tuple(horizons)
+
+    mu, sigma = port.mean(), port.std(ddof=1)
+    skew, excess_kurt = _sample_skew_kurt(port)
+
+    rows = []
+
+    def _add(method, horizon, var, es, fallback=''):
+        for conf, v, e in zip(confidence_levels, var, es):
+            rows.append((method, conf, horizon, v, e, fallback))
+
+    for method in methods:
+        if method == 'monte_carlo':
+            mc = _monte_carlo(values, weights, alphas, horizons, n_scenarios, memory_budget_mb, seed)
+            for h, (var, es) in zip(horizons, mc):
+                _add(method, h, var, es)
+            continue
+        for h in horizons:
+            if method == 'historical':
+                var, es = _historical(port, alphas, h)
+            elif method == 'parametric':
+                var, es = _lognormal_tail(h * mu, np.sqrt(h) * sigma, ndtri(alphas))
+            elif method == 'cornish_fisher':
+                # Momentos de la suma de h rendimientos i.i.d.
+                skew_h, kurt_h = skew / np.sqrt(h), excess_kurt / h
+                adjusted = _cornish_fisher(h * mu, np.sqrt(h) * sigma, skew_h, kurt_h, alphas)
+                if adjusted is None:
+                    print(f"Advertencia: asimetría {skew_h:.2f} y curtosis {kurt_h:.2f} fuera del dominio "
+                          f"de Cornish-Fisher (horizonte {h}). Usando el VaR histórico.")
+                    _add(method, h, *_historical(port, alphas, h), fallback='historical')
+                    continue
+                var, es = adjusted
+            else:
+                raise ValueError(f"Método de VaR desconocido: {method}")
+            _add(method, h, var, es)
+
+    result = pd.DataFrame(rows, columns=['method', 'confidence', 'horizon', 'VaR', 'ES', 'fallback'])
+    return result.set_index(['method', 'confidence', 'horizon'])
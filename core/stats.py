@@ -0,0 +1,206 @@
+# core/stats.py
+"""
+Estadísticas descriptivas numéricas con intervalos de confianza por
+bootstrap de bloques.
+
+descriptive_stats calcula todas las métricas de get_descriptive_stats en una
+sola pasada: las sumas de potencias 1..4 de los rendimientos desplazados por
+su media (bien condicionadas) alcanzan para media, varianza, asimetría y
+curtosis. La misma reducción se aplica por filas a una matriz de remuestreos.
+
+bootstrap_stats genera los remuestreos como arreglos de índices (bootstrap
+estacionario de Politis-Romano o circular por bloques, que conservan la
+dependencia de corto plazo de la serie), los reduce por lotes con NumPy sin
+superar 'memory_budget_mb' y, opcionalmente, reparte los lotes en procesos.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.instrumentation import instrument
+
+ANNUAL_FACTOR = np.sqrt(252)
+STAT_NAMES = (
+    "Media (Diaria)",
+    "Mediana",
+    "Desv. Estándar (Volatilidad Diaria)",
+    "Volatilidad Anualizada",
+    "Skewness (Asimetría)",
+    "Kurtosis (Curtosis)",
+    "Sharpe Ratio (Anualizado)",
+)
+BOOTSTRAP_METHODS = ('stationary', 'circular')
+
+# Remuestreos por semilla: con la misma 'seed' el resultado no depende del
+# reparto en lotes ni en procesos (mientras un lote quepa en el presupuesto)
+SEED_BATCH = 256
+# Bytes por elemento de un remuestreo: índices, sorteos y valores (y sus potencias)
+_BYTES_PER_ELEMENT = 48
+
+
+# Sumas de desvíos por debajo de esto son error de redondeo (misma tolerancia que pandas)
+_FPERR = 1e-14
+
+
+def skew_kurtosis(n, m2, m3, m4):
+    """
+    Asimetría y curtosis en exceso con corrección de sesgo, igual que
+    Series.skew y Series.kurt de pandas, a partir de la cantidad de datos y
+    los momentos centrales m2..m4 (promedios). Acepta escalares o arreglos.
+    NaN con menos de 3 (asimetría) o 4 (curtosis) datos; 0 si la serie es
+    constante.
+    """
+    n = np.asarray(n, dtype=np.float64)
+    s2, s3, s4 = n * m2, n * m3, n * m4
+    s2 = np.where(np.abs(s2) < _FPERR, 0.0, s2)
+    s3 = np.where(np.abs(s3) < _FPERR, 0.0, s3)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skew = n * np.sqrt(n - 1) / (n - 2) * s3 / s2 ** 1.5
+        numerator = n * (n + 1) * (n - 1) * s4
+        denominator = (n - 2) * (n - 3) * s2 ** 2
+        numerator = np.where(np.abs(numerator) < _FPERR, 0.0, numerator)
+        denominator = np.where(np.abs(denominator) < _FPERR, 0.0, denominator)
+        kurt = numerator / denominator - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+    skew = np.where(n < 3, np.nan, np.where(s2 == 0, 0.0, skew))
+    kurt = np.where(n < 4, np.nan, np.where(denominator == 0, 0.0, kurt))
+    return skew, kurt
+
+
+def _stats_matrix(y, shift, n):
+    """
+    Métricas por fila de 'y' (remuestreos x n, ya desplazados por 'shift').
+    Devuelve un arreglo (filas, len(STAT_NAMES)) con el orden de STAT_NAMES.
+    """
+    y2 = y * y
+    s1 = y.sum(axis=-1)
+    s2 = y2.sum(axis=-1)
+    s3 = np.einsum('...i,...i->...', y2, y)
+    s4 = np.einsum('...i,...i->...', y2, y2)
+    mean = s1 / n
+    e2, e3, e4 = s2 / n, s3 / n, s4 / n
+    # Momentos centrales a partir de los momentos respecto de 'shift'
+    m2 = e2 - mean ** 2
+    m3 = e3 - 3 * mean * e2 + 2 * mean ** 3
+    m4 = e4 - 4 * mean * e3 + 6 * mean ** 2 * e2 - 3 * mean ** 4
+    m2 = np.maximum(m2, 0.0)
+    skew, kurt = skew_kurtosis(n, m2, m3, m4)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(m2 * n / (n - 1))
+        sharpe = (mean + shift) / std * ANNUAL_FACTOR
+    median = np.median(y, axis=-1) + shift
+    return np.stack([mean + shift, median, std, std * ANNUAL_FACTOR, skew, kurt, sharpe], axis=-1)
+
+
+def _clean(returns):
+    values = np.asarray(returns, dtype=np.float64).ravel()
+    return values[~np.isnan(values)]
+
+
+@instrument()
+def descriptive_stats(returns):
+    """
+    Métricas de get_descriptive_stats como números ({nombre: float}), en una
+    pasada sobre los rendimientos (se ignoran los NaN).
+    """
+    x = _clean(returns)
+    if len(x) == 0:
+        return {name: np.nan for name in STAT_NAMES}
+    shift = x.mean()
+    values = _stats_matrix(x - shift, shift, len(x))
+    return dict(zip(STAT_NAMES, values.tolist()))
+
+
+def default_block_length(n):
+    """Longitud media de bloque por defecto: n^(1/3) (al menos 1)."""
+    return max(1, int(round(n ** (1 / 3))))
+
+
+def block_bootstrap_indices(n, n_resamples, block_length, rng, method='stationary'):
+    """
+    Índices (n_resamples, n) de remuestreos por bloques de una serie de largo n.
+      - 'circular': bloques de largo fijo con inicio uniforme, envolviendo al final.
+      - 'stationary': bloques de largo geométrico con media 'block_length'.
+    """
+    dtype = np.int32 if n < 2 ** 31 else np.int64
+    if method == 'circular':
+        n_blocks = -(-n // block_length)
+        starts = rng.integers(0, n, (n_resamples, n_blocks), dtype=dtype)
+        idx = (starts[:, :, None] + np.arange(block_length, dtype=dtype)).reshape(n_resamples, -1)[:, :n]
+        idx %= n
+        return idx
+    if method != 'stationary':
+        raise ValueError(f"Método de bootstrap desconocido: {method}. Opciones: {list(BOOTSTRAP_METHODS)}")
+
+    # Cada posición abre un bloque nuevo con probabilidad 1/block_length
+    new_block = rng.random((n_resamples, n), dtype=np.float32) < 1.0 / block_length
+    new_block[:, 0] = True
+    positions = np.arange(n, dtype=dtype)
+    # Posición donde empezó el bloque vigente y desplazamiento dentro del bloque
+    block_start = np.maximum.accumulate(np.where(new_block, positions, 0).astype(dtype, copy=False), axis=1)
+    idx = rng.integers(0, n, (n_resamples, n), dtype=dtype)
+    idx = np.take_along_axis(idx, block_start, axis=1)
+    idx += positions - block_start
+    idx %= n
+    return idx
+
+
+def _bootstrap_task(args):
+    """Estadísticas de los remuestreos de varias semillas (función de módulo, para procesos)."""
+    y, shift, seeds, sizes, block_length, method, chunk = args
+    n = len(y)
+    results = []
+    for seed, size in zip(seeds, sizes):
+        rng = np.random.default_rng(seed)
+        for start in range(0, size, chunk):
+            idx = block_bootstrap_indices(n, min(chunk, size - start), block_length, rng, method)
+            results.append(_stats_matrix(y[idx], shift, n))
+    return np.concatenate(results)
+
+
+@instrument()
+def bootstrap_stats(returns, n_resamples=2000, confidence=0.95, block_length=None, method='stationary',
+                    memory_budget_mb=64, max_workers=None, seed=None):
+    """
+    Estimación e intervalo de confianza (percentil del bootstrap por bloques)
+    de cada métrica de descriptive_stats.
+
+    Los remuestreos se reducen por lotes que no superan 'memory_budget_mb'
+    (por proceso); con max_workers > 1 los lotes se reparten en un pool de
+    procesos. 'block_length' por defecto es n^(1/3).
+
+    Devuelve un DataFrame (métrica x 'estimacion', 'inferior', 'superior',
+    'error_estandar').
+    """
+    x = _clean(returns)
+    n = len(x)
+    columns = ['estimacion', 'inferior', 'superior', 'error_estandar']
+    if n < 4:
+        return pd.DataFrame(np.nan, index=list(STAT_NAMES), columns=columns)
+
+    shift = x.mean()
+    y = x - shift
+    estimate = _stats_matrix(y, shift, n)
+    block_length = block_length or default_block_length(n)
+
+    # Una semilla por cada SEED_BATCH remuestreos
+    sizes = [min(SEED_BATCH, n_resamples - start) for start in range(0, n_resamples, SEED_BATCH)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunk = max(1, min(SEED_BATCH, int(memory_budget_mb * 2 ** 20 // (_BYTES_PER_ELEMENT * n))))
+
+    workers = min(max_workers or 1, len(sizes))
+    groups = np.array_split(np.arange(len(sizes)), workers)
+    tasks = [(y, shift, [seeds[i] for i in g], [sizes[i] for i in g], block_length, method, chunk)
+             for g in groups if len(g)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            samples = np.concatenate(list(executor.map(_bootstrap_task, tasks)))
+    else:
+        samples = np.concatenate([_bootstrap_task(task) for task in tasks])
+
+    alpha = (1 - confidence) / 2
+    with np.errstate(invalid='ignore'):
+        lower, upper = np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+        std_error = np.nanstd(samples, axis=0, ddof=1)
+    return pd.DataFrame({'estimacion': estimate, 'inferior': lower, 'superior': upper,
+                         'error_estandar': std_error}, index=list(STAT_NAMES))
@@ -0,0 +1,241 @@
+# core/streaming.py
+"""
+Calculadores incrementales (O(1) por barra) para actualizar rendimientos,
+indicadores y estadísticas sin recalcular todo el historial.
+
+Cada objeto guarda solo el estado acotado que necesita (último precio,
+ventanas móviles, momentos acumulados), expone update() para absorber una
+barra nueva y se serializa con to_dict()/from_dict() (JSON).
+Los resultados coinciden con las funciones batch (calculate_returns,
+compute_indicators, get_descriptive_stats) salvo error de punto flotante.
+"""
+import os
+import json
+import math
+from collections import deque
+
+from core.stats import skew_kurtosis
+
+
+class StreamingReturns:
+    """Rendimiento simple y logarítmico a partir del último precio."""
+
+    def __init__(self, last_price=None):
+        self.last_price = last_price
+
+    def update(self, price):
+        """Absorbe un precio; devuelve (simple_return, log_return) o (None, None) en la primera barra."""
+        last, self.last_price = self.last_price, price
+        if last is None:
+            return None, None
+        return price / last - 1.0, math.log(price / last)
+
+    def to_dict(self):
+        return {'last_price': self.last_price}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['last_price'])
+
+
+class RollingWindow:
+    """
+    Ventana móvil de tamaño fijo con media y varianza muestral en O(1)
+    (actualización de Welford para ventanas deslizantes). Base de SMA y Bollinger.
+    """
+
+    def __init__(self, window, values=(), mean=0.0, m2=0.0):
+        self.window = window
+        self.values = deque(values, maxlen=window)
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, x):
+        if len(self.values) < self.window:
+            n = len(self.values) + 1
+            delta = x - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.values[0]
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+        self.values.append(x)
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window
+
+    @property
+    def std(self):
+        n = len(self.values)
+        return math.sqrt(max(self.m2, 0.0) / (n - 1)) if n > 1 else float('nan')
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values), 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['window'], state['values'], state['mean'], state['m2'])
+
+
+class StreamingEMA:
+    """EMA con el mismo criterio que ewm(span=window, adjust=False)."""
+
+    def __init__(self, window, value=None):
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self.value = value
+
+    def update(self, x):
+        self.value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+    def to_dict(self):
+        return {'window': self.window, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['window'], state['value'])
+
+
+class RunningMoments:
+    """
+    Momentos acumulados (media, M2, M3, M4) con las fórmulas de Welford/Pébay.
+    stats() devuelve las mismas métricas que get_descriptive_stats, salvo la
+    mediana (que no admite una actualización O(1) exacta).
+    """
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, m3=0.0, m4=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.m3 = m3
+        self.m4 = m4
+
+    def update(self, x):
+        n1 = self.n
+        self.n += 1
+        n = self.n
+        delta = x - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+        self.mean += delta_n
+        self.m4 += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+
+    def stats(self):
+        """Métricas numéricas (mismas claves que get_descriptive_stats, sin 'Mediana')."""
+        n = self.n
+        nan = float('nan')
+        std = math.sqrt(self.m2 / (n - 1)) if n > 1 else nan
+        skew = kurt = nan
+        if n > 0:
+            skew, kurt = (float(v) for v in skew_kurtosis(n, self.m2 / n, self.m3 / n, self.m4 / n))
+        anual_factor = math.sqrt(252)
+        return {
+            "Media (Diaria)": self.mean if n > 0 else nan,
+            "Desv. Estándar (Volatilidad Diaria)": std,
+            "Volatilidad Anualizada": std * anual_factor,
+            "Skewness (Asimetría)": skew,
+            "Kurtosis (Curtosis)": kurt,
+            "Sharpe Ratio (Anualizado)": (self.mean / std) * anual_factor if std > 0 else nan
+        }
+
+    def to_dict(self):
+        return {'n': self.n, 'mean': self.mean, 'm2': self.m2, 'm3': self.m3, 'm4': self.m4}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+
+class SymbolStream:
+    """
+    Estado incremental completo de un símbolo: rendimientos, SMA, Bollinger,
+    EMA y estadísticas de 'log_return'. update() absorbe un 'adjusted close'.
+    """
+
+    def __init__(self, sma=(20, 50), ema=(), bollinger=(20,), bb_std=2.0):
+        self.returns = StreamingReturns()
+        self.moments = RunningMoments()
+        self.bb_std = bb_std
+        self.bollinger = tuple(bollinger)
+        # Una sola ventana por tamaño: SMA_20 y BB_middle_20 comparten estado
+        self.windows = {w: RollingWindow(w) for w in set(sma) | set(bollinger)}
+        self.sma = tuple(sma)
+        self.emas = {w: StreamingEMA(w) for w in ema}
+
+    def update(self, price):
+        """Absorbe una barra y devuelve los valores actualizados (nombres como compute_indicators)."""
+        if price is None or price != price:
+            return {}
+        simple_return, log_return = self.returns.update(price)
+        if log_return is not None:
+            self.moments.update(log_return)
+        for window in self.windows.values():
+            window.update(price)
+
+        nan = float('nan')
+        values = {'adjusted close': price, 'simple_return': simple_return, 'log_return': log_return}
+        for w in self.sma:
+            values[f'SMA_{w}'] = self.windows[w].mean if self.windows[w].ready else nan
+        for w in self.bollinger:
+            window = self.windows[w]
+            middle = window.mean if window.ready else nan
+            band = window.std * self.bb_std if window.ready else nan
+            values[f'BB_middle_{w}'] = middle
+            values[f'BB_upper_{w}'] = middle + band
+            values[f'BB_lower_{w}'] = middle - band
+        for w, ema in self.emas.items():
+            values[f'EMA_{w}'] = ema.update(price)
+        return values
+
+    def stats(self):
+        return self.moments.stats()
+
+    def to_dict(self):
+        return {
+            'sma': list(self.sma),
+            'bollinger': list(self.bollinger),
+            'bb_std': self.bb_std,
+            'returns': self.returns.to_dict(),
+            'moments': self.moments.to_dict(),
+            'windows': [w.to_dict() for w in self.windows.values()],
+            'emas': [e.to_dict() for e in self.emas.values()],
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        stream = cls(sma=state['sma'], ema=[e['window'] for e in state['emas']],
+                     bollinger=state['bollinger'], bb_std=state['bb_std'])
+        stream.returns = StreamingReturns.from_dict(state['returns'])
+        stream.moments = RunningMoments.from_dict(state['moments'])
+        stream.windows = {w['window']: RollingWindow.from_dict(w) for w in state['windows']}
+        stream.emas = {e['window']: StreamingEMA.from_dict(e) for e in state['emas']}
+        return stream
+
+    @classmethod
+    def from_history(cls, prices, **kwargs):
+        """Inicializa el estado recorriendo un historial de precios (una sola vez)."""
+        stream = cls(**kwargs)
+        for price in prices:
+            stream.update(float(price))
+        return stream
+
+
+def save_streams(streams, path):
+    """Guarda un dict {símbolo: SymbolStream} en JSON (escritura atómica)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({symbol: stream.to_dict() for symbol, stream in streams.items()}, f)
+    os.replace(tmp_path, path)
+
+
+def load_streams(path):
+    """Carga el dict {símbolo: SymbolStream} guardado con save_streams."""
+    with open(path, encoding='utf-8') as f:
+        return {symbol: SymbolStream.from_dict(state) for symbol, state in json.load(f).items()}
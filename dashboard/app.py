@@ -2,9 +2,10 @@
 
 import sys
 import os
+import uuid
+import contextlib
 import streamlit as st
 import plotly.graph_objects as go
-import pandas as pd
 from datetime import datetime
 
 # --- INICIO DE LA SOLUCIÓN (sys.path) ---
@@ -18,15 +19,18 @@ if project_root not in sys.path:
 
 # --- Importaciones de nuestros módulos ---
 from core.api_client import get_daily_data
-from core.data_processing import calculate_returns
+from core.history import SymbolHistory
 from core.analysis import (
-    add_moving_averages, 
-    add_bollinger_bands, 
-    get_descriptive_stats,
-    find_support_resistance,
     get_series_decomposition,
-    run_prophet_forecast
+    run_forecast
 )
+from core.stats import bootstrap_stats
+from core.forecasting import FORECAST_BACKENDS
+from core.downsampling import downsample_ohlc, decimate_many, PERIOD_LABELS
+from core.levels import find_key_levels
+from core.figures import add_level_lines
+from core.jobs import JobExecutor
+from core import instrumentation
 
 # --- Configuración de la página de Streamlit ---
 st.set_page_config(layout="wide", page_title="Dashboard Financiero")
@@ -42,6 +46,18 @@ show_bb = st.sidebar.checkbox("Mostrar Bandas de Bollinger (BB 20)", value=True)
 show_levels = st.sidebar.checkbox("Mostrar Soportes y Resistencias", value=True)
 level_prominence = st.sidebar.slider("Prominencia de Niveles", min_value=1, max_value=20, value=5,
                                      help="Ajusta la sensibilidad para detectar picos y valles.")
+level_count = st.sidebar.slider("Niveles a Mostrar (por tipo)", min_value=1, max_value=15, value=5,
+                                help="Zonas de soporte/resistencia más fuertes (por toques y recencia).")
+max_points = st.sidebar.select_slider("Puntos Máximos por Gráfico", options=[500, 1000, 2000, 5000, 10000], value=2000,
+                                      help="Con más barras que este límite, las velas se agrupan por semana/mes "
+                                           "y las líneas se reducen conservando máximos y mínimos.")
+
+st.sidebar.subheader("Intervalos de Confianza")
+ci_level = st.sidebar.select_slider("Nivel de Confianza", options=[0.90, 0.95, 0.99], value=0.95,
+                                    format_func=lambda level: f"{level:.0%}")
+ci_resamples = st.sidebar.select_slider("Remuestreos Bootstrap", options=[500, 1000, 2000, 5000], value=2000,
+                                        help="Bootstrap estacionario por bloques (conserva la dependencia "
+                                             "de corto plazo de los rendimientos).")
 
 # --- FILTRO DE FECHAS ---
 st.sidebar.subheader("Filtro de Fechas")
@@ -49,8 +65,14 @@ min_date_default = datetime.now().date()
 max_date_default = datetime.now().date()
 
 # --- CONTROLES DE PROYECCIÓN (CON MEJORAS) ---
-st.sidebar.subheader("Proyecciones (con Prophet)")
+st.sidebar.subheader("Proyecciones")
 show_forecast = st.sidebar.checkbox("Mostrar Proyección y Descomposición", value=False)
+forecast_backend = st.sidebar.selectbox(
+    "Motor de Proyección",
+    options=['fast', 'prophet'],
+    format_func=lambda name: FORECAST_BACKENDS[name].label,
+    help="El motor rápido (NumPy) responde en milisegundos; Prophet es más lento pero incluye feriados."
+)
 forecast_days = st.sidebar.number_input("Días a Proyectar", min_value=7, max_value=365, value=30)
 
 changepoint_scale = st.sidebar.slider(
@@ -63,137 +85,234 @@ changepoint_scale = st.sidebar.slider(
          "valores bajos (ej. 0.05) la hacen más rígida."
 )
 
+# --- DEPURACIÓN ---
+st.sidebar.subheader("Depuración")
+show_debug = st.sidebar.checkbox("Mostrar Tiempos por Etapa", value=False,
+                                 help="Mide tiempo, CPU, filas y caché de cada etapa de esta ejecución.")
+debug_memory = st.sidebar.checkbox("Medir Memoria (más lento)", value=False, disabled=not show_debug)
 
 # --- Carga y Procesamiento de Datos ---
-@st.cache_data(ttl=3600)
-def load_data(ticker):
+@st.cache_resource(ttl=3600, max_entries=16)
+def load_history(ticker):
+    # Solo se ejecuta si la caché no tenía el símbolo. cache_resource comparte el
+    # mismo objeto entre sesiones y ejecuciones (sin copiarlo): no se modifica.
+    instrumentation.record_cache('dashboard.load_history', False)
     data = get_daily_data(ticker)
     if data.empty:
-        return pd.DataFrame(), pd.DataFrame() 
-    data_processed = calculate_returns(data)
-    return data, data_processed
-
-data_raw, data_returns = load_data(symbol)
-
-
-# --- Corrección de Zona Horaria (tz-naive) ---
-if not data_raw.empty:
-    data_raw.index = data_raw.index.tz_localize(None)
-    min_date_default = data_raw.index.min().date()
-    max_date_default = data_raw.index.max().date()
-if not data_returns.empty:
-    data_returns.index = data_returns.index.tz_localize(None)
-
-
-# --- Renderizado del Dashboard ---
-if data_raw.empty:
-    st.error(f"No se pudieron obtener datos para {symbol}. Verifica el símbolo.")
-else:
-    
-    # --- Actualización del Filtro de Fechas ---
-    col1, col2 = st.sidebar.columns(2)
-    with col1:
-        default_start = max(min_date_default, datetime(max_date_default.year - 1, max_date_default.month, max_date_default.day).date())
-        start_date = st.date_input("Fecha Inicio", value=default_start, min_value=min_date_default, max_value=max_date_default)
-    with col2:
-        end_date = st.date_input("Fecha Fin", value=max_date_default, min_value=min_date_default, max_value=max_date_default)
-
-    if start_date > end_date:
-        st.sidebar.error("La fecha de inicio no puede ser posterior a la fecha de fin.")
-        st.stop() 
-
-    data_raw_filtered = data_raw.loc[start_date:end_date]
-    data_returns_filtered = data_returns.loc[start_date:end_date]
-    
-
-    # --- INICIO DE LA CORRECCIÓN (BLOQUE REINSERTADO) ---
-    # Aplicamos los análisis seleccionados al dataframe FILTRADO
-    # Esta variable 'data_plot' es la que faltaba
-    data_plot = data_raw_filtered.copy()
-    if show_ma:
-        data_plot = add_moving_averages(data_plot)
-    if show_bb:
-        data_plot = add_bollinger_bands(data_plot)
-    # --- FIN DE LA CORRECCIÓN ---
-
-
-    # --- 1. Sección de Gráficos ---
-    st.header(f"Análisis Técnico: {symbol} ({start_date} a {end_date})")
-    
-    fig = go.Figure()
-    
-    # Esta línea (la 118) ahora funcionará
-    fig.add_trace(go.Candlestick(x=data_plot.index,
-                    open=data_plot['open'], high=data_plot['high'],
-                    low=data_plot['low'], close=data_plot['adjusted close'],
-                    name='Precio'))
-    if show_ma:
-        fig.add_trace(go.Scatter(x=data_plot.index, y=data_plot['SMA_short'], mode='lines', name='SMA 20', line=dict(color='orange', width=1.5)))
-        fig.add_trace(go.Scatter(x=data_plot.index, y=data_plot['SMA_long'], mode='lines', name='SMA 50', line=dict(color='purple', width=1.5)))
-    if show_bb:
-        fig.add_trace(go.Scatter(x=data_plot.index, y=data_plot['BB_upper'], mode='lines', name='BB Upper', line=dict(color='gray', dash='dash', width=1)))
-        fig.add_trace(go.Scatter(x=data_plot.index, y=data_plot['BB_lower'], mode='lines', name='BB Lower', line=dict(color='gray', dash='dash', width=1),
-                                 fill='tonexty', fillcolor='rgba(128,128,128,0.1)'))
-    if show_levels:
-        supports, resistances = find_support_resistance(data_plot, prominence=level_prominence)
-        for level in supports.unique():
-            fig.add_hline(y=level, line_dash="dot", line_color="green", annotation_text=f"Soporte {level:.2f}", annotation_position="bottom right")
-        for level in resistances.unique():
-            fig.add_hline(y=level, line_dash="dot", line_color="red", annotation_text=f"Resistencia {level:.2f}", annotation_position="top right")
-
-    fig.update_layout(xaxis_rangeslider_visible=False, height=600,
-                      title=f"Gráfico de Precios e Indicadores para {symbol}",
-                      yaxis_title="Precio (USD)", legend_title="Indicadores")
-    st.plotly_chart(fig, use_container_width=True)
-
-    
-    # --- 2. Sección de Informe Estadístico ---
-    st.header("Informe Estadístico (Sobre Rendimientos Logarítmicos)")
-    
-    col1, col2 = st.columns([1, 2])
-    with col1:
-        st.subheader("Estadísticas Clave")
-        stats = get_descriptive_stats(data_returns_filtered['log_return'])
-        st.json(stats)
-    with col2:
-        st.subheader("Distribución de Rendimientos")
-        fig_hist = go.Figure()
-        fig_hist.add_trace(go.Histogram(x=data_returns_filtered['log_return'], nbinsx=100, name='Frecuencia', marker_color='blue'))
-        fig_hist.update_layout(title="Histograma de Rendimientos Logarítmicos", xaxis_title="Rendimiento Log", yaxis_title="Frecuencia", showlegend=False)
-        st.plotly_chart(fig_hist, use_container_width=True)
-
-    
-    # --- 3. Sección de Datos Crudos ---
-    st.subheader(f"Últimos 10 días de datos procesados para {symbol} (en el rango)")
-    st.dataframe(data_returns_filtered.tail(10))
-    
-
-    # --- 4. SECCIÓN DE PROYECCIÓN (CON MEJORAS) ---
-    if show_forecast:
-        st.header(f"Análisis de Proyección para {symbol}")
-        
-        if len(data_raw_filtered) < 730:
-            st.warning("Advertencia: Se recomiendan al menos 2 años de datos en el rango seleccionado "
-                       "para una descomposición y proyección anual precisas. "
-                       "Los resultados pueden no ser fiables.")
-        
-        # 4.1 Descomposición de la Serie
-        with st.spinner("Analizando la serie de tiempo (descomposición)..."):
-            decomp_fig = get_series_decomposition(data_raw_filtered)
-            st.plotly_chart(decomp_fig, use_container_width=True)
-
-        # 4.2 Proyección con Prophet
-        with st.spinner(f"Calculando proyección a {forecast_days} días con Prophet... (Esto puede tardar)"):
-            
-            # Llamamos a la función actualizada
-            forecast_fig, components_fig = run_prophet_forecast(
-                data_raw_filtered, 
-                periods=forecast_days,
-                changepoint_scale=changepoint_scale
-            )
-            
-            st.subheader(f"Proyección a {forecast_days} Días")
-            st.plotly_chart(forecast_fig, use_container_width=True)
-            
-            st.subheader("Componentes del Modelo (Tendencia y Estacionalidad)")
-            st.plotly_chart(components_fig, use_container_width=True)
+        return None
+    # Rendimientos e indicadores de todo el historial, una sola vez por símbolo
+    return SymbolHistory.build(data)
+
+@st.cache_data(ttl=3600, max_entries=32)
+def load_bootstrap_stats(log_returns, n_resamples, confidence):
+    # Semilla fija: los intervalos no cambian entre ejecuciones con el mismo rango
+    return bootstrap_stats(log_returns, n_resamples=n_resamples, confidence=confidence, seed=0)
+
+
+# --- Trabajos en segundo plano (descomposición y proyección) ---
+# Segundos entre consultas del estado de los trabajos en curso
+JOB_POLL_SECONDS = 1.0
+
+
+@st.cache_resource
+def get_job_executor():
+    # Un solo pool para todas las sesiones: los pedidos idénticos se comparten
+    return JobExecutor(max_results=32)
+
+
+# Dueño de los trabajos de esta sesión (al cambiar los controles se cancelan los reemplazados)
+jobs_owner = st.session_state.setdefault('jobs_owner', uuid.uuid4().hex)
+
+
+@st.cache_data(ttl=3600, max_entries=8)
+def load_forecast_preview(data, periods, changepoint_scale, symbol):
+    # Motor rápido (milisegundos): se muestra mientras el motor elegido termina
+    return run_forecast(data, periods=periods, changepoint_scale=changepoint_scale, symbol=symbol, backend='fast')[0]
+
+
+def show_job_status(job, label):
+    """Estado de un trabajo en curso, con el progreso estimado por la duración reciente de su tipo."""
+    expected = get_job_executor().expected_duration(job.kind)
+    text = f"{label} ({job.status()}, {job.elapsed():.0f} s"
+    text += f" de ~{expected:.0f} s)" if expected else ")"
+    progress = job.progress(expected)
+    if progress is None:
+        st.info(text)
+    else:
+        st.progress(progress, text=text)
+
+
+def render_projection(decomposition_job, forecast_job, data, periods, changepoint_scale, symbol, backend, polling):
+    """Muestra cada resultado apenas termina su trabajo (se ejecuta como fragmento mientras haya pendientes)."""
+    # 4.1 Descomposición de la Serie
+    if decomposition_job.done():
+        with instrumentation.span('dashboard.descomposicion'):
+            try:
+                st.plotly_chart(decomposition_job.result(), use_container_width=True)
+            except Exception as e:
+                st.error(f"No se pudo descomponer la serie: {e}")
+    else:
+        show_job_status(decomposition_job, "Analizando la serie de tiempo (descomposición)")
+
+    # 4.2 Proyección (Prophet o motor rápido)
+    st.subheader(f"Proyección a {periods} Días")
+    if forecast_job.done():
+        with instrumentation.span('dashboard.proyeccion', backend=backend):
+            try:
+                forecast_fig, components_fig = forecast_job.result()
+            except Exception as e:
+                st.error(f"No se pudo calcular la proyección: {e}")
+            else:
+                st.plotly_chart(forecast_fig, use_container_width=True)
+                st.subheader("Componentes del Modelo (Tendencia y Estacionalidad)")
+                st.plotly_chart(components_fig, use_container_width=True)
+    else:
+        show_job_status(forecast_job, f"Calculando proyección con {FORECAST_BACKENDS[backend].label}")
+        if backend != 'fast':
+            # Resultado parcial mientras se ajusta el modelo elegido
+            st.caption("Vista previa con el motor rápido (se reemplaza al terminar).")
+            st.plotly_chart(load_forecast_preview(data, periods, changepoint_scale, symbol), use_container_width=True)
+
+    if polling and decomposition_job.done() and forecast_job.done():
+        # Todo listo: una ejecución completa redefine el fragmento sin consultas periódicas
+        st.rerun()
+
+
+# Spans de esta ejecución (solo con el panel activo; si no, la instrumentación no cuesta nada).
+# El colector se cierra siempre, también con st.stop(), st.rerun() o un error a mitad del script.
+debug = instrumentation.collect(trace_memory=debug_memory) if show_debug else contextlib.nullcontext([])
+with debug as debug_spans:
+    with instrumentation.span('dashboard.datos', symbol=symbol) as stage:
+        history = load_history(symbol)
+        if stage.cache is None:
+            instrumentation.record_cache('dashboard.load_history', True)
+
+
+    # --- Rango disponible (el historial ya viene sin zona horaria) ---
+    if history is not None:
+        min_date_default = history.start.date()
+        max_date_default = history.end.date()
+
+
+    # --- Renderizado del Dashboard ---
+    if history is None:
+        st.error(f"No se pudieron obtener datos para {symbol}. Verifica el símbolo.")
+    else:
+
+        # --- Actualización del Filtro de Fechas ---
+        col1, col2 = st.sidebar.columns(2)
+        with col1:
+            default_start = max(min_date_default, datetime(max_date_default.year - 1, max_date_default.month, max_date_default.day).date())
+            start_date = st.date_input("Fecha Inicio", value=default_start, min_value=min_date_default, max_value=max_date_default)
+        with col2:
+            end_date = st.date_input("Fecha Fin", value=max_date_default, min_value=min_date_default, max_value=max_date_default)
+
+        if start_date > end_date:
+            st.sidebar.error("La fecha de inicio no puede ser posterior a la fecha de fin.")
+            st.stop()
+
+
+        # El rango es un corte sin copia del historial precalculado: los indicadores
+        # ya incluyen las barras anteriores al rango (sin huecos de arranque)
+        view = history.window(start_date, end_date)
+        data_raw_filtered = view.prices
+        data_returns_filtered = view.returns
+        data_plot = data_raw_filtered
+        shown = (('SMA_20', 'SMA_50') if show_ma else ()) + (('BB_upper_20', 'BB_lower_20') if show_bb else ())
+
+
+        # --- 1. Sección de Gráficos ---
+        st.header(f"Análisis Técnico: {symbol} ({start_date} a {end_date})")
+
+        # Reducción de puntos según el presupuesto y el rango visible
+        candles, period = downsample_ohlc(data_plot, max_points)
+        lines_x, lines = decimate_many(data_plot.index, {name: view.indicators[name] for name in shown}, max_points)
+
+        with instrumentation.span('dashboard.grafico', rows=len(data_plot)):
+            fig = go.Figure()
+
+            fig.add_trace(go.Candlestick(x=candles.index,
+                            open=candles['open'], high=candles['high'],
+                            low=candles['low'], close=candles['adjusted close'],
+                            name=f"Precio ({PERIOD_LABELS[period]})" if period else 'Precio'))
+            if show_ma:
+                fig.add_trace(go.Scatter(x=lines_x, y=lines['SMA_20'], mode='lines', name='SMA 20', line=dict(color='orange', width=1.5)))
+                fig.add_trace(go.Scatter(x=lines_x, y=lines['SMA_50'], mode='lines', name='SMA 50', line=dict(color='purple', width=1.5)))
+            if show_bb:
+                fig.add_trace(go.Scatter(x=lines_x, y=lines['BB_upper_20'], mode='lines', name='BB Upper', line=dict(color='gray', dash='dash', width=1)))
+                fig.add_trace(go.Scatter(x=lines_x, y=lines['BB_lower_20'], mode='lines', name='BB Lower', line=dict(color='gray', dash='dash', width=1),
+                                         fill='tonexty', fillcolor='rgba(128,128,128,0.1)'))
+            if show_levels:
+                # Zonas agrupadas: solo las 'level_count' más fuertes de cada tipo
+                add_level_lines(fig, find_key_levels(data_plot, prominence=level_prominence, top_n=level_count))
+
+            fig.update_layout(xaxis_rangeslider_visible=False, height=600,
+                              title=f"Gráfico de Precios e Indicadores para {symbol}",
+                              yaxis_title="Precio (USD)", legend_title="Indicadores")
+            st.plotly_chart(fig, use_container_width=True)
+
+
+        # --- 2. Sección de Informe Estadístico ---
+        st.header("Informe Estadístico (Sobre Rendimientos Logarítmicos)")
+
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            st.subheader("Estadísticas Clave")
+            stats = load_bootstrap_stats(data_returns_filtered['log_return'], ci_resamples, ci_level)
+            stats = stats[['estimacion', 'inferior', 'superior']]
+            stats.columns = ['Estimación', f'IC {ci_level:.0%} Inferior', f'IC {ci_level:.0%} Superior']
+            st.dataframe(stats.style.format("{:.6f}"), use_container_width=True)
+            st.caption(f"Intervalos por bootstrap estacionario de bloques ({ci_resamples} remuestreos).")
+        with col2, instrumentation.span('dashboard.histograma'):
+            st.subheader("Distribución de Rendimientos")
+            fig_hist = go.Figure()
+            fig_hist.add_trace(go.Histogram(x=data_returns_filtered['log_return'], nbinsx=100, name='Frecuencia', marker_color='blue'))
+            fig_hist.update_layout(title="Histograma de Rendimientos Logarítmicos", xaxis_title="Rendimiento Log", yaxis_title="Frecuencia", showlegend=False)
+            st.plotly_chart(fig_hist, use_container_width=True)
+
+
+        # --- 3. Sección de Datos Crudos ---
+        st.subheader(f"Últimos 10 días de datos procesados para {symbol} (en el rango)")
+        # Los rendimientos no copian OHLC: se unen al precio solo para las filas mostradas
+        returns_tail = data_returns_filtered.tail(10)
+        st.dataframe(data_raw_filtered.loc[returns_tail.index].join(returns_tail))
+
+
+        # --- 4. SECCIÓN DE PROYECCIÓN (CON MEJORAS) ---
+        # Corre en segundo plano: el gráfico y las estadísticas ya están en pantalla
+        jobs = get_job_executor()
+        if show_forecast:
+            st.header(f"Análisis de Proyección para {symbol}")
+
+            if len(data_raw_filtered) < 730:
+                st.warning("Advertencia: Se recomiendan al menos 2 años de datos en el rango seleccionado "
+                           "para una descomposición y proyección anual precisas. "
+                           "Los resultados pueden no ser fiables.")
+
+            decomposition_job = jobs.submit(get_series_decomposition, data_raw_filtered,
+                                            owner=(jobs_owner, 'descomposicion'))
+            forecast_job = jobs.submit(run_forecast, data_raw_filtered, periods=forecast_days,
+                                       changepoint_scale=changepoint_scale, symbol=symbol, backend=forecast_backend,
+                                       owner=(jobs_owner, 'proyeccion'), kind=f"run_forecast.{forecast_backend}")
+            # Con trabajos pendientes, la sección se vuelve a dibujar sola cada JOB_POLL_SECONDS
+            polling = not (decomposition_job.done() and forecast_job.done())
+            st.fragment(render_projection, run_every=JOB_POLL_SECONDS if polling else None)(
+                decomposition_job, forecast_job, data_raw_filtered, forecast_days, changepoint_scale,
+                symbol, forecast_backend, polling)
+        else:
+            # Sección oculta: nadie en esta sesión espera ya esos trabajos
+            jobs.release((jobs_owner, 'descomposicion'))
+            jobs.release((jobs_owner, 'proyeccion'))
+
+
+# --- 5. PANEL DE DEPURACIÓN ---
+if show_debug:
+    with st.expander("Depuración: Tiempos por Etapa", expanded=True):
+        total_ms = sum(s['wall_s'] for s in debug_spans if s['depth'] == 0) * 1000
+        st.caption(f"Etapas de primer nivel: {total_ms:.0f} ms. Las filas anidadas están incluidas en su etapa padre.")
+        st.dataframe(instrumentation.summary_frame(debug_spans), use_container_width=True)
+        col1, col2 = st.columns(2)
+        col1.download_button("Descargar Spans (JSON lines)", instrumentation.to_jsonl(debug_spans),
+                             file_name="spans.jsonl", mime="application/jsonl")
+        col2.download_button("Descargar Métricas (Prometheus)", instrumentation.prometheus_text(),
+                             file_name="metrics.prom", mime="text/plain")
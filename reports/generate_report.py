@@ -2,6 +2,11 @@
 
 import sys
 import os
+import json
+import time
+import signal
+import argparse
+import threading
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime
@@ -17,26 +22,110 @@ if project_root not in sys.path:
 
 
 # --- Importaciones de nuestros módulos CORE ---
-from core.api_client import get_daily_data
+from core.api_client import get_daily_data, get_daily_data_many
+from core.data_store import get_default_store
 from core.data_processing import calculate_returns
+from core.indicators import compute_indicators
+from core.risk import value_at_risk
+from core.backtest import backtest_var
+from core.levels import find_key_levels
+from core.figures import add_level_lines
+from core.report_html import (HtmlReport, plotlyjs_tag, write_report, ensure_shared_plotlyjs,
+                              ReportBudgetExceeded, PLOTLYJS_MODES)
+from core import instrumentation
+from core.downsampling import downsample_ohlc, decimate, decimate_many, PERIOD_LABELS, DEFAULT_MAX_POINTS
 from core.analysis import (
-    add_moving_averages, 
-    add_bollinger_bands, 
     get_descriptive_stats,
-    find_support_resistance,
     get_series_decomposition,
-    run_prophet_forecast
+    run_forecast
 )
 
-def generate_html_report(symbol, forecast_days=30, prominence=5):
+REPORT_CSS = """
+    body { font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif; margin: 40px; background-color: #f9f9f9; }
+    h1, h2 { color: #1e1e1e; border-bottom: 2px solid #ddd; padding-bottom: 5px; }
+    .container { max-width: 1000px; margin: auto; background-color: #fff; padding: 20px; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); }
+    .stats-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; }
+    .stat-box { background-color: #f0f0f0; border: 1px solid #ddd; border-radius: 5px; padding: 15px; }
+    .stat-box b { color: #333; display: block; margin-bottom: 5px; font-size: 0.9em; }
+    .stat-box span { color: #000; font-size: 1.1em; font-weight: 600; }
+    .data-table { border-collapse: collapse; margin: 10px 0; font-size: 0.9em; }
+    .data-table th, .data-table td { border: 1px solid #ddd; padding: 4px 8px; text-align: right; }
+"""
+
+
+class StageTimeout(BaseException):
+    """
+    Una etapa del reporte superó su tiempo máximo. Hereda de BaseException
+    (como KeyboardInterrupt) para que los 'except Exception' de core (p. ej.
+    get_daily_data o el reintento de ModelCache) no la conviertan en
+    "sin datos" ni sigan trabajando sin límite de tiempo.
+    """
+
+
+class StageTimer:
+    """
+    Mide la duración de cada etapa del reporte y, si se indica 'timeout',
+    interrumpe la etapa que lo supere (SIGALRM; solo en el hilo principal
+    de sistemas POSIX, en otro caso solo se mide). Con la instrumentación
+    activa cada etapa es además un span 'reporte.<etapa>' (con el símbolo).
+    """
+
+    def __init__(self, timeout=None, symbol=None):
+        self.timeout = timeout
+        self.symbol = symbol
+        self.timings = {}
+        # Métricas que no son tiempos (p. ej. tamaño del reporte en bytes)
+        self.metrics = {}
+        self._name = None
+        self._start = None
+        self._span = None
+        self._use_alarm = bool(timeout) and hasattr(signal, 'SIGALRM') and \
+            threading.current_thread() is threading.main_thread()
+        if self._use_alarm:
+            signal.signal(signal.SIGALRM, self._on_alarm)
+
+    def _on_alarm(self, signum, frame):
+        raise StageTimeout(f"La etapa '{self._name}' superó {self.timeout} s")
+
+    def start(self, name):
+        """Cierra la etapa en curso (si hay) y empieza a medir 'name'."""
+        self.stop()
+        self._name = name
+        self._span = instrumentation.span(f"reporte.{name}", symbol=self.symbol).__enter__()
+        self._start = time.perf_counter()
+        if self._use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
+
+    def stop(self):
+        if self._name is None:
+            return
+        if self._use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        self.timings[self._name] = round(time.perf_counter() - self._start, 4)
+        self._span.__exit__(None, None, None)
+        self._name = None
+
+
+def generate_html_report(symbol, forecast_days=30, prominence=5, data_raw=None, output_dir=None, timer=None,
+                         forecast_backend='prophet', max_points=DEFAULT_MAX_POINTS, plotlyjs='embed',
+                         compress=False, max_report_kb=None):
     """
     Función principal que genera un reporte HTML completo para un símbolo dado.
+    Si se pasa 'data_raw' no se vuelven a obtener los datos (modo batch).
+    'max_points' limita los puntos por traza de los gráficos de series.
+    'plotlyjs' es 'embed' (incrustado), 'shared' (plotly.min.js junto al
+    reporte) o 'cdn'; 'compress' escribe .html.gz y 'max_report_kb' lanza
+    ReportBudgetExceeded si el archivo lo supera. El tamaño queda en timer.metrics.
+    Devuelve la ruta del reporte (o None si no hubo datos).
     """
+    timer = timer if timer is not None else StageTimer(symbol=symbol)
     print(f"Iniciando generación de reporte para {symbol}...")
     
     # 1. Cargar y Procesar Datos
     print("Paso 1/5: Obteniendo datos...")
-    data_raw = get_daily_data(symbol)
+    timer.start('datos')
+    if data_raw is None:
+        data_raw = get_daily_data(symbol)
     if data_raw.empty:
         print(f"Error: No se pudieron obtener datos para {symbol}. Abortando.")
         return
@@ -51,31 +140,39 @@ def generate_html_report(symbol, forecast_days=30, prominence=5):
 
     # 2. Análisis Estadístico y Técnico
     print("Paso 2/5: Ejecutando análisis estadístico y técnico...")
+    timer.start('analisis')
     stats = get_descriptive_stats(data_returns['log_return'])
+
+    # VaR / ES y backtesting del VaR histórico móvil (ventana de 250 días)
+    log_returns = data_returns['log_return'].rename(symbol)
+    var_table = value_at_risk(log_returns, confidence_levels=(0.95, 0.99), horizons=(1, 10), seed=0)
+    backtest_rolling, backtest_summary = backtest_var(log_returns, window=250, confidence_levels=(0.95, 0.99))
     
-    data_plot = data_raw.copy()
-    data_plot = add_moving_averages(data_plot)
-    data_plot = add_bollinger_bands(data_plot)
-    supports, resistances = find_support_resistance(data_plot, prominence=prominence)
+    data_plot = data_raw
+    indicators = compute_indicators(data_plot['adjusted close'], sma=(20, 50), bollinger=(20,))
+    levels = find_key_levels(data_plot, prominence=prominence)
     
     # 3. Generar Gráficos (Técnico e Histograma)
     print("Paso 3/5: Generando gráficos (Técnico, Histograma)...")
+    timer.start('graficos')
     
     # Gráfico 1: Técnico (copiado de app.py)
+    # Velas agrupadas y líneas decimadas si el historial supera el presupuesto de puntos
+    candles, period = downsample_ohlc(data_plot, max_points)
+    lines_x, lines = decimate_many(data_plot.index, {name: indicators[name][:, 0] for name in
+                                                     ('SMA_20', 'SMA_50', 'BB_upper_20', 'BB_lower_20')},
+                                   max_points)
     fig_tecnico = go.Figure()
-    fig_tecnico.add_trace(go.Candlestick(x=data_plot.index,
-                    open=data_plot['open'], high=data_plot['high'],
-                    low=data_plot['low'], close=data_plot['adjusted close'],
-                    name='Precio'))
-    fig_tecnico.add_trace(go.Scatter(x=data_plot.index, y=data_plot['SMA_short'], mode='lines', name='SMA 20', line=dict(color='orange', width=1.5)))
-    fig_tecnico.add_trace(go.Scatter(x=data_plot.index, y=data_plot['SMA_long'], mode='lines', name='SMA 50', line=dict(color='purple', width=1.5)))
-    fig_tecnico.add_trace(go.Scatter(x=data_plot.index, y=data_plot['BB_upper'], mode='lines', name='BB Upper', line=dict(color='gray', dash='dash', width=1)))
-    fig_tecnico.add_trace(go.Scatter(x=data_plot.index, y=data_plot['BB_lower'], mode='lines', name='BB Lower', line=dict(color='gray', dash='dash', width=1),
+    fig_tecnico.add_trace(go.Candlestick(x=candles.index,
+                    open=candles['open'], high=candles['high'],
+                    low=candles['low'], close=candles['adjusted close'],
+                    name=f"Precio ({PERIOD_LABELS[period]})" if period else 'Precio'))
+    fig_tecnico.add_trace(go.Scatter(x=lines_x, y=lines['SMA_20'], mode='lines', name='SMA 20', line=dict(color='orange', width=1.5)))
+    fig_tecnico.add_trace(go.Scatter(x=lines_x, y=lines['SMA_50'], mode='lines', name='SMA 50', line=dict(color='purple', width=1.5)))
+    fig_tecnico.add_trace(go.Scatter(x=lines_x, y=lines['BB_upper_20'], mode='lines', name='BB Upper', line=dict(color='gray', dash='dash', width=1)))
+    fig_tecnico.add_trace(go.Scatter(x=lines_x, y=lines['BB_lower_20'], mode='lines', name='BB Lower', line=dict(color='gray', dash='dash', width=1),
                              fill='tonexty', fillcolor='rgba(128,128,128,0.1)'))
-    for level in supports.unique():
-        fig_tecnico.add_hline(y=level, line_dash="dot", line_color="green", annotation_text=f"Soporte {level:.2f}")
-    for level in resistances.unique():
-        fig_tecnico.add_hline(y=level, line_dash="dot", line_color="red", annotation_text=f"Resistencia {level:.2f}")
+    add_level_lines(fig_tecnico, levels)
     fig_tecnico.update_layout(
         title=f"Análisis Técnico: {symbol}",
         xaxis_rangeslider_visible=False, 
@@ -88,75 +185,322 @@ def generate_html_report(symbol, forecast_days=30, prominence=5):
     fig_hist.add_trace(go.Histogram(x=data_returns['log_return'], nbinsx=100, name='Frecuencia', marker_color='blue'))
     fig_hist.update_layout(title="Distribución de Rendimientos Logarítmicos", xaxis_title="Rendimiento Log", yaxis_title="Frecuencia")
 
+    # Gráfico 3: Backtesting del VaR 99%
+    fig_backtest = go.Figure()
+    returns_x, returns_y = decimate(log_returns.index, log_returns.to_numpy(), max_points)
+    fig_backtest.add_trace(go.Scatter(x=returns_x, y=returns_y, mode='lines', name='Rendimiento Log', line=dict(color='steelblue', width=1)))
+    if not backtest_rolling.empty:
+        var_99 = backtest_rolling[(symbol, 0.99, 'VaR')]
+        exceptions_99 = backtest_rolling[(symbol, 0.99, 'excepcion')]
+        var_x, var_y = decimate(var_99.index, -var_99.to_numpy(), max_points)
+        fig_backtest.add_trace(go.Scatter(x=var_x, y=var_y, mode='lines', name='-VaR 99%', line=dict(color='red', width=1.5)))
+        fig_backtest.add_trace(go.Scatter(x=log_returns.index[exceptions_99], y=log_returns[exceptions_99], mode='markers', name='Excepciones', marker=dict(color='black', size=5)))
+    fig_backtest.update_layout(title="Backtesting del VaR Histórico (99%, ventana 250 días)", xaxis_title="Fecha", yaxis_title="Rendimiento Log")
+
     # 4. Análisis de Series y Proyección (Prophet)
-    print("Paso 4/5: Ejecutando análisis de series y proyección (Prophet)...")
+    print(f"Paso 4/5: Ejecutando análisis de series y proyección ({forecast_backend})...")
+    timer.start('proyeccion')
     fig_decomp = get_series_decomposition(data_raw)
-    fig_forecast = run_prophet_forecast(data_raw, periods=forecast_days)
+    fig_forecast, _ = run_forecast(data_raw, periods=forecast_days, symbol=symbol, backend=forecast_backend)
     print("Análisis completado.")
 
     # 5. Ensamblar Reporte HTML
     print("Paso 5/5: Ensamblando reporte HTML...")
-    # El reporte se guardará dentro de la misma carpeta 'reports/'
+    timer.start('html')
+    # Por defecto el reporte se guardará dentro de la misma carpeta 'reports/'
     filename = f"reporte_financiero_{symbol}_{datetime.now().strftime('%Y%m%d')}.html"
-    report_path = os.path.join(current_dir, filename)
-
-    with open(report_path, 'w', encoding='utf-8') as f:
-        # Escribir el encabezado del HTML
-        f.write(f"<html><head><title>Reporte {symbol}</title>")
-        # Estilos CSS simples
-        f.write("""
-        <style>
-            body { font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif; margin: 40px; background-color: #f9f9f9; }
-            h1, h2 { color: #1e1e1e; border-bottom: 2px solid #ddd; padding-bottom: 5px; }
-            .container { max-width: 1000px; margin: auto; background-color: #fff; padding: 20px; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); }
-            .stats-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; }
-            .stat-box { background-color: #f0f0f0; border: 1px solid #ddd; border-radius: 5px; padding: 15px; }
-            .stat-box b { color: #333; display: block; margin-bottom: 5px; font-size: 0.9em; }
-            .stat-box span { color: #000; font-size: 1.1em; font-weight: 600; }
-        </style>
-        """)
-        # Importante: Cargar la librería Plotly.js desde CDN
-        f.write("<script src='https://cdn.plot.ly/plotly-latest.min.js'></script>")
-        f.write("</head><body><div class='container'>")
-        
-        f.write(f"<h1>Reporte de Análisis Financiero: {symbol}</h1>")
-        f.write(f"<p>Generado el: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>")
-        f.write(f"<p>Rango de datos analizado: {min_date} a {max_date}</p>")
-
-        # Sección de Estadísticas
-        f.write("<h2>Estadísticas Clave (Rendimientos Logarítmicos)</h2>")
-        f.write("<div class='stats-grid'>")
-        for key, value in stats.items():
-            f.write(f"<div class='stat-box'><b>{key}</b><span>{value}</span></div>")
-        f.write("</div>")
-
-        # Gráficos (convertidos a HTML)
-        f.write(f"<h2>{fig_tecnico.layout.title.text}</h2>")
-        f.write(fig_tecnico.to_html(full_html=False, include_plotlyjs=False, div_id='fig-tecnico'))
-
-        f.write(f"<h2>{fig_hist.layout.title.text}</h2>")
-        f.write(fig_hist.to_html(full_html=False, include_plotlyjs=False, div_id='fig-hist'))
-        
-        f.write("<h2>Análisis de Serie de Tiempo y Proyección</h2>")
-
-        f.write(f"<h3>{fig_decomp.layout.title.text}</h3>")
-        f.write(fig_decomp.to_html(full_html=False, include_plotlyjs=False, div_id='fig-decomp'))
-
-        f.write(f"<h3>{fig_forecast.layout.title.text}</h3>")
-        f.write(fig_forecast.to_html(full_html=False, include_plotlyjs=False, div_id='fig-forecast'))
-
-        # Cerrar HTML
-        f.write("</div></body></html>")
-    
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    report_path = os.path.join(output_dir or current_dir, filename)
+
+    # Armado en memoria con plantillas y una sola escritura (plotly.js sin CDN por defecto)
+    report = HtmlReport(f"Reporte {symbol}", css=REPORT_CSS)
+    report.add(f"<h1>Reporte de Análisis Financiero: {symbol}</h1>")
+    report.add(f"<p>Generado el: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>")
+    report.add(f"<p>Rango de datos analizado: {min_date} a {max_date}</p>")
+
+    # Sección de Estadísticas
+    report.heading("Estadísticas Clave (Rendimientos Logarítmicos)")
+    report.add("<div class='stats-grid'>" + "".join(
+        f"<div class='stat-box'><b>{key}</b><span>{value}</span></div>" for key, value in stats.items()) + "</div>")
+
+    # Sección de VaR y Backtesting
+    report.heading("Value-at-Risk y Expected Shortfall")
+    report.add(var_table.to_html(float_format=lambda x: f"{x:.4%}", classes='data-table'))
+    report.heading("Backtesting (Kupiec / Christoffersen)", level=3)
+    if not backtest_summary.empty:
+        report.add(backtest_summary.to_html(float_format=lambda x: f"{x:.4f}", classes='data-table'))
+    report.figure(fig_backtest, 'fig-backtest')
+
+    # Gráficos
+    report.heading(fig_tecnico.layout.title.text)
+    report.figure(fig_tecnico, 'fig-tecnico')
+
+    report.heading(fig_hist.layout.title.text)
+    report.figure(fig_hist, 'fig-hist')
+
+    report.heading("Análisis de Serie de Tiempo y Proyección")
+
+    report.heading(fig_decomp.layout.title.text, level=3)
+    report.figure(fig_decomp, 'fig-decomp')
+
+    report.heading(fig_forecast.layout.title.text, level=3)
+    report.figure(fig_forecast, 'fig-forecast')
+
+    html = report.render(plotlyjs_tag(plotlyjs, os.path.dirname(report_path)))
+    timer.start('escritura')
+    max_bytes = max_report_kb * 1024 if max_report_kb else None
+    try:
+        written = write_report(report_path, html, compress=compress, max_bytes=max_bytes)
+    except ReportBudgetExceeded as e:
+        timer.metrics['bytes'] = e.stats['bytes']
+        raise
+    report_path = written['path']
+    timer.metrics['bytes'] = written['bytes']
+
+    timer.stop()
     print(f"\n¡Reporte generado! 🚀")
-    print(f"Archivo guardado en: {report_path}")
+    print(f"Archivo guardado en: {report_path} ({timer.metrics['bytes'] / 1024:.0f} KB)")
+    return report_path
+
+
+# --- MODO BATCH: muchos símbolos en un pool de procesos ---
+
+def _available_memory_mb():
+    """
+    Memoria física disponible en MB (None si el sistema no la informa).
+    En Linux se usa MemAvailable, que cuenta la caché de páginas recuperable;
+    SC_AVPHYS_PAGES (memoria libre) la deja afuera y subestima mucho.
+    """
+    try:
+        with open('/proc/meminfo', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _memory_aware_workers(requested, worker_memory_mb):
+    """Limita los procesos para que su memoria estimada quepa en la disponible."""
+    requested = requested or os.cpu_count() or 1
+    available = _available_memory_mb()
+    if available is None or not worker_memory_mb:
+        return requested
+    return max(1, min(requested, int(available // worker_memory_mb)))
+
+
+def _report_worker(symbol, forecast_days, prominence, output_dir, stage_timeout, forecast_backend,
+                   max_points=DEFAULT_MAX_POINTS, plotlyjs='shared', compress=False, max_report_kb=None,
+                   metrics=False, trace_memory=False):
+    """
+    Genera el reporte de un símbolo dentro de un proceso del pool. Los datos se
+    leen del almacén local (ya actualizado por el proceso principal), sin red.
+    Devuelve la entrada del manifiesto para el símbolo; con 'metrics', también
+    los spans y contadores de caché del worker en '_metrics'.
+    """
+    if metrics:
+        # El proceso se reutiliza entre símbolos: se empieza de cero en cada uno
+        instrumentation.reset()
+        instrumentation.enable(trace_memory)
+    timer = StageTimer(stage_timeout, symbol=symbol)
+    entry = {'symbol': symbol, 'status': 'ok', 'error': None, 'path': None}
+    start = time.perf_counter()
+    try:
+        timer.start('carga')
+        data_raw = get_default_store().load(symbol)
+        path = generate_html_report(symbol, forecast_days, prominence, data_raw=data_raw,
+                                    output_dir=output_dir, timer=timer, forecast_backend=forecast_backend,
+                                    max_points=max_points, plotlyjs=plotlyjs, compress=compress,
+                                    max_report_kb=max_report_kb)
+        if path is None:
+            entry.update(status='error', error='Sin datos')
+        else:
+            entry['path'] = os.path.basename(path)
+    except ReportBudgetExceeded as e:
+        entry.update(status='over_budget', error=str(e), path=os.path.basename(e.stats['path']))
+    except StageTimeout as e:
+        entry.update(status='timeout', error=str(e))
+    except Exception as e:
+        entry.update(status='error', error=f"{type(e).__name__}: {e}")
+    finally:
+        timer.stop()
+    entry['timings'] = timer.timings
+    entry['bytes'] = timer.metrics.get('bytes')
+    entry['total_s'] = round(time.perf_counter() - start, 4)
+    if metrics:
+        entry['_metrics'] = (instrumentation.get_spans(), instrumentation.get_cache_counters())
+    return entry
+
+
+def _write_batch_index(output_dir, manifest):
+    """Página índice con el estado y los tiempos de cada símbolo."""
+    rows = []
+    for entry in manifest['symbols']:
+        link = f"<a href='{entry['path']}'>{entry['symbol']}</a>" if entry['path'] else entry['symbol']
+        size_kb = f"{entry['bytes'] / 1024:.0f}" if entry.get('bytes') else ''
+        rows.append(f"<tr><td>{link}</td><td>{entry['status']}</td><td>{entry['total_s']}</td>"
+                    f"<td>{size_kb}</td><td>{entry['error'] or ''}</td></tr>")
+    html = f"""<html><head><meta charset='utf-8'><title>Reportes batch</title>
+    <style>
+        body {{ font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif; margin: 40px; }}
+        table {{ border-collapse: collapse; }}
+        th, td {{ border: 1px solid #ddd; padding: 4px 10px; }}
+    </style></head><body>
+    <h1>Reportes generados ({manifest['ok']}/{len(manifest['symbols'])} correctos)</h1>
+    <p>Inicio: {manifest['started_at']} &middot; Duración: {manifest['total_s']} s &middot; Procesos: {manifest['workers']}</p>
+    <p>Tamaño total: {manifest['total_bytes'] / 2 ** 20:.1f} MB</p>
+    <table><tr><th>Símbolo</th><th>Estado</th><th>Tiempo (s)</th><th>KB</th><th>Error</th></tr>{''.join(rows)}</table>
+    </body></html>"""
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def generate_batch_reports(symbols, workers=None, forecast_days=30, prominence=5,
+                           stage_timeout=None, worker_memory_mb=1024, output_dir=None,
+                           forecast_backend='prophet', max_points=DEFAULT_MAX_POINTS, plotlyjs='shared',
+                           compress=False, max_report_kb=None, metrics=False, trace_memory=False):
+    """
+    Genera reportes para muchos símbolos en paralelo (pool de procesos).
+
+    Los datos se descargan una sola vez (get_daily_data_many actualiza el
+    almacén local) y cada proceso los lee del disco. El número de procesos
+    se limita según la memoria disponible ('worker_memory_mb' por proceso) y
+    cada etapa tiene un timeout opcional. Con plotlyjs='shared' todos los
+    reportes usan una sola copia local de plotly.min.js. Escribe un index.html
+    y un manifest.json con estado, tiempos y tamaño por símbolo (los que
+    superan 'max_report_kb' quedan como 'over_budget'). Con 'metrics', los
+    spans de los workers se suman a los del proceso principal (ver
+    core.instrumentation). Devuelve el manifiesto.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    started_at = datetime.now()
+    start = time.perf_counter()
+    output_dir = output_dir or os.path.join(current_dir, f"batch_{started_at.strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+    print(f"Obteniendo datos para {len(symbols)} símbolos...")
+    fetch_start = time.perf_counter()
+    data, fetch_errors = get_daily_data_many(symbols)
+    fetch_s = round(time.perf_counter() - fetch_start, 4)
+
+    entries = {s: {'symbol': s, 'status': 'error', 'error': msg, 'path': None, 'timings': {}, 'total_s': 0.0}
+               for s, msg in fetch_errors.items()}
+
+    if plotlyjs == 'shared':
+        # Se copia una vez aquí para que los procesos no compitan por escribirla
+        ensure_shared_plotlyjs(output_dir)
+
+    workers = _memory_aware_workers(workers, worker_memory_mb)
+    print(f"Generando {len(data)} reportes con {workers} procesos...")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {s: executor.submit(_report_worker, s, forecast_days, prominence, output_dir,
+                                      stage_timeout, forecast_backend, max_points, plotlyjs, compress,
+                                      max_report_kb, metrics, trace_memory)
+                   for s in data}
+        for symbol, future in futures.items():
+            try:
+                entries[symbol] = future.result()
+                if '_metrics' in entries[symbol]:
+                    instrumentation.merge(*entries[symbol].pop('_metrics'))
+            except Exception as e:
+                # Por ejemplo, un proceso terminado por falta de memoria
+                entries[symbol] = {'symbol': symbol, 'status': 'error', 'error': f"{type(e).__name__}: {e}",
+                                   'path': None, 'timings': {}, 'total_s': 0.0}
+
+    manifest = {
+        'started_at': started_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'total_s': round(time.perf_counter() - start, 4),
+        'fetch_s': fetch_s,
+        'workers': workers,
+        'stage_timeout': stage_timeout,
+        'ok': sum(1 for e in entries.values() if e['status'] == 'ok'),
+        'total_bytes': sum(e.get('bytes') or 0 for e in entries.values()),
+        'symbols': [entries[s] for s in symbols],
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    _write_batch_index(output_dir, manifest)
+
+    print(f"\n{manifest['ok']}/{len(symbols)} reportes generados en {manifest['total_s']} s.")
+    print(f"Índice: {os.path.join(output_dir, 'index.html')}")
+    return manifest
+
+
+def _read_symbols_file(path):
+    """Lee símbolos de un archivo (uno por línea o separados por comas; '#' para comentarios)."""
+    symbols = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            symbols.extend(s.strip().upper() for s in line.replace(',', ' ').split() if s.strip())
+    return symbols
+
 
 # --- Esto permite ejecutar el script desde la línea de comandos ---
 if __name__ == "__main__":
-    # Tomar el símbolo de la línea de comandos
-    if len(sys.argv) > 1:
-        symbol_input = sys.argv[1].upper()
+    parser = argparse.ArgumentParser(description="Genera reportes HTML para uno o muchos símbolos.")
+    parser.add_argument('symbols', nargs='*', help="Símbolos (por defecto MSFT).")
+    parser.add_argument('--file', help="Archivo con la lista de símbolos.")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos en paralelo (modo batch).")
+    parser.add_argument('--worker-memory-mb', type=int, default=1024,
+                        help="Memoria estimada por proceso; limita la concurrencia.")
+    parser.add_argument('--stage-timeout', type=float, default=None, help="Segundos máximos por etapa.")
+    parser.add_argument('--forecast-days', type=int, default=30)
+    parser.add_argument('--prominence', type=float, default=5)
+    parser.add_argument('--forecast-backend', choices=['prophet', 'fast'], default='prophet',
+                        help="Motor de proyección ('fast' evita el ajuste de Prophet).")
+    parser.add_argument('--max-points', type=int, default=DEFAULT_MAX_POINTS,
+                        help="Puntos máximos por traza en los gráficos de series.")
+    parser.add_argument('--plotlyjs', choices=PLOTLYJS_MODES, default=None,
+                        help="plotly.js incrustado ('embed', por defecto con un símbolo), una copia local "
+                             "compartida ('shared', por defecto en batch) o 'cdn'.")
+    parser.add_argument('--gzip', action='store_true', help="Escribe los reportes como .html.gz.")
+    parser.add_argument('--max-report-kb', type=int, default=None,
+                        help="Tamaño máximo por reporte; si se supera se marca como error.")
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--metrics-jsonl', default=None,
+                        help="Guarda los spans por etapa (tiempo, CPU, filas, caché) en este archivo JSON lines.")
+    parser.add_argument('--metrics-prom', default=None,
+                        help="Guarda las métricas agregadas por etapa en formato de texto de Prometheus.")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Mide también el pico de memoria por etapa (tracemalloc; más lento).")
+    args = parser.parse_args()
+
+    metrics = bool(args.metrics_jsonl or args.metrics_prom)
+    if metrics:
+        instrumentation.enable(trace_memory=args.trace_memory)
+
+    symbols_input = [s.upper() for s in args.symbols]
+    if args.file:
+        symbols_input += _read_symbols_file(args.file)
+
+    if len(symbols_input) <= 1 and not args.file:
+        # Modo clásico: un solo símbolo (MSFT como default si no se provee)
+        generate_html_report(symbols_input[0] if symbols_input else "MSFT",
+                             forecast_days=args.forecast_days, prominence=args.prominence,
+                             output_dir=args.output_dir, forecast_backend=args.forecast_backend,
+                             max_points=args.max_points, plotlyjs=args.plotlyjs or 'embed',
+                             compress=args.gzip, max_report_kb=args.max_report_kb)
     else:
-        symbol_input = "MSFT" # Usar MSFT como default si no se provee
-    
-    generate_html_report(symbol_input)
+        generate_batch_reports(symbols_input, workers=args.workers, forecast_days=args.forecast_days,
+                               prominence=args.prominence, stage_timeout=args.stage_timeout,
+                               worker_memory_mb=args.worker_memory_mb, output_dir=args.output_dir,
+                               forecast_backend=args.forecast_backend, max_points=args.max_points,
+                               plotlyjs=args.plotlyjs or 'shared', compress=args.gzip,
+                               max_report_kb=args.max_report_kb, metrics=metrics,
+                               trace_memory=args.trace_memory)
+
+    if args.metrics_jsonl:
+        instrumentation.export_jsonl(args.metrics_jsonl)
+        print(f"Spans guardados en: {args.metrics_jsonl}")
+    if args.metrics_prom:
+        with open(args.metrics_prom, 'w', encoding='utf-8') as f:
+            f.write(instrumentation.prometheus_text())
+        print(f"Métricas Prometheus guardadas en: {args.metrics_prom}")